@@ -12,6 +12,11 @@ from .consts import DESCRIPTORS, WS_CURRENT_POINTER, BEFORE, AFTER, \
 from .drift import drift_descriptors
 from .exception import RemediationEngineException
 
+try:
+    from jsonteng.codec import get_codec
+except ImportError:
+    get_codec = None
+
 
 class JsonRemediator(object):
     """
@@ -315,17 +320,13 @@ def main(args=None):
     params = parser.parse_args(args=args)
     descriptors = None
     if params.remediation_descriptors:
-        with open(params.remediation_descriptors, "r") as fp:
-            descriptors = json.load(fp, object_pairs_hook=OrderedDict)
-    with open(params.target, "r") as fp:
-        target = json.load(fp)
+        descriptors = _load_json(params.remediation_descriptors, OrderedDict)
+    target = _load_json(params.target)
     companion = None
     if params.companion:
-        with open(params.companion, "r") as fp:
-            companion = json.load(fp)
+        companion = _load_json(params.companion)
     if params.env:
-        with open(params.env, "r") as fp:
-            env = json.load(fp)
+        env = _load_json(params.env)
     else:
         env = dict()
     if not companion and params.drift:
@@ -342,5 +343,22 @@ def main(args=None):
         print(f"workspace output: {workspace.get(WS_OUTPUT)}")
 
 
+
+def _load_json(file_path, object_pairs_hook=None):
+    """
+    Load a JSON file with the JSON codec of jsonteng if it is installed.
+    The codec keeps the key order of JSON objects.
+    :param file_path: File path.
+    :type file_path: str
+    :param object_pairs_hook: Hook of `json.load` used without jsonteng.
+    :type object_pairs_hook: callable
+    :return: Loaded JSON value.
+    """
+    with open(file_path, "r") as fp:
+        if get_codec is not None:
+            return get_codec().load(fp)
+        return json.load(fp, object_pairs_hook=object_pairs_hook)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1 @@
+PYTHONPATH=src/main/python:${PYTHONPATH} python3 src/benchmark/benchmark.py "$@"
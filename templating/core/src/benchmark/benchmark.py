@@ -0,0 +1,533 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from jsonteng.element_resolver import ElementResolver
+from jsonteng.json_cache import JsonCache
+from jsonteng.json_loader import DefaultJsonLoader
+from jsonteng.render_context import RenderContext
+from jsonteng.scope import ScopeChain
+from jsonteng.stats import Stats
+from jsonteng.string_resolver import StringResolver
+from jsonteng.template_engine import JsonTemplateEngine
+
+# Version of the result format.
+RESULT_VERSION = 1
+
+# Script importing a module given as the first argument in a new
+# interpreter. Memory is traced if the second argument is "1". Nothing else
+# is imported before the module so that its dependencies are measured too.
+_IMPORT_SCRIPT = """
+import sys
+import time
+if sys.argv[2] == "1":
+    import tracemalloc
+    tracemalloc.start()
+start_time = time.perf_counter()
+__import__(sys.argv[1])
+elapsed_time = time.perf_counter() - start_time
+if sys.argv[2] == "1":
+    size, peak_size = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat
+                 in tracemalloc.take_snapshot().statistics("filename"))
+    print(elapsed_time, blocks, size, peak_size)
+else:
+    print(elapsed_time, 0, 0, 0)
+"""
+
+
+def deep_nesting(scale):
+    """
+    Generate a template of deeply nested objects and arrays.
+    :param scale: Size factor of the generated data.
+    :type scale: 'float'
+    :return: A tuple of template and binding data list.
+    :rtype: 'tuple'
+    """
+    depth = max(1, int(100 * scale))
+    template = OrderedDict([("v", "${v}")])
+    for level in range(depth):
+        template = OrderedDict([("l{}".format(level), "${v}"),
+                                ("n", [template, "${v}"])])
+    return template, [{"v": 1}]
+
+
+def wide_object(scale):
+    """
+    Generate a template of an object with many keys.
+    :param scale: Size factor of the generated data.
+    :type scale: 'float'
+    :return: A tuple of template and binding data list.
+    :rtype: 'tuple'
+    """
+    width = max(1, int(5000 * scale))
+    template = OrderedDict(("k{}".format(index), "${p%d}" % index)
+                           for index in range(width))
+    binding_data = OrderedDict(("p{}".format(index), index)
+                               for index in range(width))
+    return template, [binding_data]
+
+
+def for_each_fanout(scale):
+    """
+    Generate a for-each loop over many items.
+    :param scale: Size factor of the generated data.
+    :type scale: 'float'
+    :return: A tuple of template and binding data list.
+    :rtype: 'tuple'
+    """
+    count = max(1, int(5000 * scale))
+    loop_template = json.dumps(OrderedDict([
+        ("id", "${id}"), ("name", "item-${id}"), ("tags", ["${t}", "x"])]))
+    template = OrderedDict([("items", ["#for-each", "${items}",
+                                       loop_template])])
+    items = [OrderedDict([("id", index), ("t", "t{}".format(index % 7))])
+             for index in range(count)]
+    return template, [{"items": items}]
+
+
+def long_string(scale):
+    """
+    Generate a string with many parameter references, some of them
+    nested.
+    :param scale: Size factor of the generated data.
+    :type scale: 'float'
+    :return: A tuple of template and binding data list.
+    :rtype: 'tuple'
+    """
+    count = max(1, int(500 * scale))
+    parts = list()
+    for index in range(count):
+        if index % 10 == 9:
+            parts.append("${n${k%d}}" % index)
+        else:
+            parts.append("${p%d}" % index)
+    binding_data = OrderedDict()
+    for index in range(count):
+        binding_data["p{}".format(index)] = "v{}".format(index)
+        binding_data["k{}".format(index)] = index
+        binding_data["n{}".format(index)] = index
+    return OrderedDict([("s", ' '.join(parts))]), [binding_data]
+
+
+def many_layers(scale):
+    """
+    Generate a binding data list with many layers where most parameters
+    are found in the last layers.
+    :param scale: Size factor of the generated data.
+    :type scale: 'float'
+    :return: A tuple of template and binding data list.
+    :rtype: 'tuple'
+    """
+    layers = max(1, int(200 * scale))
+    binding_data_list = [
+        OrderedDict([("l{}".format(layer),
+                      OrderedDict([("v", layer), ("w", [layer])]))])
+        for layer in range(layers)]
+    template = OrderedDict(
+        ("k{}".format(layer), ["${l%d.v}" % layer, "${l%d.w[0]}" % layer])
+        for layer in range(layers))
+    return template, binding_data_list
+
+
+def one_of_conditions(scale):
+    """
+    Generate a for-each loop selecting each value by a one-of tag with
+    many conditions.
+    :param scale: Size factor of the generated data.
+    :type scale: 'float'
+    :return: A tuple of template and binding data list.
+    :rtype: 'tuple'
+    """
+    count = max(1, int(1000 * scale))
+    branches = list()
+    for branch in range(20):
+        branches.append(["${x} == %d and '${c}' != 'z'" % branch,
+                         "b{}".format(branch)])
+    branches.append("other")
+    loop_template = json.dumps(OrderedDict([("v", ["#one-of"] + branches)]))
+    template = OrderedDict([("items", ["#for-each", "${items}",
+                                       loop_template])])
+    items = [OrderedDict([("x", index % 25), ("c", "c")])
+             for index in range(count)]
+    return template, [{"items": items}]
+
+
+# Template generators by axis.
+GENERATORS = OrderedDict([
+    ("deep_nesting", deep_nesting),
+    ("wide_object", wide_object),
+    ("for_each_fanout", for_each_fanout),
+    ("long_string", long_string),
+    ("many_layers", many_layers),
+    ("one_of_conditions", one_of_conditions)
+])
+
+
+class Benchmark(object):
+    """
+    A benchmark runs a function of a component of the template engine in
+    process and measures its latency, allocations and peak memory.
+    """
+    def __init__(self, name, setup):
+        """
+        Construct a benchmark.
+        :param name: Name of the benchmark.
+        :type name: 'str'
+        :param setup: Function called with the scale which returns the
+                      function to be measured. Work done by the setup is
+                      not measured.
+        :type setup: 'function'
+        """
+        self.name = name
+        self._setup = setup
+
+    def run(self, scale, repeat, warmup):
+        """
+        Run this benchmark.
+        :param scale: Size factor of the generated data.
+        :type scale: 'float'
+        :param repeat: Number of measured runs.
+        :type repeat: 'int'
+        :param warmup: Number of runs before the measured runs.
+        :type warmup: 'int'
+        :return: Result of the benchmark.
+        :rtype: 'OrderedDict'
+        """
+        func = self._setup(scale)
+        for _ in range(warmup):
+            func()
+        timings = list()
+        gc_enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start_time)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        memory = Benchmark._measure_memory(func)
+        return Benchmark._get_result(timings, memory)
+
+    @staticmethod
+    def _get_result(timings, memory):
+        """
+        Return the result of a benchmark.
+        :param timings: Latencies of the measured runs.
+        :type timings: 'list'
+        :param memory: A tuple of the number of blocks and bytes allocated
+                       by a run and still alive when it returns, and the
+                       peak of memory allocated during the run.
+        :type memory: 'tuple'
+        :return: Result of the benchmark.
+        :rtype: 'OrderedDict'
+        """
+        return OrderedDict([
+            ("repeat", len(timings)),
+            ("latency", OrderedDict([
+                ("min", min(timings)),
+                ("median", statistics.median(timings)),
+                ("mean", statistics.mean(timings)),
+                ("stdev", statistics.stdev(timings)
+                 if len(timings) > 1 else 0.0)])),
+            ("allocated_blocks", memory[0]),
+            ("allocated_bytes", memory[1]),
+            ("peak_bytes", memory[2])
+        ])
+
+    @staticmethod
+    def _measure_memory(func):
+        """
+        Trace the memory allocated by one run of a function.
+        :param func: Function to be measured.
+        :type func: 'function'
+        :return: A tuple of the number of blocks and bytes allocated by the
+                 run and still alive when it returns, and the peak of
+                 memory allocated during the run.
+        :rtype: 'tuple'
+        """
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            start_size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = func()
+            _, peak_size = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        del result
+        # exclude the snapshot taken before the run
+        exclude = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        before = before.filter_traces(exclude)
+        after = after.filter_traces(exclude)
+        blocks = 0
+        size = 0
+        for stat in after.compare_to(before, 'lineno'):
+            if stat.count_diff > 0:
+                blocks += stat.count_diff
+                size += stat.size_diff
+        return blocks, size, peak_size - start_size
+
+
+class ImportBenchmark(Benchmark):
+    """
+    An import benchmark imports a module of the template engine in a new
+    interpreter and measures its import time, allocations and peak memory.
+    The import time adds to the latency of every CLI run.
+    """
+    def __init__(self, module_name):
+        """
+        Construct an import benchmark.
+        :param module_name: Name of the imported module.
+        :type module_name: 'str'
+        """
+        super().__init__("import.{}".format(module_name), None)
+        self._module_name = module_name
+
+    def run(self, scale, repeat, warmup):
+        """
+        Run this benchmark. The scale is ignored.
+        :param scale: Size factor of the generated data.
+        :type scale: 'float'
+        :param repeat: Number of measured runs.
+        :type repeat: 'int'
+        :param warmup: Number of runs before the measured runs. A warmup
+                       run writes the bytecode caches of the modules.
+        :type warmup: 'int'
+        :return: Result of the benchmark.
+        :rtype: 'OrderedDict'
+        """
+        for _ in range(warmup):
+            self._import(False)
+        timings = [self._import(False)[0] for _ in range(repeat)]
+        memory = self._import(True)[1:]
+        return Benchmark._get_result(timings, memory)
+
+    def _import(self, trace):
+        """
+        Import the module in a new interpreter with the same module search
+        path as this one.
+        :param trace: Trace the memory allocated by the import if true.
+        :type trace: 'bool'
+        :return: A tuple of the import time, the number of blocks and bytes
+                 allocated by the import and still alive, and the peak of
+                 memory allocated.
+        :rtype: 'tuple'
+        """
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(path for path in sys.path if path)
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SCRIPT, self._module_name,
+             "1" if trace else "0"],
+            env=env, stdout=subprocess.PIPE, check=True,
+            universal_newlines=True).stdout
+        elapsed_time, blocks, size, peak_size = output.split()
+        return float(elapsed_time), int(blocks), int(size), int(peak_size)
+
+
+def _engine_resolve(generator):
+    def setup(scale):
+        template, binding_data_list = generator(scale)
+        template = json.dumps(template)
+        engine = JsonTemplateEngine()
+        return lambda: engine.resolve(template, binding_data_list)
+    return setup
+
+
+def _string_resolve(scale):
+    template, binding_data_list = long_string(scale)
+    str_data = template["s"]
+    string_resolver = StringResolver(
+        ElementResolver(DefaultJsonLoader(), Stats()))
+    scope = ScopeChain(binding_data_list, RenderContext())
+    return lambda: string_resolver.resolve(str_data, scope)
+
+
+def _loader_setup(cached):
+    def setup(scale):
+        template, _ = wide_object(scale)
+        temp_dir = tempfile.TemporaryDirectory()
+        template_file = os.path.join(temp_dir.name, "template.json")
+        with open(template_file, 'w') as fp:
+            json.dump(template, fp)
+        shared_cache = JsonCache()
+
+        def load():
+            loader = DefaultJsonLoader(
+                cache=shared_cache if cached else JsonCache())
+            json_object = loader.load(template_file)
+            loader.unload(template_file)
+            return json_object
+        # the directory is removed when the function is released
+        load.temp_dir = temp_dir
+        return load
+    return setup
+
+
+def get_benchmarks():
+    """
+    Get all benchmarks.
+    :return: Benchmarks in the order they are run.
+    :rtype: 'list'
+    """
+    benchmarks = [Benchmark("engine.resolve.{}".format(name),
+                            _engine_resolve(generator))
+                  for name, generator in GENERATORS.items()]
+    benchmarks.append(Benchmark("string_resolver.resolve.long_string",
+                                _string_resolve))
+    benchmarks.append(Benchmark("loader.load.cold", _loader_setup(False)))
+    benchmarks.append(Benchmark("loader.load.cached", _loader_setup(True)))
+    benchmarks.append(ImportBenchmark("jsonteng.template_engine"))
+    benchmarks.append(ImportBenchmark("jsonteng.client"))
+    return benchmarks
+
+
+def run_benchmarks(benchmarks, scale=1.0, repeat=10, warmup=1,
+                   verbose=False):
+    """
+    Run benchmarks.
+    :param benchmarks: Benchmarks to be run.
+    :type benchmarks: 'list'
+    :param scale: Size factor of the generated data.
+    :type scale: 'float'
+    :param repeat: Number of measured runs of each benchmark.
+    :type repeat: 'int'
+    :param warmup: Number of runs before the measured runs.
+    :type warmup: 'int'
+    :param verbose: Print the progress to stderr if true.
+    :type verbose: 'bool'
+    :return: Results in a JSON object.
+    :rtype: 'OrderedDict'
+    """
+    results = OrderedDict()
+    for benchmark in benchmarks:
+        if verbose:
+            print("Running {}".format(benchmark.name), file=sys.stderr)
+        results[benchmark.name] = benchmark.run(scale, repeat, warmup)
+    return OrderedDict([
+        ("version", RESULT_VERSION),
+        ("python", platform.python_version()),
+        ("platform", platform.platform()),
+        ("scale", scale),
+        ("benchmarks", results)
+    ])
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline. The median latency and the peak memory
+    of a benchmark regress if they exceed the baseline by more than the
+    threshold. Benchmarks missing in either are skipped.
+    :param results: Results returned by `run_benchmarks`.
+    :type results: 'dict'
+    :param baseline: Results of the baseline.
+    :type baseline: 'dict'
+    :param threshold: Allowed relative increase such as 0.1 for 10%.
+    :type threshold: 'float'
+    :return: A list of comparisons, each of which is a tuple of benchmark
+             name, metric, baseline value, value, ratio and True if it
+             regresses.
+    :rtype: 'list'
+    """
+    if results.get("scale") != baseline.get("scale"):
+        raise ValueError("Results of scale {} can not be compared with a"
+                         " baseline of scale {}".format(
+                             results.get("scale"), baseline.get("scale")))
+    comparisons = list()
+    baseline_results = baseline["benchmarks"]
+    for name, result in results["benchmarks"].items():
+        baseline_result = baseline_results.get(name)
+        if baseline_result is None:
+            continue
+        for metric, value, baseline_value in (
+                ("latency.median", result["latency"]["median"],
+                 baseline_result["latency"]["median"]),
+                ("peak_bytes", result["peak_bytes"],
+                 baseline_result["peak_bytes"])):
+            ratio = value / baseline_value if baseline_value else 1.0
+            comparisons.append((name, metric, baseline_value, value, ratio,
+                                ratio > 1.0 + threshold))
+    return comparisons
+
+
+def main(args=None):
+    """
+    CLI of the benchmark suite.
+    """
+    parser = argparse.ArgumentParser(
+        description='JSON template engine benchmarks.')
+    parser.add_argument('-o', '--output', required=False,
+                        help="write results to a JSON file instead of"
+                             " stdout")
+    parser.add_argument('-b', '--baseline', required=False,
+                        help="compare results with a baseline JSON file and"
+                             " exit with 1 on regressions")
+    parser.add_argument('-t', '--threshold', required=False, type=float,
+                        default=0.1,
+                        help="allowed relative increase over the baseline."
+                             " Default is 0.1")
+    parser.add_argument('-s', '--scale', required=False, type=float,
+                        default=1.0,
+                        help="size factor of the generated templates and"
+                             " binding data. Default is 1.0")
+    parser.add_argument('-r', '--repeat', required=False, type=int,
+                        default=10,
+                        help="measured runs of each benchmark. Default is"
+                             " 10")
+    parser.add_argument('-k', '--filter', required=False,
+                        help="run benchmarks whose names contain this"
+                             " string")
+    parser.add_argument('-v', '--verbose', required=False,
+                        help="increase output verbosity",
+                        action="store_true")
+    params = parser.parse_args(args=args)
+    if params.repeat < 1:
+        parser.error("repeat must be at least 1")
+    benchmarks = [benchmark for benchmark in get_benchmarks()
+                  if not params.filter or params.filter in benchmark.name]
+    results = run_benchmarks(benchmarks, params.scale, params.repeat,
+                             verbose=params.verbose)
+    if params.output:
+        with open(params.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+            fp.write('\n')
+    else:
+        print(json.dumps(results, indent=2))
+    if params.baseline:
+        with open(params.baseline) as fp:
+            baseline = json.load(fp)
+        try:
+            comparisons = compare(results, baseline, params.threshold)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            exit(2)
+        regressed = False
+        for name, metric, baseline_value, value, ratio, regression in \
+                comparisons:
+            print("{:<6} {:<45} {:<15} {:>8.3f}x".format(
+                "FAIL" if regression else "ok", name, metric, ratio),
+                file=sys.stderr)
+            regressed = regressed or regression
+        if regressed:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
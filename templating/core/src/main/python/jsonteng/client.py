@@ -0,0 +1,92 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import json
+import os
+import socket
+import sys
+import threading
+
+# Options of the client. Other arguments are passed to the server.
+_SOCKET_OPTION = "--socket"
+_SOCKET_ENV = "JSONTENG_SOCKET"
+
+
+def render(path, args, stdin, stdout, stderr):
+    """
+    Run a CLI render on a render server. The standard input is sent to the
+    server while the render runs and the output is written as it arrives.
+    :param path: Path of the Unix domain socket of the server.
+    :type path: 'str'
+    :param args: CLI arguments of the render.
+    :type args: 'list'
+    :param stdin: File descriptor of the standard input or None.
+    :type stdin: 'int'
+    :param stdout: Text file object of the standard output.
+    :type stdout: 'file'
+    :param stderr: Text file object of the standard error.
+    :type stderr: 'file'
+    :return: Exit status of the render.
+    :rtype: 'int'
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with connection:
+        connection.connect(path)
+        connection.sendall(json.dumps({"args": args}).encode("ascii") + b"\n")
+        if stdin is not None:
+            # The server reads the input only if the render does.
+            threading.Thread(target=_send_input, args=(connection, stdin),
+                             daemon=True).start()
+        else:
+            connection.shutdown(socket.SHUT_WR)
+        with connection.makefile("rb") as fp:
+            for line in fp:
+                kind, value = json.loads(line)
+                if kind == "exit":
+                    return value
+                (stdout if kind == "out" else stderr).write(value)
+    stderr.write("The render server closed the connection.\n")
+    return 1
+
+
+def _send_input(connection, stdin):
+    """
+    Send the standard input until it ends.
+    """
+    try:
+        while True:
+            # A buffered read would block the interpreter shutdown.
+            data = os.read(stdin, 65536)
+            if not data:
+                break
+            connection.sendall(data)
+        connection.shutdown(socket.SHUT_WR)
+    except OSError:
+        # the render has finished
+        pass
+
+
+def main(args=None):
+    """
+    Thin client of the render server taking the arguments of the CLI. The
+    server socket is given by --socket PATH before the CLI arguments or by
+    JSONTENG_SOCKET.
+    """
+    args = list(sys.argv[1:] if args is None else args)
+    path = os.environ.get(_SOCKET_ENV)
+    if len(args) >= 2 and args[0] == _SOCKET_OPTION:
+        path = args[1]
+        del args[:2]
+    if not path:
+        sys.stderr.write("usage: client.py [{} PATH] CLI_ARGS...\n"
+                         "The server socket is given by {} PATH or {}.\n"
+                         .format(_SOCKET_OPTION, _SOCKET_OPTION, _SOCKET_ENV))
+        sys.exit(2)
+    stdin = sys.stdin.fileno() if sys.stdin is not None else None
+    status = render(path, args, stdin, sys.stdout, sys.stderr)
+    sys.stdout.flush()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import json
+import re
+from collections import OrderedDict
+
+from .exception import TemplateEngineException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Integers of 19 or more digits may not fit in 64 bits. orjson parses them
+# as floats. Digits are mapped to "0" and other bytes to " " to find them.
+_DIGITS = bytes(ord('0') if ord('0') <= byte <= ord('9') else ord(' ')
+                for byte in range(256))
+_LONG_DIGITS = b'0' * 19
+# Characters escaped by `json.dumps` with `ensure_ascii` and written as is
+# by orjson. A negated class compiles much faster than the whole range.
+_NON_ASCII = re.compile('[^\x00-\x7e]')
+
+
+class JsonCodec(object):
+    """
+    JSON parser and serializer backed by the standard json module. JSON
+    objects are parsed into dict which keeps the key order. Subclasses may
+    use faster backends but must parse the same values and write the same
+    text as this codec.
+    """
+    name = "json"
+
+    def loads(self, data):
+        """
+        Parse a JSON text.
+        :param data: JSON text. Bytes are decoded as UTF-8.
+        :type data: 'str'
+        :return: Parsed JSON value.
+        :rtype: JSON data type
+        """
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode("utf-8")
+        return json.loads(data)
+
+    def load(self, fp):
+        """
+        Parse the JSON text read from a file object.
+        :param fp: File object.
+        :type fp: 'file'
+        :return: Parsed JSON value.
+        :rtype: JSON data type
+        """
+        return self.loads(fp.read())
+
+    def dumps(self, value, indent=None, separators=None, sort_keys=False):
+        """
+        Serialize a JSON value to text as `json.dumps` does with
+        `ensure_ascii`.
+        :param value: JSON value.
+        :type value: JSON data type
+        :param indent: Indent level as in `json.dumps`.
+        :type indent: 'int'
+        :param separators: A tuple of (item separator, key separator) as in
+                           `json.dumps`.
+        :type separators: 'tuple'
+        :param sort_keys: Sort the keys of JSON objects if true.
+        :type sort_keys: 'bool'
+        :return: JSON text.
+        :rtype: 'str'
+        """
+        return json.dumps(value, indent=indent, separators=separators,
+                          sort_keys=sort_keys)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Codec backed by orjson. Texts and values orjson handles differently
+    from the json module, such as NaN, integers beyond 64 bits and floats
+    written in exponent notation, fall back to the json module. Indented
+    text is written by orjson. Single line text is written by the json
+    module whose C encoder is as fast as checking a value for orjson.
+    """
+    name = "orjson"
+
+    def loads(self, data):
+        text = data
+        if isinstance(text, str):
+            try:
+                text = text.encode("utf-8")
+            except UnicodeEncodeError:
+                # Lone surrogates are parsed by the json module.
+                text = None
+        elif not isinstance(text, (bytes, bytearray)):
+            text = None
+        if text is not None and _LONG_DIGITS not in text.translate(_DIGITS):
+            try:
+                return orjson.loads(text)
+            except orjson.JSONDecodeError:
+                # Report errors and parse extensions such as NaN as the json
+                # module does.
+                pass
+        return super().loads(data)
+
+    def dumps(self, value, indent=None, separators=None, sort_keys=False):
+        if indent != 2 or separators not in (None, (',', ': ')):
+            return super().dumps(value, indent, separators, sort_keys)
+        option = orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_SUBCLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            text = orjson.dumps(value, default=OrjsonCodec._default,
+                                option=option)
+        except TypeError:
+            return super().dumps(value, indent, separators, sort_keys)
+        # orjson limits nesting so the value is not checked too deep.
+        if not OrjsonCodec._has_same_floats(value):
+            return super().dumps(value, indent, separators, sort_keys)
+        text = text.decode("utf-8")
+        if not text.isascii() or '\x7f' in text:
+            text = _NON_ASCII.sub(OrjsonCodec._escape, text)
+        return text
+
+    @staticmethod
+    def _default(value):
+        """
+        Convert a subclass of a JSON type for orjson. orjson writes the keys
+        of an OrderedDict in their insertion order, which differs from the
+        iteration order once a key is moved.
+        """
+        if type(value) is OrderedDict:
+            return dict(value)
+        raise TypeError
+
+    @staticmethod
+    def _has_same_floats(value):
+        """
+        Check whether orjson writes every float of a JSON value as the json
+        module does. They differ for NaN, infinity and floats which `repr`
+        writes in exponent notation.
+        :param value: JSON value.
+        :type value: JSON data type
+        :return: True if all floats are written the same.
+        :rtype: 'bool'
+        """
+        value_type = type(value)
+        if value_type is dict or value_type is OrderedDict:
+            values = value.values()
+        elif value_type is list or value_type is tuple:
+            values = value
+        elif value_type is float:
+            return value == 0 or 1e-4 <= abs(value) < 1e16
+        else:
+            return True
+        for item in values:
+            item_type = type(item)
+            if item_type is str or item_type is int or item_type is bool \
+                    or item is None:
+                continue
+            if not OrjsonCodec._has_same_floats(item):
+                return False
+        return True
+
+    @staticmethod
+    def _escape(match):
+        """
+        Escape a character as `json.dumps` does with `ensure_ascii`.
+        """
+        code = ord(match.group(0))
+        if code < 0x10000:
+            return '\\u{0:04x}'.format(code)
+        code -= 0x10000
+        return '\\u{0:04x}\\u{1:04x}'.format(
+            0xd800 | (code >> 10), 0xdc00 | (code & 0x3ff))
+
+
+# Codecs in the order of preference. A codec is available if its backend is
+# installed.
+_CODECS = OrderedDict([
+    (OrjsonCodec.name, (OrjsonCodec, orjson is not None)),
+    (JsonCodec.name, (JsonCodec, True))])
+_instances = dict()
+
+
+def get_codec_names():
+    """
+    Get the names of the codecs whose backends are installed.
+    :return: Codec names in the order of preference.
+    :rtype: 'list'
+    """
+    return [name for name, (_, available) in _CODECS.items() if available]
+
+
+def get_codec(name=None):
+    """
+    Get a codec. Codecs are shared.
+    :param name: Codec name. The preferred codec installed is returned if
+                 None.
+    :type name: 'str'
+    :return: JSON codec.
+    :rtype: 'JsonCodec'
+    """
+    if name is None:
+        name = get_codec_names()[0]
+    if name not in _CODECS:
+        raise TemplateEngineException(
+            "Unknown JSON codec \"{}\". Valid codecs are {}.".format(
+                name, ", ".join(_CODECS)))
+    codec_class, available = _CODECS[name]
+    if not available:
+        raise TemplateEngineException(
+            "JSON codec \"{}\" is not installed.".format(name))
+    codec = _instances.get(name)
+    if codec is None:
+        codec = _instances[name] = codec_class()
+    return codec
@@ -0,0 +1,474 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import json
+import sys
+from collections import OrderedDict
+
+from .exception import TemplateEngineException
+from .instrument import Instrument
+from .tags.tag_base import TagBase
+from .util import (unescape_json, unescape_segment, unescape_string,
+                   copy_json)
+
+
+class TemplateNode(object):
+    """
+    Base class of compiled template nodes. A node is created once per
+    template element and resolved many times.
+    """
+    __slots__ = ('element',)
+
+    def __init__(self, element):
+        """
+        Construct a node.
+        :param element: The template element the node is compiled from.
+        :type element: JSON data type
+        """
+        self.element = element
+
+    def resolve(self, scope):
+        """
+        Resolve this node.
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        :return: Resolved JSON element.
+        :rtype: JSON data type
+        """
+        raise NotImplementedError
+
+    def emit(self, scope):
+        """
+        Resolve this node for output. Escape characters are removed from
+        the resolved JSON element. The result is the same as unescaping the
+        result of `resolve`.
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        :return: Resolved and unescaped JSON element.
+        :rtype: JSON data type
+        """
+        return unescape_json(self.resolve(scope))
+
+    def children(self):
+        """
+        Return the child nodes of this node.
+        :return: Child nodes.
+        :rtype: 'list'
+        """
+        return ()
+
+    def __repr__(self):
+        return repr(self.element)
+
+
+class LiteralNode(TemplateNode):
+    """
+    A number, a boolean, null or a string without parameter references.
+    The unescaped value is prepared once.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, element):
+        super().__init__(element)
+        self.value = unescape_string(element) \
+            if isinstance(element, str) else element
+
+    def resolve(self, scope):
+        return self.element
+
+    def emit(self, scope):
+        return self.value
+
+
+class ConstantNode(TemplateNode):
+    """
+    A JSON object or array without parameter references, tags, tag keys and
+    escape characters. The value is built once. It is shared by all
+    resolutions and must not be modified unless it is copied on every
+    resolution.
+    """
+    __slots__ = ('value', 'copy')
+
+    def __init__(self, element, value, copy=False):
+        """
+        Construct a constant node.
+        :param element: The template element the node is compiled from.
+        :type element: JSON data type
+        :param value: Resolved value.
+        :type value: JSON data type
+        :param copy: Return a copy of the value on every resolution if true.
+        :type copy: 'bool'
+        """
+        super().__init__(element)
+        self.value = value
+        self.copy = copy
+
+    def resolve(self, scope):
+        if self.copy:
+            return copy_json(self.value)
+        return self.value
+
+    def emit(self, scope):
+        return self.resolve(scope)
+
+    @staticmethod
+    def is_constant(node):
+        """
+        Check whether a node always resolves to the same value which needs
+        no unescaping.
+        :param node: Template node.
+        :type node: 'TemplateNode'
+        :return: True if the node is constant.
+        :rtype: 'bool'
+        """
+        if isinstance(node, ConstantNode):
+            return True
+        return isinstance(node, LiteralNode) and \
+            not (isinstance(node.element, str) and '\\' in node.element)
+
+
+class StringNode(TemplateNode):
+    """
+    A string with parameter references. The string is tokenized once and
+    literal segments are unescaped once. An unescaped segment is None if it
+    can not be joined with the next segment.
+    """
+    __slots__ = ('tokens', 'texts', '_string_resolver')
+
+    def __init__(self, element, tokens, string_resolver):
+        super().__init__(element)
+        self.tokens = tokens
+        self.texts = tuple(unescape_segment(token)
+                           if isinstance(token, str) else token
+                           for token in tokens)
+        self._string_resolver = string_resolver
+
+    def resolve(self, scope):
+        instrument = scope.context.instrument
+        if instrument is None:
+            return self._string_resolver.render(
+                self.element, self.tokens, scope)
+        instrument.enter(Instrument.STRING, self.element)
+        try:
+            return self._string_resolver.render(
+                self.element, self.tokens, scope)
+        finally:
+            instrument.exit(Instrument.STRING, self.element)
+
+    def emit(self, scope):
+        instrument = scope.context.instrument
+        if instrument is None:
+            return self._string_resolver.render(
+                self.element, self.tokens, scope, self.texts)
+        instrument.enter(Instrument.STRING, self.element)
+        try:
+            return self._string_resolver.render(
+                self.element, self.tokens, scope, self.texts)
+        finally:
+            instrument.exit(Instrument.STRING, self.element)
+
+
+class TagNode(TemplateNode):
+    """
+    A tag bound to its tag instance. Tag tokens are prepared once by
+    `TagBase.compile`.
+    """
+    __slots__ = ('tag_name', 'tag', 'tag_tokens')
+
+    def __init__(self, element, tag_name, tag, tag_tokens):
+        super().__init__(element)
+        self.tag_name = tag_name
+        self.tag = tag
+        self.tag_tokens = tag_tokens
+
+    def resolve(self, scope):
+        if self.tag is None:
+            raise TemplateEngineException(
+                "Unknown tag \"{}\".".format(self.tag_name))
+        instrument = scope.context.instrument
+        if instrument is None:
+            return self.tag.process(self.tag_tokens, scope)
+        instrument.enter(Instrument.TAG, self.tag_name)
+        try:
+            return self.tag.process(self.tag_tokens, scope)
+        finally:
+            instrument.exit(Instrument.TAG, self.tag_name)
+
+    def emit(self, scope):
+        if self.tag is None:
+            raise TemplateEngineException(
+                "Unknown tag \"{}\".".format(self.tag_name))
+        instrument = scope.context.instrument
+        if instrument is None:
+            return self.tag.emit(self.tag_tokens, scope)
+        instrument.enter(Instrument.TAG, self.tag_name)
+        try:
+            return self.tag.emit(self.tag_tokens, scope)
+        finally:
+            instrument.exit(Instrument.TAG, self.tag_name)
+
+    def children(self):
+        child_nodes = list()
+        for token in self.tag_tokens or ():
+            if isinstance(token, TemplateNode):
+                child_nodes.append(token)
+            elif isinstance(token, tuple):
+                child_nodes.extend(item for item in token
+                                   if isinstance(item, TemplateNode))
+        return child_nodes
+
+    def get_references(self):
+        """
+        Return JSON resources loaded by the tag which are known before the
+        tag is processed.
+        :return: JSON resources.
+        :rtype: 'list'
+        """
+        if self.tag is None:
+            return []
+        return self.tag.get_references(self.tag_tokens)
+
+
+class ObjectNode(TemplateNode):
+    """
+    A JSON object. Each entry is a tuple of (key node, value node) or, for
+    a tag used as a key, (None, key tag node). A compact node builds plain
+    dicts instead of OrderedDicts. If all keys of a compact node are
+    distinct literal strings, each dict is copied from a layout of the keys
+    shared by all results of the node, so the dicts are sized exactly and
+    hold no key strings of their own. Other keys are interned.
+    """
+    __slots__ = ('entries', 'compact', '_layout', '_emit_layout')
+
+    def __init__(self, element, entries, compact=False):
+        """
+        Construct an object node.
+        :param element: The template element the node is compiled from.
+        :type element: JSON data type
+        :param entries: Entries of the object.
+        :type entries: 'list'
+        :param compact: Build plain dicts if true.
+        :type compact: 'bool'
+        """
+        super().__init__(element)
+        self.entries = entries
+        self.compact = compact
+        # Tuples of (layout, keyed value nodes) for resolve and emit.
+        self._layout = None
+        self._emit_layout = None
+        if compact and all(type(key_node) is LiteralNode and
+                           isinstance(key_node.element, str)
+                           for key_node, _ in entries):
+            self._layout = ObjectNode._make_layout(
+                [(key_node.element, value_node)
+                 for key_node, value_node in entries])
+            self._emit_layout = ObjectNode._make_layout(
+                [(key_node.value, value_node)
+                 for key_node, value_node in entries])
+
+    def __reduce__(self):
+        """
+        Pickle the node without the layouts, which are made again when the
+        node is unpickled so that their keys are interned.
+        """
+        return ObjectNode, (self.element, self.entries, self.compact)
+
+    def resolve(self, scope):
+        # constant objects and arrays are built once without a scope
+        if scope is not None and scope.context.budget is not None:
+            scope.context.budget.add_nodes(len(self.entries))
+        if self._layout is not None:
+            layout, keyed_nodes = self._layout
+            new_element = layout.copy()
+            for key, value_node in keyed_nodes:
+                new_value = value_node.resolve(scope)
+                if new_value is TagBase.TAG_NONE:
+                    del new_element[key]
+                else:
+                    new_element[key] = new_value
+            return new_element
+        compact = self.compact
+        new_element = dict() if compact else OrderedDict()
+        for key_node, value_node in self.entries:
+            if key_node is None:
+                resolved_tuple = value_node.resolve(scope)
+                if resolved_tuple is not TagBase.TAG_NONE:
+                    new_element.update(resolved_tuple)
+            else:
+                new_key = key_node.resolve(scope)
+                new_value = value_node.resolve(scope)
+                if isinstance(new_key, str) and \
+                        new_value is not TagBase.TAG_NONE:
+                    if compact:
+                        new_key = sys.intern(new_key)
+                    new_element[new_key] = new_value
+        return new_element
+
+    def children(self):
+        child_nodes = list()
+        for key_node, value_node in self.entries:
+            if key_node is not None:
+                child_nodes.append(key_node)
+            child_nodes.append(value_node)
+        return child_nodes
+
+    def emit(self, scope):
+        if scope is not None and scope.context.budget is not None:
+            scope.context.budget.add_nodes(len(self.entries))
+        if self._emit_layout is not None:
+            layout, keyed_nodes = self._emit_layout
+            new_element = layout.copy()
+            for key, value_node in keyed_nodes:
+                new_value = value_node.emit(scope)
+                if new_value is TagBase.TAG_NONE:
+                    del new_element[key]
+                else:
+                    new_element[key] = new_value
+            return new_element
+        compact = self.compact
+        new_element = dict() if compact else OrderedDict()
+        for key_node, value_node in self.entries:
+            if key_node is None:
+                resolved_tuple = value_node.emit(scope)
+                if resolved_tuple is not TagBase.TAG_NONE:
+                    new_element.update(resolved_tuple)
+            else:
+                new_key = key_node.emit(scope)
+                new_value = value_node.emit(scope)
+                if isinstance(new_key, str) and \
+                        new_value is not TagBase.TAG_NONE:
+                    if compact:
+                        new_key = sys.intern(new_key)
+                    new_element[new_key] = new_value
+        return new_element
+
+    @staticmethod
+    def _make_layout(keyed_nodes):
+        """
+        Make the layout of literal keys.
+        :param keyed_nodes: A list of tuples of (key, value node).
+        :type keyed_nodes: 'list'
+        :return: A tuple of (layout, keyed value nodes) or None if keys are
+                 not distinct.
+        :rtype: 'tuple'
+        """
+        keyed_nodes = tuple((sys.intern(key), value_node)
+                            for key, value_node in keyed_nodes)
+        layout = dict.fromkeys(key for key, _ in keyed_nodes)
+        if len(layout) != len(keyed_nodes):
+            return None
+        return layout, keyed_nodes
+
+
+class KeyTagNode(TemplateNode):
+    """
+    A tag used as a JSON object key. The element is the (key, value) pair.
+    The tag must resolve to a JSON object to be merged into the enclosing
+    object or to nothing.
+    """
+    __slots__ = ('tag_node',)
+
+    def __init__(self, element, tag_node):
+        super().__init__(element)
+        self.tag_node = tag_node
+
+    def resolve(self, scope):
+        key, value = self.element
+        if self.tag_node is None:
+            raise TemplateEngineException(
+                "Value must be a list if name is a tag: \"{}\". Found \"{}\".".
+                format(key, value))
+        resolved_tuple = self.tag_node.resolve(scope)
+        if not isinstance(resolved_tuple, dict) and \
+                resolved_tuple is not TagBase.TAG_NONE:
+            raise TemplateEngineException(
+                "Invalid tag result format for JSON"
+                " object name tag: {} {} => {}.".
+                format(json.dumps(key, separators=(',', ':')),
+                       json.dumps(value, separators=(',', ':')),
+                       json.dumps(resolved_tuple, separators=(',', ':'))))
+        return resolved_tuple
+
+    def emit(self, scope):
+        resolved_tuple = self.resolve(scope)
+        if resolved_tuple is TagBase.TAG_NONE:
+            return resolved_tuple
+        return unescape_json(resolved_tuple)
+
+    def children(self):
+        return (self.tag_node,) if self.tag_node is not None else ()
+
+
+class ArrayNode(TemplateNode):
+    """
+    A JSON array which is not a tag.
+    """
+    __slots__ = ('items',)
+
+    def __init__(self, element, items):
+        super().__init__(element)
+        self.items = items
+
+    def resolve(self, scope):
+        # constant objects and arrays are built once without a scope
+        if scope is not None and scope.context.budget is not None:
+            scope.context.budget.add_nodes(len(self.items))
+        new_element = list()
+        for item in self.items:
+            new_item = item.resolve(scope)
+            if new_item is not TagBase.TAG_NONE:
+                new_element.append(new_item)
+        return new_element
+
+    def children(self):
+        return self.items
+
+    def emit(self, scope):
+        if scope is not None and scope.context.budget is not None:
+            scope.context.budget.add_nodes(len(self.items))
+        new_element = list()
+        for item in self.items:
+            new_item = item.emit(scope)
+            if new_item is not TagBase.TAG_NONE:
+                new_element.append(new_item)
+        return new_element
+
+
+def walk(node):
+    """
+    Generate a node and all its descendant nodes in depth first order.
+    :param node: Root node.
+    :type node: 'TemplateNode'
+    :return: Generator of nodes.
+    :rtype: 'generator'
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(node.children())))
+
+
+class CompiledTemplate(object):
+    """
+    A template compiled into a tree of template nodes. A compiled template
+    is bound to the tags of the engine that compiled it and can be resolved
+    by that engine repeatedly.
+    """
+    def __init__(self, root, source, location, owner):
+        """
+        Construct a compiled template.
+        :param root: Root node.
+        :type root: 'TemplateNode'
+        :param source: Template resource the template was loaded from.
+        :type source: 'str'
+        :param location: Location reported by the template loader. It is
+                         used to load templates referenced by relative paths.
+        :type location: 'str'
+        :param owner: The element resolver the nodes are bound to.
+        :type owner: 'ElementResolver'
+        """
+        self.root = root
+        self.source = source
+        self.location = location
+        self.owner = owner
@@ -0,0 +1,417 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import ast
+import math
+import operator
+import re
+from functools import lru_cache
+
+from .compiled_template import TemplateNode, LiteralNode, StringNode
+from .exception import TemplateEngineException
+from .util import json_to_str
+
+# Name standing for the n-th parameter reference while a condition is
+# parsed.
+_PLACEHOLDER = "_jsonteng_param_{}_"
+_PLACEHOLDER_PATTERN = re.compile(r'_jsonteng_param_(\d+)_')
+
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not
+}
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow
+}
+
+_UNARY_OPERATORS = {
+    ast.Not: operator.not_,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Invert: operator.invert
+}
+
+_DISPLAY_TYPES = {
+    ast.List: list,
+    ast.Tuple: tuple,
+    ast.Set: set
+}
+
+# Marks an expanded value which is not bound to the expression.
+_UNBOUND = type('Unbound', (), {})()
+
+
+class ConditionExpression(object):
+    """
+    A condition expression parsed once into a tree of evaluator functions.
+    The expression language is the subset of Python expressions made of
+    literals, list, tuple and set displays, comparisons including `in`,
+    `not in`, `is` and `is not`, unary operators, the arithmetic operators
+    `+`, `-`, `*`, `/`, `//`, `%` and `**`, conditional expressions, `and`,
+    `or` and parentheses. A parameter
+    reference is either an operand, whose expanded value is bound as a
+    typed literal, or a part of a string literal.
+    """
+    def __init__(self, evaluator, in_string):
+        """
+        Construct an expression.
+        :param evaluator: Function evaluating the expression with a list of
+                          bound parameter values.
+        :type evaluator: 'function'
+        :param in_string: For each parameter reference, True if it is a part
+                          of a string literal.
+        :type in_string: 'list'
+        """
+        self._evaluator = evaluator
+        self._in_string = in_string
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse(tokens):
+        """
+        Parse a condition tokenized by `StringResolver.tokenize`.
+        :param tokens: Tokens of a condition without nested parameter
+                       references.
+        :type tokens: 'tuple'
+        :return: Expression or None if the condition is not supported.
+        :rtype: 'ConditionExpression'
+        """
+        source = list()
+        count = 0
+        in_reference = False
+        for token in tokens:
+            if token is None:
+                if in_reference:
+                    return None
+                in_reference = True
+            elif type(token) is int:
+                source.append(_PLACEHOLDER.format(count))
+                count += 1
+                in_reference = False
+            elif not in_reference:
+                if _PLACEHOLDER_PATTERN.search(token):
+                    return None
+                source.append(token)
+        if in_reference or (count == 1 and len(source) == 1):
+            # mis-formed or replaced by the value of a parameter as a whole
+            return None
+        try:
+            # eval ignores leading spaces and tabs
+            tree = ast.parse(''.join(source).lstrip(' \t'), mode='eval')
+        except (SyntaxError, ValueError):
+            return None
+        in_string = [None] * count
+        try:
+            evaluator = ConditionExpression._compile(tree.body, in_string)
+        except TemplateEngineException:
+            return None
+        if None in in_string:
+            # a parameter reference is inside a comment
+            return None
+        return ConditionExpression(evaluator, in_string)
+
+    def bind(self, values):
+        """
+        Bind the resolved values of the parameter references to the
+        expression. An operand is bound to the literal its expanded value
+        is parsed as. Numbers, booleans and null are bound as they are.
+        :param values: Resolved values of the parameter references.
+        :type values: 'list'
+        :return: Bound values or None if an expanded value would change the
+                 structure of the expression.
+        :rtype: 'list'
+        """
+        bound_values = list()
+        for in_string, value in zip(self._in_string, values):
+            value_type = type(value)
+            if in_string:
+                value_str = json_to_str(value)
+                if not value_str.isprintable() or \
+                        any(c in value_str for c in '\'"\\'):
+                    return None
+                bound_values.append(value_str)
+            elif value_type is int or value_type is bool or value is None or \
+                    (value_type is float and math.isfinite(value)):
+                bound_values.append(value)
+            else:
+                value = ConditionExpression._parse_literal(json_to_str(value))
+                if value is _UNBOUND:
+                    return None
+                bound_values.append(value)
+        return bound_values
+
+    def evaluate(self, values):
+        """
+        Evaluate the expression.
+        :param values: Values returned by `bind`.
+        :type values: 'list'
+        :return: Result of the expression.
+        """
+        return self._evaluator(values)
+
+    @staticmethod
+    def evaluate_string(condition):
+        """
+        Evaluate a condition given as a whole, such as an expanded
+        condition. It is parsed as an expression without parameter
+        references. Recently parsed conditions are reused.
+        :param condition: A boolean or a boolean expression.
+        :type condition: 'str'
+        :return: Result of the condition.
+        :rtype: 'bool'
+        """
+        if isinstance(condition, bool):
+            return condition
+        if not isinstance(condition, str):
+            raise TemplateEngineException(
+                "Expression {} is not a boolean type".format(condition))
+        expression = ConditionExpression.parse((condition,))
+        if expression is None:
+            raise TemplateEngineException(
+                "Unsupported expression {}".format(condition))
+        result = expression.evaluate(())
+        if not isinstance(result, bool):
+            raise TemplateEngineException(
+                "Expression {} is not a boolean type".format(condition))
+        return result
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_literal(value_str):
+        """
+        Parse an expanded value placed as an operand.
+        :param value_str: Expanded value.
+        :type value_str: 'str'
+        :return: Literal value or _UNBOUND if the value is not a single
+                 literal.
+        """
+        if not value_str.isprintable() or '#' in value_str or \
+                '\\' in value_str:
+            return _UNBOUND
+        try:
+            tree = ast.parse(value_str.strip(' '), mode='eval')
+        except (SyntaxError, ValueError):
+            return _UNBOUND
+        if isinstance(tree.body, ast.Tuple) or \
+                not ConditionExpression._is_literal(tree.body):
+            # an unparenthesized tuple splits the expression
+            return _UNBOUND
+        try:
+            return ast.literal_eval(tree.body)
+        except (TypeError, ValueError):
+            return _UNBOUND
+
+    @staticmethod
+    def _is_literal(node):
+        if isinstance(node, ast.Constant):
+            return True
+        if isinstance(node, ast.UnaryOp):
+            return isinstance(node.op, (ast.USub, ast.UAdd)) and \
+                isinstance(node.operand, ast.Constant)
+        if type(node) in _DISPLAY_TYPES:
+            return all(ConditionExpression._is_literal(item)
+                       for item in node.elts)
+        return False
+
+    @staticmethod
+    def _compile(node, in_string):
+        """
+        Compile an expression node into an evaluator function.
+        :param node: Expression node.
+        :type node: 'ast.expr'
+        :param in_string: List updated with the kind of each parameter
+                          reference found.
+        :type in_string: 'list'
+        :return: Evaluator function.
+        :rtype: 'function'
+        """
+        compile_node = ConditionExpression._compile
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if isinstance(value, bytes) and \
+                    _PLACEHOLDER_PATTERN.search(value.decode('latin-1')):
+                raise TemplateEngineException("Unsupported expression.")
+            if isinstance(value, str) and _PLACEHOLDER_PATTERN.search(value):
+                parts = _PLACEHOLDER_PATTERN.split(value)
+                for index in range(1, len(parts), 2):
+                    parts[index] = int(parts[index])
+                    in_string[parts[index]] = True
+                return lambda values: ''.join(
+                    part if type(part) is str else values[part]
+                    for part in parts)
+            return lambda values: value
+        if isinstance(node, ast.Name):
+            m = _PLACEHOLDER_PATTERN.fullmatch(node.id)
+            if m is None:
+                raise TemplateEngineException("Unsupported expression.")
+            index = int(m.group(1))
+            in_string[index] = False
+            return lambda values: values[index]
+        if isinstance(node, ast.UnaryOp) and \
+                type(node.op) in _UNARY_OPERATORS:
+            unary_operator = _UNARY_OPERATORS[type(node.op)]
+            operand = compile_node(node.operand, in_string)
+            return lambda values: unary_operator(operand(values))
+        if isinstance(node, ast.BinOp) and \
+                type(node.op) in _BINARY_OPERATORS:
+            binary_operator = _BINARY_OPERATORS[type(node.op)]
+            left = compile_node(node.left, in_string)
+            right = compile_node(node.right, in_string)
+            return lambda values: binary_operator(left(values),
+                                                  right(values))
+        if isinstance(node, ast.BoolOp):
+            operands = [compile_node(value, in_string)
+                        for value in node.values]
+            is_and = isinstance(node.op, ast.And)
+
+            def evaluate_bool_op(values):
+                for operand in operands:
+                    result = operand(values)
+                    if bool(result) != is_and:
+                        break
+                return result
+            return evaluate_bool_op
+        if isinstance(node, ast.Compare) and \
+                all(type(op) in _COMPARE_OPERATORS for op in node.ops):
+            first = compile_node(node.left, in_string)
+            comparisons = [(_COMPARE_OPERATORS[type(op)],
+                            compile_node(comparator, in_string))
+                           for op, comparator in zip(node.ops,
+                                                     node.comparators)]
+
+            def evaluate_compare(values):
+                left = first(values)
+                for compare_operator, comparator in comparisons:
+                    right = comparator(values)
+                    result = compare_operator(left, right)
+                    if not result:
+                        break
+                    left = right
+                return result
+            return evaluate_compare
+        if isinstance(node, ast.IfExp):
+            test = compile_node(node.test, in_string)
+            body = compile_node(node.body, in_string)
+            orelse = compile_node(node.orelse, in_string)
+            return lambda values: body(values) if test(values) \
+                else orelse(values)
+        if type(node) in _DISPLAY_TYPES and \
+                not any(isinstance(item, ast.Starred) for item in node.elts):
+            display_type = _DISPLAY_TYPES[type(node)]
+            items = [compile_node(item, in_string) for item in node.elts]
+            return lambda values: display_type(
+                [item(values) for item in items])
+        raise TemplateEngineException("Unsupported expression.")
+
+
+class ConditionNode(TemplateNode):
+    """
+    A condition of a tag such as one-of or for-each. A string condition is
+    parsed once into a `ConditionExpression` and evaluated with the values
+    of its parameter references without compiling the expanded string.
+    A condition resolved as a whole, such as a single parameter reference,
+    and expanded values which do not fit the parsed expression, such as
+    "1 or 2", are evaluated by parsing the expanded condition. Both ways
+    give the same result.
+    """
+    __slots__ = ('node', 'expression', '_string_resolver')
+
+    def __init__(self, element, node, string_resolver):
+        """
+        Construct a condition node.
+        :param element: The condition the node is compiled from.
+        :type element: JSON data type
+        :param node: Compiled condition.
+        :type node: 'TemplateNode'
+        :param string_resolver: String resolver expanding parameters.
+        :type string_resolver: 'StringResolver'
+        """
+        super().__init__(element)
+        self.node = node
+        self.expression = None
+        if isinstance(node, StringNode):
+            self.expression = ConditionExpression.parse(node.tokens)
+        elif isinstance(node, LiteralNode) and isinstance(element, str):
+            self.expression = ConditionExpression.parse((element,))
+        self._string_resolver = string_resolver
+
+    def __reduce__(self):
+        """
+        Pickle the condition without the parsed expression, which is parsed
+        again when the node is unpickled.
+        """
+        return ConditionNode, (self.element, self.node, self._string_resolver)
+
+    def resolve(self, scope):
+        return self.node.resolve(scope)
+
+    def emit(self, scope):
+        return self.node.emit(scope)
+
+    def children(self):
+        return (self.node,)
+
+    def evaluate(self, scope):
+        """
+        Evaluate this condition.
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        :return: Result of the condition.
+        :rtype: 'bool'
+        """
+        if self.expression is None:
+            return ConditionExpression.evaluate_string(
+                self.node.resolve(scope))
+        values = ()
+        if isinstance(self.node, StringNode):
+            values, resolved_str = self._string_resolver.expand(
+                self.element, self.node.tokens, scope)
+            if values is None:
+                return ConditionExpression.evaluate_string(resolved_str)
+        bound_values = self.expression.bind(values)
+        if bound_values is None:
+            return ConditionExpression.evaluate_string(self._join(values))
+        result = self.expression.evaluate(bound_values)
+        if not isinstance(result, bool):
+            raise TemplateEngineException(
+                "Expression {} is not a boolean type".format(
+                    self._join(values)))
+        return result
+
+    def _join(self, values):
+        """
+        Build the expanded condition string.
+        :param values: Resolved values of the parameter references.
+        :type values: 'list'
+        :return: Expanded condition.
+        :rtype: 'str'
+        """
+        if not isinstance(self.node, StringNode):
+            return self.element
+        out = list()
+        value_iter = iter(values)
+        in_reference = False
+        for token in self.node.tokens:
+            if token is None:
+                in_reference = True
+            elif type(token) is int:
+                out.append(json_to_str(next(value_iter)))
+                in_reference = False
+            elif not in_reference:
+                out.append(token)
+        return ''.join(out)
@@ -1,11 +1,15 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
-import json
 from collections import OrderedDict
 from numbers import Number
 
+from .compiled_template import (TemplateNode, LiteralNode, ConstantNode,
+                                StringNode, ObjectNode, KeyTagNode,
+                                ArrayNode)
+from .condition import ConditionNode
 from .exception import TemplateEngineException
-from .tags.tag_base import TagBase
+from .render_context import RenderContext
+from .scope import ScopeChain
 from .tag_resolver import TagResolver
 from .string_resolver import StringResolver
 
@@ -14,73 +18,242 @@ class ElementResolver(object):
     """
     `ElementResolver` resolves a JSON element.
     """
-    def __init__(self, template_loader, stats):
+    # Shared IDs of tags start with TAG_ID_PREFIX followed by the tag name.
+    TAG_ID_PREFIX = "tag:"
+
+    def __init__(self, template_loader, stats, parallel_executor=None,
+                 copy_constants=False, compact=False, template_cache=None):
         """
         Construct a new ElementResolver.
         :param template_loader: TemplateLoader object for loading
                                 additional templates
         :type template_loader: 'TemplateLoader'
-        :param stats: Stats object collecting stats
+        :param stats: Stats object collecting stats of resolutions given a
+                      binding data list instead of a scope. Resolutions
+                      given a scope collect stats in its render context.
         :type stats: 'Stats'
+        :param parallel_executor: ParallelExecutor object for resolving
+                                  loops in parallel
+        :type parallel_executor: 'ParallelExecutor'
+        :param copy_constants: Copy constant JSON objects and arrays in the
+                               template on every resolution if true.
+                               Otherwise they are shared by resolutions.
+        :type copy_constants: 'bool'
+        :param compact: Build JSON objects as plain dicts sharing the key
+                        layout of their template object if true. Otherwise
+                        they are built as OrderedDicts.
+        :type compact: 'bool'
+        :param template_cache: Persistent cache of compiled templates used
+                               by `load_template`. Templates are compiled
+                               on every load if None.
+        :type template_cache: 'TemplateCache'
         """
-        self._string_resolver = StringResolver(self, stats)
-        self._tag_resolver = TagResolver(self, template_loader)
+        self._copy_constants = copy_constants
+        self._compact = compact
+        self._template_cache = template_cache
+        self._stats = stats
+        self._string_resolver = StringResolver(self)
+        self._tag_resolver = TagResolver(self, template_loader,
+                                         parallel_executor)
 
-    def resolve(self, element, binding_data_list):
+    def resolve(self, element, scope):
         """
         Resolve one element in a JSON template. The element could be one of
-        JSON data types. The resolution is recursive in a depth first manner.
+        JSON data types or a compiled template node. The resolution is
+        recursive in a depth first manner.
         :param element: A JSON object of one of JSON types.
         :type element: JSON data type
-        :param binding_data_list: Binding data list used to expand parameters
-                                  in the template element.
-        :type binding_data_list: 'list'
+        :param scope: Scope used to expand parameters in the template
+                      element. A binding data list is converted to a scope.
+        :type scope: Union['ScopeChain', 'list']
         :return: Resolved JSON element.
         :rtype: JSON data type
         """
-        if isinstance(element, str):
-            return self._string_resolver.resolve(element, binding_data_list)
-        elif isinstance(element, Number):
+        if not isinstance(scope, ScopeChain):
+            scope = ScopeChain(scope, RenderContext(self._stats))
+        if isinstance(element, TemplateNode):
+            return element.resolve(scope)
+        return self.compile(element).resolve(scope)
+
+    def emit(self, element, scope):
+        """
+        Resolve one element in a JSON template for output. Escape characters
+        are removed from the resolved JSON element.
+        :param element: A JSON object of one of JSON types.
+        :type element: JSON data type
+        :param scope: Scope used to expand parameters in the template
+                      element. A binding data list is converted to a scope.
+        :type scope: Union['ScopeChain', 'list']
+        :return: Resolved and unescaped JSON element.
+        :rtype: JSON data type
+        """
+        if not isinstance(scope, ScopeChain):
+            scope = ScopeChain(scope, RenderContext(self._stats))
+        if isinstance(element, TemplateNode):
+            return element.emit(scope)
+        return self.compile(element).emit(scope)
+
+    def compile(self, element):
+        """
+        Compile one element in a JSON template into a template node. Element
+        types, tags and tag names are classified once so that the node can be
+        resolved repeatedly without re-interpreting the element. Objects and
+        arrays without parameter references, tags and escape characters are
+        resolved once at compile time.
+        :param element: A JSON object of one of JSON types.
+        :type element: JSON data type
+        :return: Template node.
+        :rtype: 'TemplateNode'
+        """
+        if isinstance(element, TemplateNode):
             return element
+        elif isinstance(element, str):
+            if StringResolver.PARAM_START not in element:
+                return LiteralNode(element)
+            tokens = StringResolver.tokenize(element)
+            if None not in tokens:
+                # all parameter start markers are escaped
+                return LiteralNode(element)
+            return StringNode(element, tokens, self._string_resolver)
+        elif isinstance(element, Number):
+            return LiteralNode(element)
         elif isinstance(element, bool):
-            return element
+            return LiteralNode(element)
         elif element is None:
-            return element
+            return LiteralNode(element)
         elif isinstance(element, dict):
-            new_element = OrderedDict()
+            entries = list()
             for key, value in element.items():
                 if TagResolver.is_key_tag(key):
-                    if not isinstance(value, list):
-                        raise TemplateEngineException(
-                            "Value must be a list if name is a tag: \"{}\". Found \"{}\".".
-                            format(key, value))
-                    tag_temp = [key] + value
-                    resolved_tuple = self.resolve(
-                        tag_temp, binding_data_list)
-                    if isinstance(resolved_tuple, dict):
-                        new_element.update(resolved_tuple)
-                    elif resolved_tuple is not TagBase.TAG_NONE:
-                        raise TemplateEngineException(
-                            "Invalid tag result format for JSON"
-                            " object name tag: {} {} => {}.".
-                            format(json.dumps(key, separators=(',', ':')),
-                                   json.dumps(value, separators=(',', ':')),
-                                   json.dumps(resolved_tuple, separators=(',', ':'))))
+                    tag_node = self._tag_resolver.compile(
+                        [key] + value) if isinstance(value, list) else None
+                    entries.append((None, KeyTagNode((key, value), tag_node)))
                 else:
-                    new_key = self.resolve(key, binding_data_list)
-                    new_value = self.resolve(value, binding_data_list)
-                    if isinstance(new_key, str) and \
-                            new_value is not TagBase.TAG_NONE:
-                        new_element[new_key] = new_value
-            return new_element
+                    entries.append((self.compile(key), self.compile(value)))
+            node = ObjectNode(element, entries, self._compact)
+            if all(key_node is not None and
+                   ConstantNode.is_constant(key_node) and
+                   ConstantNode.is_constant(value_node)
+                   for key_node, value_node in entries):
+                return ConstantNode(element, node.resolve(None),
+                                    self._copy_constants)
+            return node
         elif isinstance(element, list):
             if TagResolver.is_tag(element):
-                return self._tag_resolver.resolve(element, binding_data_list)
-            new_element = list()
-            for item in element:
-                new_item = self.resolve(item, binding_data_list)
-                if new_item is not TagBase.TAG_NONE:
-                    new_element.append(new_item)
-            return new_element
+                return self._tag_resolver.compile(element)
+            node = ArrayNode(element, [self.compile(item) for item in element])
+            if all(ConstantNode.is_constant(item) for item in node.items):
+                return ConstantNode(element, node.resolve(None),
+                                    self._copy_constants)
+            return node
         raise TemplateEngineException(
             "Unknown data type {} of {}".format(type(element), element))
+
+    def load_template(self, template):
+        """
+        Load and compile a template. The template is entered in the template
+        loader and must be unloaded unless the compilation fails. A template
+        file found in the template cache is neither parsed nor compiled.
+        Compiled templates are added to the cache.
+        :param template: Template resource.
+        :type template: 'str'
+        :return: Root node of the template. Its element is the loaded
+                 template.
+        :rtype: 'TemplateNode'
+        """
+        template_loader = self._tag_resolver.get_template_loader()
+        template_cache = self._template_cache
+        validated = template_loader.get_validator(template) \
+            if template_cache is not None else None
+        if validated is not None:
+            location, validator = validated
+            root = template_cache.get(location, validator, self)
+            if root is not None:
+                template_loader.enter(template, location)
+                return root
+        template_json = template_loader.load(template)
+        try:
+            root = self.compile(template_json)
+        except Exception:
+            template_loader.unload(template)
+            raise
+        if validated is not None and \
+                template_loader.get_location() == location:
+            template_cache.put(location, validator, root, self)
+        return root
+
+    def get_compile_options(self):
+        """
+        Return the options template nodes are compiled with. Used to
+        validate compiled templates persisted by the template cache.
+        :return: A tuple of (copy constants, compact).
+        :rtype: 'tuple'
+        """
+        return self._copy_constants, self._compact
+
+    def get_tag_classes(self, tag_names):
+        """
+        Return the classes of tags. Used to validate compiled templates
+        persisted by the template cache against the tags they use.
+        :param tag_names: Tag names.
+        :type tag_names: 'list'
+        :return: A map of tag names to tag classes. The class of an unknown
+                 tag is None.
+        :rtype: 'OrderedDict'
+        """
+        tag_classes = OrderedDict()
+        for tag_name in tag_names:
+            tag = self._tag_resolver.get_tag(tag_name)
+            tag_classes[tag_name] = type(tag) if tag is not None else None
+        return tag_classes
+
+    def get_shared_objects(self):
+        """
+        Return the objects template nodes refer to without owning them, such
+        as resolvers and the tags constructed so far, by ID. Used to persist
+        compiled templates.
+        :return: A map of IDs to shared objects.
+        :rtype: 'dict'
+        """
+        shared_objects = {
+            "element_resolver": self,
+            "string_resolver": self._string_resolver,
+            "tag_resolver": self._tag_resolver,
+            "template_loader": self._tag_resolver.get_template_loader()}
+        parallel_executor = self._tag_resolver.get_parallel_executor()
+        if parallel_executor is not None:
+            shared_objects["parallel_executor"] = parallel_executor
+        for tag_name, tag in self._tag_resolver.get_tag_map().items():
+            shared_objects[ElementResolver.TAG_ID_PREFIX + tag_name] = tag
+        return shared_objects
+
+    def get_shared_object(self, shared_id):
+        """
+        Return a shared object by ID. A tag is constructed if it has not been
+        looked up yet.
+        :param shared_id: ID returned by `get_shared_objects`.
+        :type shared_id: 'str'
+        :return: Shared object.
+        """
+        if shared_id.startswith(ElementResolver.TAG_ID_PREFIX):
+            tag = self._tag_resolver.get_tag(
+                shared_id[len(ElementResolver.TAG_ID_PREFIX):])
+            if tag is None:
+                raise KeyError(shared_id)
+            return tag
+        return self.get_shared_objects()[shared_id]
+
+    def compile_condition(self, element):
+        """
+        Compile a condition of a tag into a condition node. A string
+        condition is parsed once so that it can be evaluated repeatedly
+        without compiling the expanded string.
+        :param element: A condition.
+        :type element: JSON data type
+        :return: Condition node.
+        :rtype: 'ConditionNode'
+        """
+        if isinstance(element, ConditionNode):
+            return element
+        return ConditionNode(element, self.compile(element),
+                             self._string_resolver)
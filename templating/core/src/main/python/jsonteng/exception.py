@@ -18,3 +18,43 @@ class UnresolvableParameterException(TemplateEngineException):
     Exception class for unresolvable parameters.
     """
     pass
+
+class CyclicReferenceException(TemplateEngineException):
+    """
+    Exception class for parameters whose values reference themselves. The
+    chain is the list of parameter names from the first occurrence of the
+    repeated parameter to the repeated reference.
+    """
+    def __init__(self, message, chain=None):
+        super().__init__(message)
+        self.chain = chain
+
+class LimitExceededException(TemplateEngineException):
+    """
+    Base exception class for resolutions exceeding a render limit.
+    """
+    pass
+
+class ExpansionLimitException(LimitExceededException):
+    """
+    Exception class for resolutions expanding too many parameters.
+    """
+    pass
+
+class DepthLimitException(LimitExceededException):
+    """
+    Exception class for resolutions nesting too deep.
+    """
+    pass
+
+class OutputLimitException(LimitExceededException):
+    """
+    Exception class for resolutions building too many JSON values.
+    """
+    pass
+
+class DeadlineExceededException(LimitExceededException):
+    """
+    Exception class for resolutions running past their deadline.
+    """
+    pass
@@ -0,0 +1,46 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+
+class Instrument(object):
+    """
+    Base class of instruments observing a resolution. An instrument is set
+    on the render context of a resolution and receives an `enter` callback
+    when a unit of work starts and a matching `exit` callback when it ends,
+    also if it fails. Callbacks are properly nested. Loops resolved in
+    worker processes are not observed item by item. By default the
+    callbacks do nothing.
+    """
+    # A template is loaded. The name is the template resource.
+    LOAD = "load"
+    # A template is resolved. The name is the template resource.
+    TEMPLATE = "template"
+    # A tag is processed. The name is the tag name.
+    TAG = "tag"
+    # A loop template is resolved for an item of a for-each tag. The name is
+    # the loop template resource.
+    ITERATION = "iteration"
+    # A string with parameter references is resolved. The name is the
+    # string.
+    STRING = "string"
+
+    def enter(self, kind, name):
+        """
+        Called when a unit of work starts.
+        :param kind: Kind of the work such as TAG.
+        :type kind: 'str'
+        :param name: Name of the template, tag or string. A template given
+                     as a JSON value is passed as is.
+        :type name: JSON data type
+        """
+        pass
+
+    def exit(self, kind, name):
+        """
+        Called when a unit of work ends.
+        :param kind: Kind of the work such as TAG.
+        :type kind: 'str'
+        :param name: Name passed to the matching `enter`.
+        :type name: JSON data type
+        """
+        pass
@@ -0,0 +1,153 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Same as urllib.request.url2pathname without importing urllib.request.
+if os.name == 'nt':
+    from nturl2path import url2pathname
+else:
+    from urllib.parse import unquote as url2pathname
+
+
+class JsonCache(object):
+    """
+    A bounded LRU cache of loaded JSON resources keyed by effective URL.
+    Entries of local files are revalidated by the modification time and
+    the size of the file on every lookup. Entries of other URLs expire after
+    a time to live and are not cached if no time to live is set. Cached JSON
+    objects are shared by all users of the cache and must not be modified.
+    A cache can be shared by loaders of multiple engines in one process.
+    """
+    # Validator of a resource which is not cached.
+    NOT_CACHEABLE = type('NotCacheable', (), {})()
+
+    def __init__(self, max_size=256, ttl=None):
+        """
+        Construct a cache.
+        :param max_size: Maximum number of cached resources.
+        :type max_size: 'int'
+        :param ttl: Seconds a resource other than a local file is cached.
+                    None if such resources are not cached.
+        :type ttl: 'float'
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # Each entry is a tuple of (JSON object, location, validator).
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, effective_url):
+        """
+        Return a cached resource if it is still valid.
+        :param effective_url: Effective URL of the resource.
+        :type effective_url: 'str'
+        :return: A tuple of (JSON object, location) or None if the resource
+                 is not cached.
+        :rtype: 'tuple'
+        """
+        with self._lock:
+            entry = self._entries.get(effective_url)
+        if entry is not None:
+            json_object, location, validator = entry
+            if self._is_valid(effective_url, validator):
+                with self._lock:
+                    self._hits += 1
+                    if effective_url in self._entries:
+                        self._entries.move_to_end(effective_url)
+                return json_object, location
+        with self._lock:
+            self._misses += 1
+            self._entries.pop(effective_url, None)
+        return None
+
+    def put(self, effective_url, json_object, location, validator):
+        """
+        Cache a loaded resource.
+        :param effective_url: Effective URL of the resource.
+        :type effective_url: 'str'
+        :param json_object: Loaded JSON object.
+        :type json_object: JSON object
+        :param location: Location of the resource reported by the loader.
+        :type location: 'str'
+        :param validator: Validator returned by `get_validator` before the
+                          resource is loaded so that a resource changed
+                          while loading is loaded again.
+        """
+        if validator is JsonCache.NOT_CACHEABLE:
+            return
+        with self._lock:
+            self._entries[effective_url] = (json_object, location, validator)
+            self._entries.move_to_end(effective_url)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def get_validator(self, effective_url):
+        """
+        Return the current validator of a resource.
+        :param effective_url: Effective URL of the resource.
+        :type effective_url: 'str'
+        :return: Validator or NOT_CACHEABLE.
+        """
+        path = JsonCache.get_local_path(effective_url)
+        if path is not None:
+            try:
+                file_stat = os.stat(path)
+            except (OSError, ValueError):
+                return None
+            return file_stat.st_mtime_ns, file_stat.st_size
+        if self._ttl is None:
+            return JsonCache.NOT_CACHEABLE
+        return time.monotonic() + self._ttl
+
+    def clear(self):
+        """
+        Remove all cached resources and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def get_stats(self):
+        """
+        Get cache stats.
+        :return: A dictionary of the number of hits, misses and cached
+                 resources.
+        :rtype: 'dict'
+        """
+        with self._lock:
+            return OrderedDict([("hits", self._hits),
+                                ("misses", self._misses),
+                                ("size", len(self._entries))])
+
+    def _is_valid(self, effective_url, validator):
+        if JsonCache.get_local_path(effective_url) is not None:
+            return self.get_validator(effective_url) == validator
+        return time.monotonic() < validator
+
+    @staticmethod
+    def get_local_path(effective_url):
+        """
+        Return the file path of a file URL.
+        :param effective_url: Effective URL.
+        :type effective_url: 'str'
+        :return: File path or None if the URL is not a file URL. The path is
+                 empty if the file is not on the local host.
+        :rtype: 'str'
+        """
+        if not effective_url.startswith("file://"):
+            return None
+        try:
+            parsed_url = urlparse(effective_url)
+        except ValueError:
+            return ""
+        if parsed_url.netloc not in ("", "localhost"):
+            return ""
+        return url2pathname(parsed_url.path)
@@ -3,14 +3,15 @@
 
 import sys
 import abc
-import urllib.request
-import codecs
+import threading
 import json
 from collections import OrderedDict
 from urllib.parse import urljoin
 from numbers import (Number)
 
+from .codec import get_codec
 from .exception import TemplateEngineException
+from .json_cache import JsonCache
 
 
 class JsonLoader(object):
@@ -40,25 +41,127 @@ class JsonLoader(object):
         """
         raise NotImplementedError
 
+    def get_location(self):
+        """
+        Return the location of the most recently loaded JSON resource. The
+        location is used by `enter` to restore the loader state for a
+        resource that has been loaded before.
+        :return: Location of the JSON resource.
+        :rtype: 'str'
+        """
+        return None
+
+    def get_validator(self, json_resource):
+        """
+        Return where a JSON resource would be loaded from relative to the
+        most recently loaded resource and a validator of its current content
+        without loading it. Persistent caches use them to reuse data derived
+        from the resource across processes. By default resources are not
+        validated.
+        :param json_resource: JSON resource
+        :type json_resource: 'str'
+        :return: A tuple of (location, validator) or None if the resource
+                 can not be validated. The location is the one reported by
+                 `get_location` once the resource is loaded.
+        :rtype: 'tuple'
+        """
+        return None
+
+    def enter(self, json_resource, location):
+        """
+        Restore the loader state for a JSON resource loaded before without
+        returning its content. It must be paired with `unload`. By default
+        the resource is loaded again.
+        :param json_resource: JSON resource
+        :type json_resource: 'str'
+        :param location: Location returned by `get_location` when the
+                         resource was loaded.
+        :type location: 'str'
+        """
+        self.load(json_resource)
+
+    def load_all(self, json_resources):
+        """
+        Load multiple JSON resources and unload them. By default the
+        resources are loaded one by one.
+        :param json_resources: JSON resources
+        :type json_resources: 'list'
+        :return: Loaded JSON objects in the order of the resources.
+        :rtype: 'list'
+        """
+        json_objects = list()
+        for json_resource in json_resources:
+            json_objects.append(self.load(json_resource))
+            self.unload(json_resource)
+        return json_objects
+
+    def prefetch(self, json_resources):
+        """
+        Hint that JSON resources are going to be loaded relative to the
+        most recently loaded JSON resource. A loader may fetch them ahead of
+        time. By default nothing is done.
+        :param json_resources: JSON resources
+        :type json_resources: 'list'
+        """
+        pass
+
 
 class DefaultJsonLoader(JsonLoader):
     """
     This loader can be used to load a JSON resource identified by URL and
     file path. It also maintains a directory stack so that nested templates
-    can be loaded by relative paths.
+    can be loaded by relative paths. Each thread has its own directory stack
+    so that a loader can be shared by threads resolving templates
+    concurrently. Loaded resources are cached. Loaded JSON objects must not
+    be modified.
     """
-    def __init__(self, root_path=None, verbose=False):
+    def __init__(self, root_path=None, verbose=False, cache=None,
+                 max_workers=None, codec=None):
         """
         Construct a default loader.
         :param root_path: The root port of a URL or file path.
         :type root_path: 'str'
         :param verbose: Print more info if true.
         :type verbose: 'bool'
+        :param cache: Cache of loaded resources which may be shared with
+                      other loaders. A new cache is created if None.
+        :type cache: 'JsonCache'
+        :param max_workers: Maximum number of threads loading resources
+                            concurrently. The default of
+                            `ThreadPoolExecutor` is used if None.
+        :type max_workers: 'int'
+        :param codec: JSON codec parsing the resources. The preferred codec
+                      installed is used if None.
+        :type codec: 'JsonCodec'
         """
         self._verbose = verbose
-        self._reader = codecs.getreader("utf-8")
-        self._dirstack = list()
-        self._dirstack.append(('root', root_path if root_path else ""))
+        self._cache = cache if cache is not None else JsonCache()
+        self._max_workers = max_workers
+        # Prefetched resources which are not cached. Each entry is removed
+        # when the resource is loaded.
+        self._prefetched = dict()
+        self._prefetch_lock = threading.Lock()
+        self._codec = codec if codec is not None else get_codec()
+        self._root_path = root_path if root_path else ""
+        self._local = threading.local()
+
+    def __getstate__(self):
+        """
+        Return the options and the directory stack of the current thread for
+        pickling, such as when the loader is sent to the worker processes of
+        parallel loops. Cached and prefetched resources are not included.
+        """
+        return (self._root_path, self._verbose, self._max_workers,
+                self._codec, list(self._get_dirstack()))
+
+    def __setstate__(self, state):
+        """
+        Restore a loader from the state returned by `__getstate__`. The
+        directory stack is restored for the thread unpickling the loader.
+        """
+        root_path, verbose, max_workers, codec, dirstack = state
+        self.__init__(root_path, verbose, None, max_workers, codec)
+        self._local.dirstack = dirstack
 
     def load(self, json_resource):
         """
@@ -68,28 +171,140 @@ class DefaultJsonLoader(JsonLoader):
         :return: Loaded JSON object
         :rtype: JSON object
         """
-        _, parent = self._dirstack[-1]
+        _, parent = self._get_dirstack()[-1]
+        json_object, location = self._fetch(json_resource, parent)
+        self._get_dirstack().append((json_resource, location))
+        return json_object
+
+    def load_all(self, json_resources):
+        """
+        Load multiple resources concurrently relative to the most recently
+        loaded resource. The resources are not pushed to the directory stack
+        and need not be unloaded.
+        :param json_resources: URLs or file paths
+        :type json_resources: 'list'
+        :return: Loaded JSON objects in the order of the resources.
+        :rtype: 'list'
+        """
+        _, parent = self._get_dirstack()[-1]
+        return [json_object for json_object, _ in
+                self._fetch_all(json_resources, parent, False)]
+
+    def prefetch(self, json_resources):
+        """
+        Load resources concurrently relative to the most recently loaded
+        resource so that they are not fetched when they are loaded. Errors
+        are ignored and reported when the resources are loaded.
+        :param json_resources: URLs or file paths
+        :type json_resources: 'list'
+        """
+        _, parent = self._get_dirstack()[-1]
+        json_resources = [json_resource for json_resource
+                          in OrderedDict.fromkeys(json_resources)
+                          if isinstance(json_resource, str)]
+        self._fetch_all(json_resources, parent, True)
+
+    def _fetch_all(self, json_resources, parent, prefetch):
+        """
+        Fetch resources concurrently.
+        :param json_resources: URLs or file paths
+        :type json_resources: 'list'
+        :param parent: Location the resources are relative to.
+        :type parent: 'str'
+        :param prefetch: Ignore errors and keep resources which are not
+                         cached until they are loaded if true.
+        :type prefetch: 'bool'
+        :return: A list of tuples of JSON object and location. The tuple
+                 is None for a resource failed to be prefetched.
+        :rtype: 'list'
+        """
+        def _fetch_one(json_resource):
+            if not prefetch:
+                return self._fetch(json_resource, parent)
+            # noinspection PyBroadException
+            try:
+                return self._fetch(json_resource, parent, True)
+            except Exception:
+                return None
+
+        if len(json_resources) < 2:
+            return [_fetch_one(json_resource)
+                    for json_resource in json_resources]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            return list(pool.map(_fetch_one, json_resources))
+
+    def _fetch(self, json_resource, parent, prefetch=False):
+        """
+        Fetch a resource from the prefetched resources, the cache or its
+        location.
+        :param json_resource: URL or file path
+        :type json_resource: 'str'
+        :param parent: Location the resource is relative to.
+        :type parent: 'str'
+        :param prefetch: Keep the resource until it is loaded if it is not
+                         cached.
+        :type prefetch: 'bool'
+        :return: A tuple of the JSON object and its location.
+        :rtype: 'tuple'
+        """
         effective_url = urljoin(parent, json_resource) \
             if parent else json_resource
+        if not isinstance(effective_url, str):
+            return self._load(json_resource, effective_url)
+        effective_url = DefaultJsonLoader._normalize_url(effective_url)
+        with self._prefetch_lock:
+            fetched = self._prefetched.pop(effective_url, None)
+        if fetched is not None:
+            return fetched
+        cached = self._cache.get(effective_url)
+        if cached is not None:
+            return cached
+        validator = self._cache.get_validator(effective_url)
+        fetched = self._load(json_resource, effective_url)
+        json_object, location = fetched
+        self._cache.put(effective_url, json_object, location, validator)
+        if prefetch and validator is JsonCache.NOT_CACHEABLE:
+            with self._prefetch_lock:
+                self._prefetched[effective_url] = fetched
+        return fetched
+
+    def _load(self, json_resource, effective_url):
+        """
+        Load a resource.
+        :param json_resource: URL or file path
+        :type json_resource: 'str'
+        :param effective_url: URL or file path relative to the parent.
+        :type effective_url: 'str'
+        :return: A tuple of the loaded JSON object and the effective URL. The
+                 effective URL is None if the resource is a JSON value.
+        :rtype: 'tuple'
+        """
+        import datetime
         # noinspection PyBroadException
         try:
-            if effective_url.startswith("file://"):
-                effective_url = effective_url.replace(
-                    "+", "/")
-            if effective_url.find("://") == -1:
-                effective_url = "file://" + effective_url
-            with urllib.request.urlopen(effective_url) as fp:
-                json_object = json.load(
-                    self._reader(fp), object_pairs_hook=OrderedDict)
-                self._dirstack.append(
-                    (json_resource, effective_url))
+            effective_url = DefaultJsonLoader._normalize_url(effective_url)
+            start_time = datetime.datetime.now()
+            local_path = JsonCache.get_local_path(effective_url)
+            if local_path:
+                fp = open(local_path, 'rb')
+            else:
+                # urllib.request takes longer to import than the engine.
+                import urllib.request
+                fp = urllib.request.urlopen(effective_url)
+            with fp:
+                json_object = self._codec.loads(fp.read())
+            if self._verbose:
+                print("Loaded {} in {}".format(
+                    effective_url, datetime.datetime.now() - start_time),
+                    file=sys.stderr)
+            return json_object, effective_url
         except Exception as e:
             if self._verbose:
                 print("Treat {} as JSON value.".format(effective_url),
                       file=sys.stderr)
             try:
-                json_object = json.loads(
-                    json_resource, object_pairs_hook=OrderedDict)
+                json_object = self._codec.loads(json_resource)
             except json.JSONDecodeError:
                 if type(json_resource) is str or \
                         type(json_resource) is Number:
@@ -97,8 +312,84 @@ class DefaultJsonLoader(JsonLoader):
                 else:
                     raise TemplateEngineException(
                         "Invalid template {}".format(json_resource))
-            self._dirstack.append((json_resource, None))
-        return json_object
+            return json_object, None
+
+    @staticmethod
+    def _normalize_url(effective_url):
+        """
+        Convert a file path to a file URL.
+        :param effective_url: URL or file path.
+        :type effective_url: 'str'
+        :return: URL
+        :rtype: 'str'
+        """
+        if effective_url.startswith("file://"):
+            effective_url = effective_url.replace(
+                "+", "/")
+        if effective_url.find("://") == -1:
+            effective_url = "file://" + effective_url
+        return effective_url
+
+    def _get_dirstack(self):
+        """
+        Return the directory stack of the current thread.
+        :return: A list of tuples of JSON resource and location.
+        :rtype: 'list'
+        """
+        dirstack = getattr(self._local, 'dirstack', None)
+        if dirstack is None:
+            dirstack = self._local.dirstack = [('root', self._root_path)]
+        return dirstack
+
+    def get_cache(self):
+        """
+        Return the cache of loaded resources.
+        :return: Cache
+        :rtype: 'JsonCache'
+        """
+        return self._cache
+
+    def get_location(self):
+        """
+        Return the effective URL of the most recently loaded JSON resource.
+        :return: Effective URL or None if the resource is a JSON value.
+        :rtype: 'str'
+        """
+        _, location = self._get_dirstack()[-1]
+        return location
+
+    def get_validator(self, json_resource):
+        """
+        Return the effective URL of a local file and its modification time
+        and size.
+        :param json_resource: URL or file path
+        :type json_resource: 'str'
+        :return: A tuple of (effective URL, validator) or None if the
+                 resource is not an existing local file.
+        :rtype: 'tuple'
+        """
+        _, parent = self._get_dirstack()[-1]
+        effective_url = urljoin(parent, json_resource) \
+            if parent else json_resource
+        if not isinstance(effective_url, str):
+            return None
+        effective_url = DefaultJsonLoader._normalize_url(effective_url)
+        if not JsonCache.get_local_path(effective_url):
+            return None
+        validator = self._cache.get_validator(effective_url)
+        if validator is None:
+            return None
+        return effective_url, validator
+
+    def enter(self, json_resource, location):
+        """
+        Push the JSON resource to the directory stack without loading it.
+        :param json_resource: URL or file path
+        :type json_resource: 'str'
+        :param location: Effective URL returned by `get_location`.
+        :type location: 'str'
+        """
+        self._get_dirstack().append((json_resource, location))
 
     def unload(self, json_resource):
         """
@@ -106,7 +397,7 @@ class DefaultJsonLoader(JsonLoader):
         :param json_resource: URL or file path
         :type json_resource: 'str'
         """
-        source, _ = self._dirstack.pop()
+        source, _ = self._get_dirstack().pop()
         if source != json_resource:
             raise TemplateEngineException(
                 "JSON resource loading is out of order")
@@ -0,0 +1,164 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+from contextlib import closing
+
+from .codec import get_codec
+from .compiled_template import (TemplateNode, LiteralNode, TagNode,
+                                ObjectNode, ArrayNode)
+from .tags.for_each_tag import ForEachTag
+from .tags.tag_base import TagBase
+from .util import unknown_data_type_error
+
+
+class JsonStreamWriter(object):
+    """
+    `JsonStreamWriter` resolves a compiled template and writes the JSON text
+    to a file object while the template is resolved. JSON objects with
+    literal keys, JSON arrays and for-each tags are written member by member.
+    Items of a for-each tag are written as soon as they are resolved. Other
+    elements are resolved as a whole before they are written. The text is
+    the same as the output of `json.dump` for the resolved template.
+    """
+    def __init__(self, fp, indent=None, separators=None, codec=None):
+        """
+        Construct a stream writer.
+        :param fp: File object the JSON text is written to.
+        :type fp: 'file'
+        :param indent: Indent level as in `json.dump`. None for a single line
+                       output.
+        :type indent: 'int'
+        :param separators: A tuple of (item separator, key separator) as in
+                           `json.dump`.
+        :type separators: 'tuple'
+        :param codec: JSON codec writing keys and values. The preferred codec
+                      installed is used if None.
+        :type codec: 'JsonCodec'
+        """
+        self._fp = fp
+        self._codec = codec if codec is not None else get_codec()
+        self._indent = indent
+        if separators is None:
+            separators = (',', ': ') if indent is not None else (', ', ': ')
+        self._item_separator, self._key_separator = separators
+
+    def write(self, node, scope):
+        """
+        Resolve a template node and write the resolved JSON text.
+        :param node: Template node to be resolved.
+        :type node: 'TemplateNode'
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        """
+        self._write_node(node, scope, 0)
+
+    def _write_node(self, node, scope, depth):
+        budget = scope.context.budget
+        if isinstance(node, ArrayNode):
+            if budget is not None:
+                budget.add_nodes(len(node.items))
+            self._write_items(self._iterate_array(node, scope), scope, depth)
+        elif isinstance(node, TagNode) and isinstance(node.tag, ForEachTag):
+            with closing(node.tag.iterate(
+                    node.tag_tokens, scope, True)) as items:
+                self._write_items(items, scope, depth)
+        elif isinstance(node, ObjectNode) and \
+                JsonStreamWriter._has_static_keys(node):
+            if budget is not None:
+                budget.add_nodes(len(node.entries))
+            self._write_members(node, scope, depth)
+        else:
+            value = node.emit(scope)
+            if value is TagBase.TAG_NONE:
+                raise unknown_data_type_error(value)
+            self._write_value(value, depth)
+
+    def _iterate_array(self, node, scope):
+        """
+        Generate array items. An item is either a node to be written by
+        `_write_node` or a resolved JSON element.
+        """
+        for item in node.items:
+            if JsonStreamWriter._is_streamable(item):
+                yield item
+            else:
+                new_item = item.emit(scope)
+                if new_item is not TagBase.TAG_NONE:
+                    yield new_item
+
+    def _write_items(self, items, scope, depth):
+        write = self._fp.write
+        count = 0
+        for item in items:
+            write('[' if count == 0 else self._item_separator)
+            write(self._newline(depth + 1))
+            if isinstance(item, TemplateNode):
+                self._write_node(item, scope, depth + 1)
+            else:
+                self._write_value(item, depth + 1)
+            count += 1
+        write(self._newline(depth) + ']' if count else '[]')
+
+    def _write_members(self, node, scope, depth):
+        write = self._fp.write
+        count = 0
+        for key_node, value_node in node.entries:
+            key = key_node.value
+            if JsonStreamWriter._is_streamable(value_node):
+                value = value_node
+            else:
+                value = value_node.emit(scope)
+                if value is TagBase.TAG_NONE:
+                    continue
+            write('{' if count == 0 else self._item_separator)
+            write(self._newline(depth + 1))
+            write(self._codec.dumps(key) + self._key_separator)
+            if value is value_node:
+                self._write_node(value_node, scope, depth + 1)
+            else:
+                self._write_value(value, depth + 1)
+            count += 1
+        write(self._newline(depth) + '}' if count else '{}')
+
+    def _write_value(self, value, depth):
+        text = self._codec.dumps(value, indent=self._indent,
+                                 separators=(self._item_separator,
+                                             self._key_separator))
+        if self._indent is not None and depth:
+            text = text.replace('\n', self._newline(depth))
+        self._fp.write(text)
+
+    def _newline(self, depth):
+        if self._indent is None:
+            return ''
+        return '\n' + ' ' * (self._indent * depth)
+
+    @staticmethod
+    def _is_streamable(node):
+        """
+        Check whether a node is written member by member. A streamable node
+        never resolves to nothing.
+        """
+        if isinstance(node, TagNode):
+            return isinstance(node.tag, ForEachTag)
+        return isinstance(node, ArrayNode) or \
+            (isinstance(node, ObjectNode) and
+             JsonStreamWriter._has_static_keys(node))
+
+    @staticmethod
+    def _has_static_keys(node):
+        """
+        Check whether all keys of an object node are known before it is
+        resolved. A key resolved from a parameter or merged from a key tag
+        may replace an earlier member in place, so such objects are resolved
+        as a whole.
+        """
+        keys = set()
+        for key_node, _ in node.entries:
+            if not isinstance(key_node, LiteralNode) or \
+                    not isinstance(key_node.element, str):
+                return False
+            if key_node.value in keys:
+                return False
+            keys.add(key_node.value)
+        return True
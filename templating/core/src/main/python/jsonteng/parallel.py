@@ -0,0 +1,258 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import itertools
+import os
+import threading
+from collections import OrderedDict
+
+from .exception import DeadlineExceededException
+
+from .element_resolver import ElementResolver
+from .render_context import RenderContext
+from .stats import Stats
+from .tags.for_each_tag import ForEachTag
+from .tags.tag_base import TagBase
+from .tags.tag_map import add_tag, get_tag_classes
+
+# Loop states of a worker process by loop ID, most recently used last.
+_loop_workers = OrderedDict()
+# Maximum number of loop states kept by a worker process. Loops resolved
+# concurrently by threads of an engine share its worker processes.
+_MAX_LOOP_WORKERS = 4
+
+
+class ParallelExecutor(object):
+    """
+    `ParallelExecutor` resolves for-each loops in a pool of worker processes.
+    The data list is split into chunks. Each worker resolves the loop
+    template for the items of a chunk and the results are concatenated in
+    the order of the data list. The worker processes are started by the
+    first parallel loop and serve the following loops. The state of a loop
+    is sent with the first chunks and kept by the workers while the loop
+    runs.
+    """
+    # Tag labels selecting the execution mode of a for-each tag.
+    PARALLEL_LABEL = "parallel"
+    SERIAL_LABEL = "serial"
+
+    def __init__(self, enabled=False, max_workers=None, threshold=1000,
+                 compact=False):
+        """
+        Construct a parallel executor. Stats collected by workers are merged
+        into the render context of the loop scope. Workers are given the
+        limits left to the resolution and their expansions and results are
+        charged to its budget.
+        :param enabled: Resolve all for-each loops in parallel if true.
+                        Otherwise only for-each tags labeled "parallel" are
+                        resolved in parallel.
+        :type enabled: 'bool'
+        :param max_workers: Number of worker processes. The number of CPUs
+                            is used if None.
+        :type max_workers: 'int'
+        :param threshold: Data lists shorter than the threshold are resolved
+                          serially.
+        :type threshold: 'int'
+        :param compact: Workers build JSON objects as plain dicts if true.
+        :type compact: 'bool'
+        """
+        self._enabled = enabled
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._threshold = threshold
+        self._compact = compact
+        self._lock = threading.Lock()
+        self._loop_ids = itertools.count()
+        self._pool = None
+        self._pool_pid = None
+
+    def shutdown(self):
+        """
+        Stop the worker processes. They are started again by the next
+        parallel loop.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _get_pool(self):
+        """
+        Return the pool of worker processes of this process.
+        :return: Pool of worker processes.
+        :rtype: 'ProcessPoolExecutor'
+        """
+        with self._lock:
+            # a forked process can not use the pool of its parent
+            if self._pool is None or self._pool_pid != os.getpid():
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._max_workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def accepts(self, label, item_count):
+        """
+        Check whether a for-each loop should be resolved in parallel.
+        :param label: Label of the for-each tag.
+        :type label: 'str'
+        :param item_count: Number of items in the data list.
+        :type item_count: 'int'
+        :return: True if the loop should be resolved in parallel.
+        :rtype: 'bool'
+        """
+        if label == ParallelExecutor.PARALLEL_LABEL:
+            enabled = True
+        elif label == ParallelExecutor.SERIAL_LABEL:
+            enabled = False
+        else:
+            enabled = self._enabled
+        return enabled and item_count >= self._threshold
+
+    def resolve_items(self, template_json, condition, scope, data_list,
+                      template_loader, unescape=False):
+        """
+        Resolve a loop template for each item of a data list in worker
+        processes. The template loader, added tags and binding data are
+        pickled and sent to the worker processes.
+        :param template_json: Loop template.
+        :type template_json: JSON object
+        :param condition: Filter condition or None.
+        :type condition: JSON object
+        :param scope: Scope of the loop.
+        :type scope: 'ScopeChain'
+        :param data_list: Loop data list.
+        :type data_list: 'list'
+        :param template_loader: Template loader with the loop template
+                                loaded.
+        :type template_loader: 'JsonLoader'
+        :param unescape: Resolve templates for output if true.
+        :type unescape: 'bool'
+        :return: Resolved templates.
+        :rtype: 'list'
+        """
+        item_count = len(data_list)
+        chunk_size = max(1, -(-item_count // (self._max_workers * 4)))
+        budget = scope.context.budget
+        limits = budget.get_remaining_limits() if budget is not None \
+            else None
+        # imported only if loops run in parallel
+        import pickle
+        from concurrent.futures import TimeoutError
+        from concurrent.futures.process import BrokenProcessPool
+        loop_id = next(self._loop_ids)
+        loop_state = pickle.dumps(
+            (template_json, condition, scope, template_loader,
+             get_tag_classes(), unescape, limits, self._compact),
+            pickle.HIGHEST_PROTOCOL)
+        chunks = [(start, data_list[start:start + chunk_size])
+                  for start in range(0, item_count, chunk_size)]
+        pool = self._get_pool()
+        # Each worker is likely to take one of the first chunks. A chunk
+        # taken by a worker without the loop state is sent again with it.
+        futures = [
+            pool.submit(_resolve_chunk, loop_id,
+                        loop_state if index < self._max_workers else None,
+                        *chunk)
+            for index, chunk in enumerate(chunks)]
+
+        def _wait(future):
+            try:
+                return future.result(budget.get_remaining_time()
+                                     if budget is not None else None)
+            except TimeoutError:
+                raise DeadlineExceededException(
+                    "Resolution did not finish in {} seconds.".format(
+                        budget.limits.timeout))
+
+        try:
+            resolved_json = list()
+            for index, chunk in enumerate(chunks):
+                result = _wait(futures[index])
+                if result is None:
+                    futures[index] = pool.submit(
+                        _resolve_chunk, loop_id, loop_state, *chunk)
+                    result = _wait(futures[index])
+                resolved_items, tag_none_indices, parameter_map, \
+                    cache_stats = result
+                for none_index in tag_none_indices:
+                    resolved_items[none_index] = TagBase.TAG_NONE
+                resolved_json.extend(resolved_items)
+                scope.context.stats.merge(parameter_map, cache_stats)
+                if budget is not None:
+                    budget.expand(sum(parameter_map.values()))
+                    budget.add_nodes(len(resolved_items))
+        except BrokenProcessPool:
+            # a worker process died, the next loop starts a new pool
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+        return resolved_json
+
+
+class _LoopWorker(object):
+    """
+    Loop state of a worker process.
+    """
+    def __init__(self, template_json, condition, scope, template_loader,
+                 tag_classes, unescape, limits, compact):
+        for tag_name, tag_class in tag_classes.items():
+            add_tag(tag_name, tag_class)
+        self._stats = Stats()
+        element_resolver = ElementResolver(template_loader, self._stats,
+                                           compact=compact)
+        self._template_node = element_resolver.compile(template_json)
+        self._condition_node = \
+            element_resolver.compile_condition(condition) \
+            if condition is not None else None
+        self._scope = scope
+        self._unescape = unescape
+        self._limits = limits
+
+    def resolve_chunk(self, start_index, data_list):
+        self._stats.clear()
+        # each chunk may use the limits left when the loop started
+        self._scope.context = RenderContext(self._stats, limits=self._limits)
+        resolved_items = list(ForEachTag.iterate_items(
+            self._template_node, self._condition_node, self._scope,
+            data_list, start_index, self._unescape))
+        # TAG_NONE is not preserved by pickling.
+        tag_none_indices = [
+            index for index, item in enumerate(resolved_items)
+            if item is TagBase.TAG_NONE]
+        for index in tag_none_indices:
+            resolved_items[index] = None
+        return resolved_items, tag_none_indices, \
+            dict(self._stats.get_stats()), dict(self._stats.get_cache_stats())
+
+
+def _resolve_chunk(loop_id, loop_state, start_index, data_list):
+    """
+    Resolve a chunk of a loop in a worker process.
+    :param loop_id: ID of the loop.
+    :type loop_id: 'int'
+    :param loop_state: Pickled arguments of `_LoopWorker` or None if the
+                       worker is expected to have the loop state.
+    :type loop_state: 'bytes'
+    :param start_index: Index of the first item of the chunk.
+    :type start_index: 'int'
+    :param data_list: Items of the chunk.
+    :type data_list: 'list'
+    :return: Resolved chunk or None if the loop state is needed.
+    :rtype: 'tuple'
+    """
+    worker = _loop_workers.get(loop_id)
+    if worker is None:
+        if loop_state is None:
+            return None
+        import pickle
+        worker = _loop_workers[loop_id] = \
+            _LoopWorker(*pickle.loads(loop_state))
+        while len(_loop_workers) > _MAX_LOOP_WORKERS:
+            _loop_workers.popitem(last=False)
+    else:
+        _loop_workers.move_to_end(loop_id)
+    return worker.resolve_chunk(start_index, data_list)
@@ -0,0 +1,135 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import re
+from functools import lru_cache
+
+# A key with a list index such as "x[1]".
+_INDEXED_KEY_PATTERN = re.compile(r"([a-zA-Z0-9]+)\[([0-9]+)\]")
+
+
+class ParamReference(object):
+    """
+    A parsed parameter name. The name is matched against binding data as a
+    whole string. If the whole string does not match any, the prefix of the
+    first dot is used to find a sub parameter map and the rest of the string
+    is matched against the sub parameter map. This process is repeated until
+    a value is found. For example, parameter "x.y.z" is matched against the
+    binding data. If the binding data contains "x.y.z", its value is returned.
+    Else, "x" is used to match a sub parameter map in the binding data. If a
+    sub parameter map is found, "y.z" is used to match a parameter in the sub
+    parameter map. A key in the form of "x[1]" matches the item at index 1 of
+    list "x". Escaped dots are not separators.
+    """
+    # Returned by `find` when the parameter is not found.
+    NOT_FOUND = type('NotFound', (), {})()
+
+    __slots__ = ('name', 'steps', 'keys')
+
+    def __init__(self, param_name):
+        """
+        Parse a parameter name.
+        :param param_name: Parameter name.
+        :type param_name: 'str'
+        """
+        self.name = param_name
+        separator_indices = \
+            ParamReference._collect_separator_indices(param_name)
+        # Each step is a tuple of (key, index) matching the rest of the name
+        # followed by (key, index) matching the prefix before the next
+        # separator. The prefix is None for the last step.
+        steps = list()
+        token_start = 0
+        for separator_index in separator_indices:
+            steps.append(
+                ParamReference._parse_key(param_name[token_start:]) +
+                ParamReference._parse_key(
+                    param_name[token_start:separator_index]))
+            token_start = separator_index + 1
+        steps.append(
+            ParamReference._parse_key(param_name[token_start:]) +
+            (None, None))
+        self.steps = tuple(steps)
+        # Keys of binding data the search starts with.
+        self.keys = frozenset(key for key in self.steps[0][0:3:2]
+                              if key is not None)
+
+    @staticmethod
+    @lru_cache(maxsize=16384)
+    def parse(param_name):
+        """
+        Return a cached reference for a parameter name.
+        :param param_name: Parameter name.
+        :type param_name: 'str'
+        :return: Parameter reference.
+        :rtype: 'ParamReference'
+        """
+        return ParamReference(param_name)
+
+    def find(self, binding_data):
+        """
+        Find the parameter value in this binding data. The result could be
+        None which is a valid JSON value null.
+        :param binding_data: Parameter value map.
+        :type binding_data: 'dict'
+        :return: JSON value or NOT_FOUND.
+        """
+        not_found = ParamReference.NOT_FOUND
+        next_data = binding_data
+        for key, index, token, token_index in self.steps:
+            if not isinstance(next_data, dict):
+                return not_found
+            value = next_data.get(key, not_found)
+            if index is not None and value is not not_found:
+                value = value[index] if isinstance(value, list) and \
+                    index < len(value) else not_found
+            if value is not not_found:
+                return value
+            if token is None:
+                return not_found
+            next_data = next_data.get(token, not_found)
+            if token_index is not None and next_data is not not_found:
+                next_data = next_data[token_index] \
+                    if isinstance(next_data, list) and \
+                    token_index < len(next_data) else not_found
+            if next_data is not_found:
+                return not_found
+        return not_found
+
+    @staticmethod
+    def _parse_key(key):
+        """
+        Split a key into a name and a list index.
+        :param key: Key to be parsed.
+        :type key: 'str'
+        :return: A tuple of name and index. The index is None if the key
+                 does not refer to a list item.
+        :rtype: 'tuple'
+        """
+        m = _INDEXED_KEY_PATTERN.search(key)
+        if m:
+            return m.group(1), int(m.group(2))
+        return key, None
+
+    @staticmethod
+    def _collect_separator_indices(param_name):
+        """
+        Locate all parameter name separators (dots).
+        :param param_name: Parameter name.
+        :type param_name: 'str'
+        :return: A list of parameter separator indices.
+        :rtype: 'list'
+        """
+        indices = list()
+        str_len = len(param_name)
+        i = 0
+        while i < str_len:
+            c = param_name[i]
+            if c == '\\':
+                i += 2
+            elif c == '.':
+                indices.append(i)
+                i += 1
+            else:
+                i += 1
+        return indices
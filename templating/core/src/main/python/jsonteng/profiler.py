@@ -0,0 +1,120 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import json
+import time
+from collections import OrderedDict
+
+from .instrument import Instrument
+
+# Longest name shown in reports and folded stacks.
+_MAX_NAME_LENGTH = 60
+
+
+class Profiler(Instrument):
+    """
+    `Profiler` measures where the time of resolutions is spent. Call counts,
+    cumulative time and self time, which excludes the time of nested work,
+    are aggregated per kind and name, such as per tag name and per template.
+    The time of each stack of nested work is kept for flame graphs. A
+    profiler may observe multiple resolutions one after another.
+    """
+    def __init__(self, timer=time.perf_counter):
+        """
+        Construct a profiler.
+        :param timer: Function returning the current time in seconds.
+        :type timer: 'function'
+        """
+        self._timer = timer
+        # Each frame is a list of [key, start time, time of nested work].
+        self._frames = list()
+        # Each entry is a list of [count, cumulative time, self time].
+        self._entries = OrderedDict()
+        # Number of active frames of each key to handle recursion.
+        self._active = dict()
+        # Self time of each stack of keys.
+        self._stacks = OrderedDict()
+
+    def enter(self, kind, name):
+        key = (kind, Profiler._format_name(name))
+        self._frames.append([key, self._timer(), 0.0])
+        self._active[key] = self._active.get(key, 0) + 1
+
+    def exit(self, kind, name):
+        end_time = self._timer()
+        stack = tuple(frame[0] for frame in self._frames)
+        key, start_time, nested_time = self._frames.pop()
+        elapsed = end_time - start_time
+        self_time = elapsed - nested_time
+        if self._frames:
+            self._frames[-1][2] += elapsed
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[2] += self_time
+        self._active[key] -= 1
+        if not self._active[key]:
+            # only the outermost frame of a recursion adds cumulative time
+            entry[1] += elapsed
+        self._stacks[stack] = self._stacks.get(stack, 0.0) + self_time
+
+    def get_stats(self):
+        """
+        Get aggregated profile data sorted by cumulative time.
+        :return: A list of dictionaries with kind, name, count, cumulative
+                 time and self time in seconds.
+        :rtype: 'list'
+        """
+        stats = list()
+        for (kind, name), (count, cumulative, self_time) in \
+                self._entries.items():
+            stats.append(OrderedDict([("kind", kind), ("name", name),
+                                      ("count", count),
+                                      ("cumulative", cumulative),
+                                      ("self", self_time)]))
+        stats.sort(key=lambda entry: entry["cumulative"], reverse=True)
+        return stats
+
+    def write_report(self, fp):
+        """
+        Write aggregated profile data as a table.
+        :param fp: File object the table is written to.
+        :type fp: 'file'
+        """
+        fp.write("{:>8} {:>12} {:>12}  {:<9} {}\n".format(
+            "count", "cumulative", "self", "kind", "name"))
+        for entry in self.get_stats():
+            fp.write("{:>8} {:>12.6f} {:>12.6f}  {:<9} {}\n".format(
+                entry["count"], entry["cumulative"], entry["self"],
+                entry["kind"], entry["name"]))
+
+    def write_folded(self, fp):
+        """
+        Write the self time of each stack in the folded stack format read
+        by flame graph tools. Each line is a stack of frames separated by
+        semicolons followed by the time in microseconds.
+        :param fp: File object the stacks are written to.
+        :type fp: 'file'
+        """
+        for stack, self_time in self._stacks.items():
+            fp.write("{} {}\n".format(
+                ';'.join("{}:{}".format(kind, name.replace(';', ','))
+                         for kind, name in stack),
+                int(round(self_time * 1000000))))
+
+    @staticmethod
+    def _format_name(name):
+        """
+        Convert a name to a single line of limited length.
+        :param name: Name passed to `enter`.
+        :type name: JSON data type
+        :return: Formatted name.
+        :rtype: 'str'
+        """
+        if not isinstance(name, str):
+            name = json.dumps(name, separators=(',', ':'), default=str)
+        name = ' '.join(name.split())
+        if len(name) > _MAX_NAME_LENGTH:
+            name = name[:_MAX_NAME_LENGTH - 3] + "..."
+        return name
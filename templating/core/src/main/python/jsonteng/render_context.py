@@ -0,0 +1,54 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+from collections import OrderedDict
+
+from .render_limits import RenderBudget
+from .stats import Stats
+
+
+class RenderContext(object):
+    """
+    State of one resolution of a template. A context is created for each
+    resolution so that an engine, its compiled templates and its tags hold
+    no per-resolution state and can be shared by threads resolving
+    templates concurrently. The context is reachable from the scope of the
+    resolution.
+    """
+    def __init__(self, stats=None, instrument=None, limits=None):
+        """
+        Construct a render context.
+        :param stats: Stats object collecting stats of the resolution. A new
+                      one is created if None.
+        :type stats: 'Stats'
+        :param instrument: Instrument observing the resolution, such as a
+                           `Profiler`, or None.
+        :type instrument: 'Instrument'
+        :param limits: Limits of the resolution or None if it is not
+                       limited.
+        :type limits: 'RenderLimits'
+        """
+        self.stats = stats if stats is not None else Stats()
+        self.instrument = instrument
+        self.budget = RenderBudget(limits) if limits is not None else None
+        # Parameters whose values are being resolved. Each entry is a tuple
+        # of the parameter name and the depth of the scope.
+        self.references = list()
+        # Scope of the resolution. It is set when the resolution starts.
+        self.scope = None
+        self._duplicated_parameters = None
+
+    def get_duplicated_parameters(self):
+        """
+        Get duplicated parameters in the binding data list of the scope.
+        They are found on the first call.
+        :return: Duplicated parameters with the key to be the parameter name
+                 and value to be a list of parameter values.
+        :rtype: 'dict'
+        """
+        if self._duplicated_parameters is None:
+            if self.scope is None:
+                return OrderedDict()
+            self._duplicated_parameters = \
+                self.scope.get_duplicated_parameters()
+        return self._duplicated_parameters
@@ -0,0 +1,129 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import time
+
+from .exception import (ExpansionLimitException, DepthLimitException,
+                        OutputLimitException, DeadlineExceededException)
+
+
+class RenderLimits(object):
+    """
+    Limits of one resolution of a template protecting a process from
+    templates and binding data which expand without bounds. A limit of None
+    is not enforced. Limits can be shared by resolutions.
+    """
+    def __init__(self, max_expansions=None, max_depth=None, max_nodes=None,
+                 timeout=None):
+        """
+        Construct render limits.
+        :param max_expansions: Maximum number of parameter expansions.
+        :type max_expansions: 'int'
+        :param max_depth: Maximum nesting depth of parameter values resolved
+                          within parameter values and for-each loops.
+        :type max_depth: 'int'
+        :param max_nodes: Maximum number of JSON values built in objects,
+                          arrays and for-each results. A value taken from
+                          binding data as a whole counts once.
+        :type max_nodes: 'int'
+        :param timeout: Seconds a resolution may take.
+        :type timeout: 'float'
+        """
+        self.max_expansions = max_expansions
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.timeout = timeout
+
+
+class RenderBudget(object):
+    """
+    Usage of the limits by one resolution. The deadline starts when the
+    budget is created. Each charge checks the deadline.
+    """
+    def __init__(self, limits, timer=time.monotonic):
+        """
+        Construct a budget.
+        :param limits: Limits of the resolution.
+        :type limits: 'RenderLimits'
+        :param timer: Function returning the current time in seconds.
+        :type timer: 'function'
+        """
+        self.limits = limits
+        self.expansions = 0
+        self.nodes = 0
+        self._timer = timer
+        self._deadline = timer() + limits.timeout \
+            if limits.timeout is not None else None
+
+    def expand(self, count=1):
+        """
+        Charge parameter expansions.
+        :param count: Number of expansions.
+        :type count: 'int'
+        """
+        self.expansions += count
+        max_expansions = self.limits.max_expansions
+        if max_expansions is not None and self.expansions > max_expansions:
+            raise ExpansionLimitException(
+                "Expanded more than {} parameters.".format(max_expansions))
+        self.check_deadline()
+
+    def add_nodes(self, count):
+        """
+        Charge JSON values built for the result.
+        :param count: Number of JSON values.
+        :type count: 'int'
+        """
+        self.nodes += count
+        max_nodes = self.limits.max_nodes
+        if max_nodes is not None and self.nodes > max_nodes:
+            raise OutputLimitException(
+                "Built more than {} JSON values.".format(max_nodes))
+        self.check_deadline()
+
+    def check_depth(self, depth):
+        """
+        Check a nesting depth.
+        :param depth: Nesting depth about to be entered.
+        :type depth: 'int'
+        """
+        max_depth = self.limits.max_depth
+        if max_depth is not None and depth > max_depth:
+            raise DepthLimitException(
+                "Nested deeper than {} levels.".format(max_depth))
+        self.check_deadline()
+
+    def check_deadline(self):
+        """
+        Check whether the deadline has passed.
+        """
+        if self._deadline is not None and self._timer() > self._deadline:
+            raise DeadlineExceededException(
+                "Resolution did not finish in {} seconds.".format(
+                    self.limits.timeout))
+
+    def get_remaining_time(self):
+        """
+        Get the time left until the deadline.
+        :return: Seconds left or None if there is no deadline.
+        :rtype: 'float'
+        """
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - self._timer())
+
+    def get_remaining_limits(self):
+        """
+        Get the limits left to this resolution, such as for work delegated
+        to another process.
+        :return: Remaining limits.
+        :rtype: 'RenderLimits'
+        """
+        limits = self.limits
+        return RenderLimits(
+            None if limits.max_expansions is None
+            else limits.max_expansions - self.expansions,
+            limits.max_depth,
+            None if limits.max_nodes is None
+            else limits.max_nodes - self.nodes,
+            self.get_remaining_time())
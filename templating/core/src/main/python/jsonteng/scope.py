@@ -0,0 +1,249 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+from collections import OrderedDict
+
+from .param_reference import ParamReference
+from .render_context import RenderContext
+from .value_cache import ValueCache
+
+# Marks a parameter name which has not been looked up yet.
+_UNKNOWN = type('Unknown', (), {})()
+
+
+class BindingIndex(object):
+    """
+    An index of parameter names defined by one binding data layer. The index
+    is built lazily. Each name is looked up once by its parameter reference
+    and the result, including a miss, is cached. The layer is flattened into
+    dotted names only when `flatten` is called. An index can be reused by
+    resolutions against the same layer so that it is flattened once. The
+    binding data must not be modified while it is indexed.
+    """
+    __slots__ = ('data', '_names', '_terminals', '_paths')
+
+    def __init__(self, binding_data):
+        """
+        Construct an index.
+        :param binding_data: Binding data layer.
+        :type binding_data: 'dict'
+        """
+        self.data = binding_data
+        self._names = dict()
+        self._terminals = None
+        self._paths = None
+
+    def find(self, reference):
+        """
+        Find a parameter in this layer. Once the layer is flattened, a name
+        without list indices and escapes which is not a dotted name of the
+        layer is a miss without searching the binding data.
+        :param reference: Parameter reference.
+        :type reference: 'ParamReference'
+        :return: JSON value or ParamReference.NOT_FOUND.
+        """
+        name = reference.name
+        value = self._names.get(name, _UNKNOWN)
+        if value is _UNKNOWN:
+            paths = self._paths
+            if paths is not None and name not in paths and \
+                    '[' not in name and '\\' not in name:
+                value = ParamReference.NOT_FOUND
+            else:
+                value = reference.find(self.data)
+            self._names[name] = value
+        return value
+
+    def flatten(self):
+        """
+        Flatten nested objects of this layer into dotted parameter names.
+        The result is computed once.
+        :return: A map of the dotted name of each value other than an object
+                 to the list of its values in this layer. A name has
+                 multiple values if keys containing dots collide with nested
+                 keys.
+        :rtype: 'OrderedDict'
+        """
+        if self._terminals is None:
+            terminals = OrderedDict()
+            paths = set()
+            BindingIndex._flatten(None, None, self.data, terminals, paths)
+            self._terminals = terminals
+            self._paths = paths
+        return self._terminals
+
+    @staticmethod
+    def find_duplicates(binding_indices):
+        """
+        Find parameters defined more than once by binding data layers.
+        :param binding_indices: Binding indices of the layers.
+        :type binding_indices: 'list'
+        :return: A dictionary with key of duplicated parameters and value of
+                 duplicated assignments.
+        :rtype: 'dict'
+        """
+        binding_data_map = OrderedDict()
+        for binding_index in binding_indices:
+            for param, values in binding_index.flatten().items():
+                if param in binding_data_map:
+                    binding_data_map[param].extend(values)
+                else:
+                    binding_data_map[param] = list(values)
+        dup_map = OrderedDict()
+        for param, values in binding_data_map.items():
+            if len(values) > 1:
+                dup_map[param] = values
+        return dup_map
+
+    @staticmethod
+    def _flatten(super_name, super_path, sub_binding_data, terminals, paths):
+        """
+        Flatten a nested object.
+        :param super_name: Parameter name of the object. Names under an
+                           empty key are not prefixed.
+        :param super_path: Dotted keys of the object or None for the root.
+        :param sub_binding_data: Nested object.
+        :param terminals: Map of parameter names to values to be updated.
+        :param paths: Set of dotted keys to be updated.
+        """
+        if not isinstance(sub_binding_data, dict):
+            return
+        for key, value in sub_binding_data.items():
+            name = super_name + '.' + key if super_name else key
+            path = super_path + '.' + key if super_path is not None else key
+            paths.add(path)
+            if isinstance(value, dict):
+                BindingIndex._flatten(name, path, value, terminals, paths)
+            elif name in terminals:
+                terminals[name].append(value)
+            else:
+                terminals[name] = [value]
+
+
+class ScopeChain(object):
+    """
+    Scope used to resolve parameters. Base layers are built from the binding
+    data list and searched from index 0 until the first match. The layer
+    defining a name is remembered so that a name is searched in the base
+    layers only once. Frames pushed by tags such as for-each form a stack in
+    front of the base layers and are searched from the top of the stack.
+    """
+    # Parameter name of the loop index of a loop frame.
+    LOOP_INDEX_NAME = "_index_"
+
+    def __init__(self, binding_data_list, context=None):
+        """
+        Construct a scope chain.
+        :param binding_data_list: Binding data list. A binding index in the
+                                  list is used as is so that its lookups are
+                                  shared with other scopes.
+        :type binding_data_list: 'list'
+        :param context: Render context of the resolution using the scope.
+                        A new context is created if None.
+        :type context: 'RenderContext'
+        """
+        self.context = context if context is not None else RenderContext()
+        self._layers = [binding_data if isinstance(binding_data, BindingIndex)
+                        else BindingIndex(binding_data)
+                        for binding_data in binding_data_list]
+        # Each frame is a list of [binding data, loop index]. The loop index
+        # is None if the frame is not a loop frame.
+        self._frames = list()
+        self._names = dict()
+        # Resolved parameter values
+        self.cache = ValueCache(self._frames, ScopeChain.LOOP_INDEX_NAME)
+
+    def __getstate__(self):
+        """
+        Return the binding data and the frames of this scope for pickling.
+        Lookup caches and the render context are not included.
+        """
+        return ([layer.data for layer in self._layers],
+                [list(frame) for frame in self._frames])
+
+    def __setstate__(self, state):
+        """
+        Restore a scope from the state returned by `__getstate__`.
+        """
+        binding_data_list, frames = state
+        self.__init__(binding_data_list)
+        self._frames.extend(frames)
+
+    def get_duplicated_parameters(self):
+        """
+        Find parameters defined more than once by the base layers.
+        :return: A dictionary with key of duplicated parameters and value of
+                 duplicated assignments.
+        :rtype: 'dict'
+        """
+        return BindingIndex.find_duplicates(self._layers)
+
+    def push(self, binding_data, index=None):
+        """
+        Push a frame on top of the frame stack.
+        :param binding_data: Binding data of the frame.
+        :type binding_data: 'dict'
+        :param index: Loop index exposed as parameter "_index_". None if the
+                      frame is not a loop frame.
+        :type index: 'int'
+        """
+        budget = self.context.budget
+        if budget is not None:
+            budget.check_depth(
+                len(self._frames) + len(self.context.references) + 1)
+        self._frames.append([binding_data, index])
+
+    def set_frame(self, binding_data, index=None):
+        """
+        Replace the binding data and the loop index of the top frame. A loop
+        pushes one frame and updates it for each iteration.
+        :param binding_data: Binding data of the frame.
+        :type binding_data: 'dict'
+        :param index: Loop index exposed as parameter "_index_". None if the
+                      frame is not a loop frame.
+        :type index: 'int'
+        """
+        frame = self._frames[-1]
+        frame[0] = binding_data
+        frame[1] = index
+        self.cache.invalidate(len(self._frames) - 1)
+
+    def pop(self):
+        """
+        Remove the top frame.
+        """
+        self._frames.pop()
+        self.cache.invalidate(len(self._frames))
+
+    def get_depth(self):
+        """
+        Get the number of frames.
+        :return: Number of frames.
+        :rtype: 'int'
+        """
+        return len(self._frames)
+
+    def find(self, reference):
+        """
+        Find the first value of a parameter in the scope.
+        :param reference: Parameter reference.
+        :type reference: 'ParamReference'
+        :return: JSON value or ParamReference.NOT_FOUND.
+        """
+        not_found = ParamReference.NOT_FOUND
+        for binding_data, index in reversed(self._frames):
+            if index is not None and \
+                    reference.name == ScopeChain.LOOP_INDEX_NAME:
+                return index
+            value = reference.find(binding_data)
+            if value is not not_found:
+                return value
+        value = self._names.get(reference.name, _UNKNOWN)
+        if value is _UNKNOWN:
+            value = not_found
+            for layer in self._layers:
+                value = layer.find(reference)
+                if value is not not_found:
+                    break
+            self._names[reference.name] = value
+        return value
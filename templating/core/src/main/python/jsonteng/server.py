@@ -0,0 +1,387 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import stat
+import sys
+import traceback
+from collections import OrderedDict
+from contextlib import redirect_stderr, redirect_stdout
+
+from jsonteng.template_engine import main as cli_main
+
+
+class EnginePool(object):
+    """
+    A bounded LRU pool of loaders and engines kept warm across renders. A
+    loader keeps its cache of parsed binding data and an engine keeps the
+    loader cache of its templates and its indexed env binding data. Engines
+    are closed when they are evicted or the pool is closed.
+    """
+    def __init__(self, max_size=16):
+        """
+        Construct a pool.
+        :param max_size: Maximum number of pooled objects.
+        :type max_size: 'int'
+        """
+        self._max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key, factory):
+        """
+        Get a pooled object or create it.
+        :param key: Key of the object made of the options it is created
+                    with.
+        :type key: 'tuple'
+        :param factory: Function creating the object if it is not pooled.
+        :type factory: 'function'
+        :return: Pooled object.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = factory()
+            while len(self._entries) > self._max_size:
+                _, evicted = self._entries.popitem(last=False)
+                EnginePool._close_entry(evicted)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def close(self):
+        """
+        Close and remove all pooled objects.
+        """
+        while self._entries:
+            _, entry = self._entries.popitem(last=False)
+            EnginePool._close_entry(entry)
+
+    @staticmethod
+    def _close_entry(entry):
+        """
+        Close a pooled object if it can be closed, such as an engine with
+        the worker processes of its parallel loops.
+        :param entry: Pooled object.
+        """
+        close = getattr(entry, "close", None)
+        if close is not None:
+            close()
+
+
+class RenderServer(object):
+    """
+    `RenderServer` runs CLI renders for thin clients so that they do not
+    pay for the interpreter startup, the imports and cold caches. A request
+    is a JSON object in one line with the CLI arguments in "args" and
+    optionally the standard input of the render in "input". The response
+    is a stream of JSON arrays, one per line, of ["out", text] and
+    ["err", text] written while the template is resolved and a final
+    ["exit", status]. On a Unix domain socket each connection carries one
+    request. The standard input of the render is read from the connection
+    after the request unless "input" is given. Connections are served by a
+    pool of worker processes, each with its own warm engines.
+
+    A render reads any template and binding data file the server user can
+    read. The socket is therefore created accessible only by the server
+    user, and every client which can connect to it is trusted as that
+    user.
+    """
+    # Size of the output buffered before it is sent to the client.
+    FLUSH_SIZE = 65536
+
+    def __init__(self, max_engines=16):
+        """
+        Construct a render server.
+        :param max_engines: Maximum number of warm loaders and engines of
+                            each worker.
+        :type max_engines: 'int'
+        """
+        self._engine_pool = EnginePool(max_engines)
+
+    def close(self):
+        """
+        Close the warm engines of this process.
+        """
+        self._engine_pool.close()
+
+    def handle(self, request, stdin, fp):
+        """
+        Run a render request.
+        :param request: Request with "args" and optionally "input".
+        :type request: 'dict'
+        :param stdin: Standard input of the render if the request has no
+                      "input".
+        :type stdin: 'file'
+        :param fp: Binary file object the response is written to.
+        :type fp: 'file'
+        :return: Exit status.
+        :rtype: 'int'
+        """
+        out = _FrameWriter(fp, "out", RenderServer.FLUSH_SIZE)
+        err = _FrameWriter(fp, "err", RenderServer.FLUSH_SIZE)
+        if "input" in request:
+            stdin = io.StringIO(request["input"])
+        saved_stdin = sys.stdin
+        sys.stdin = stdin
+        try:
+            with redirect_stdout(out), redirect_stderr(err):
+                status = self._run(request.get("args"))
+        finally:
+            sys.stdin = saved_stdin
+        out.flush()
+        err.flush()
+        _write_frame(fp, "exit", status)
+        return status
+
+    def _run(self, args):
+        """
+        Run the CLI with warm engines.
+        :param args: CLI arguments.
+        :type args: 'list'
+        :return: Exit status.
+        :rtype: 'int'
+        """
+        # noinspection PyBroadException
+        try:
+            if not isinstance(args, list) or \
+                    not all(isinstance(arg, str) for arg in args):
+                raise ValueError("Invalid arguments {}".format(args))
+            cli_main(args, self._engine_pool)
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            print(e.code, file=sys.stderr)
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return 0
+
+    def serve_stdio(self, in_fp, fp):
+        """
+        Serve requests read line by line from a file object until it ends.
+        The standard input of a render is empty unless it is given in the
+        request.
+        :param in_fp: Binary file object requests are read from.
+        :type in_fp: 'file'
+        :param fp: Binary file object responses are written to.
+        :type fp: 'file'
+        """
+        try:
+            for line in in_fp:
+                if not line.strip():
+                    continue
+                request = _parse_request(line, fp)
+                if request is not None:
+                    self.handle(request, io.StringIO(), fp)
+                fp.flush()
+        finally:
+            self.close()
+
+    def serve_socket(self, path, workers=None):
+        """
+        Serve connections to a Unix domain socket until the process is
+        interrupted or terminated. A stale socket file is replaced and the
+        socket file is removed at exit. The socket is readable and writable
+        only by the server user.
+        :param path: Path of the socket file. It must not exist or be a
+                     socket.
+        :type path: 'str'
+        :param workers: Number of worker processes. The number of CPUs is
+                        used if None. Connections are served by this
+                        process if forking is not supported.
+        :type workers: 'int'
+        """
+        try:
+            path_stat = os.lstat(path)
+        except FileNotFoundError:
+            path_stat = None
+        if path_stat is not None:
+            if not stat.S_ISSOCK(path_stat.st_mode):
+                raise FileExistsError(
+                    "{} exists and is not a socket".format(path))
+            os.remove(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # create the socket file with mode 0600
+            umask = os.umask(0o177)
+            try:
+                listener.bind(path)
+            finally:
+                os.umask(umask)
+            listener.listen(socket.SOMAXCONN)
+            workers = workers or os.cpu_count() or 1
+            if "fork" not in multiprocessing.get_all_start_methods():
+                workers = 1
+            if workers == 1:
+                self._accept(listener)
+                return
+            context = multiprocessing.get_context("fork")
+            processes = [context.Process(target=self._accept,
+                                         args=(listener,))
+                         for _ in range(workers)]
+            for process in processes:
+                process.start()
+            signal.signal(signal.SIGTERM, _interrupt)
+            try:
+                for process in processes:
+                    process.join()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # the socket was not bound
+                pass
+
+    def _accept(self, listener):
+        """
+        Serve connections one by one until the process is interrupted or
+        terminated. The warm engines are closed at exit.
+        :param listener: Listening socket shared by the workers.
+        :type listener: 'socket'
+        """
+        signal.signal(signal.SIGTERM, _interrupt)
+        try:
+            while True:
+                connection, _ = listener.accept()
+                with connection:
+                    self._serve_connection(connection)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def _serve_connection(self, connection):
+        """
+        Serve the request of a connection.
+        :param connection: Client connection.
+        :type connection: 'socket'
+        """
+        # noinspection PyBroadException
+        try:
+            with connection.makefile("rb") as in_fp, \
+                    connection.makefile("wb") as fp:
+                request = _parse_request(in_fp.readline(), fp)
+                if request is None:
+                    return
+                # The CLI may close its standard input when it exits.
+                stdin = io.TextIOWrapper(in_fp, encoding="utf-8")
+                self.handle(request, stdin, fp)
+        except OSError:
+            # the client has gone
+            pass
+
+
+class _FrameWriter(io.TextIOBase):
+    """
+    Text file object writing the text as response frames of one kind.
+    """
+    def __init__(self, fp, kind, flush_size):
+        super().__init__()
+        self._fp = fp
+        self._kind = kind
+        self._flush_size = flush_size
+        self._buffer = list()
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self._flush_size:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            _write_frame(self._fp, self._kind, ''.join(self._buffer))
+            self._buffer.clear()
+            self._size = 0
+            self._fp.flush()
+
+
+def _write_frame(fp, kind, value):
+    """
+    Write a response frame.
+    :param fp: Binary file object.
+    :type fp: 'file'
+    :param kind: "out", "err" or "exit".
+    :type kind: 'str'
+    :param value: Text or exit status.
+    """
+    fp.write(json.dumps([kind, value]).encode("ascii") + b"\n")
+
+
+def _parse_request(line, fp):
+    """
+    Parse a request line. An invalid request is answered with an error.
+    :param line: Request line.
+    :type line: 'bytes'
+    :param fp: Binary file object responses are written to.
+    :type fp: 'file'
+    :return: Request or None if it is invalid.
+    :rtype: 'dict'
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        request = e
+    if isinstance(request, dict):
+        return request
+    _write_frame(fp, "err", "Invalid request {!r}: {}\n".format(
+        line, request))
+    _write_frame(fp, "exit", 2)
+    fp.flush()
+    return None
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(args=None):
+    """
+    Run a render server.
+    """
+    parser = argparse.ArgumentParser(
+        description='JSON template engine render server.')
+    parser.add_argument('-s', '--socket', required=False,
+                        help="Unix domain socket to listen on. Requests are"
+                             " read from stdin and responses written to"
+                             " stdout if not given")
+    parser.add_argument('-w', '--workers', required=False, type=int,
+                        help="number of worker processes serving the"
+                             " socket. The number of CPUs by default")
+    parser.add_argument('--max-engines', required=False, type=int,
+                        default=16,
+                        help="number of warm loaders and engines kept by"
+                             " each worker")
+    params = parser.parse_args(args=args)
+    server = RenderServer(params.max_engines)
+    if params.socket:
+        try:
+            server.serve_socket(params.socket, params.workers)
+        except FileExistsError as e:
+            parser.error(str(e))
+    else:
+        server.serve_stdio(sys.stdin.buffer, sys.stdout.buffer)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,15 @@ from collections import OrderedDict
 
 class Stats(object):
     """
-    `Stats` collects stats for how many times a parameter is expanded.
+    `Stats` collects stats for how many times a parameter is expanded and
+    how often resolved parameter values are reused.
     """
     def __init__(self):
         """
         Construct Stats.
         """
         self._parameter_map = OrderedDict()
+        self._cache_stats = OrderedDict([("hits", 0), ("misses", 0)])
 
     def update_stats(self, parameter):
         """
@@ -25,6 +27,32 @@ class Stats(object):
         else:
             self._parameter_map[parameter] = 1
 
+    def update_cache_stats(self, hit):
+        """
+        Update the counter of resolved parameter values found or not found
+        in the value cache.
+        :param hit: True if the resolved value is found.
+        :type hit: 'bool'
+        """
+        self._cache_stats["hits" if hit else "misses"] += 1
+
+    def merge(self, parameter_map, cache_stats=None):
+        """
+        Add parameter usage counters collected by another Stats object.
+        :param parameter_map: Parameter usage counters.
+        :type parameter_map: 'dict'
+        :param cache_stats: Value cache counters or None.
+        :type cache_stats: 'dict'
+        """
+        for parameter, count in parameter_map.items():
+            if parameter in self._parameter_map:
+                self._parameter_map[parameter] += count
+            else:
+                self._parameter_map[parameter] = count
+        if cache_stats is not None:
+            for name, count in cache_stats.items():
+                self._cache_stats[name] += count
+
     def get_stats(self):
         """
         Get the stats object
@@ -33,8 +61,18 @@ class Stats(object):
         """
         return self._parameter_map
 
+    def get_cache_stats(self):
+        """
+        Get the value cache counters.
+        :return: Numbers of hits and misses.
+        :rtype: 'dict'
+        """
+        return self._cache_stats
+
     def clear(self):
         """
         Reset the stats counters.
         """
         self._parameter_map.clear()
+        for name in self._cache_stats:
+            self._cache_stats[name] = 0
@@ -2,39 +2,271 @@
 # SPDX-License-Indentifier: Apache-2.0
 
 import re
+from functools import lru_cache
 
-from .exception import InvalidReferenceException, TemplateEngineException, \
-    UnresolvableParameterException
+from .exception import TemplateEngineException, \
+    UnresolvableParameterException, CyclicReferenceException
+from .param_reference import ParamReference
 from .tags.tag_base import TagBase
+from .util import unescape_json, unescape_segment, unescape_string, \
+    copy_json, json_to_str
+
+# Escaped characters, parameter start markers and parameter end markers.
+_MARKER_PATTERN = re.compile(r'\\[\s\S]?|\$\{|\}')
+_SPECIAL_CHAR_PATTERN = re.compile(r'[\\$}]')
 
 
 class StringResolver(object):
     """
     Resolve a string by parameter expansions.
     """
-    def __init__(self, element_resolver, stats):
+    # Parameter references start with PARAM_START
+    PARAM_START = "${"
+
+    def __init__(self, element_resolver):
         """
-        Constructs a new string resolver.
+        Constructs a new string resolver. Stats are collected in the render
+        context of the scope.
         :param element_resolver: Element resolver
         :type element_resolver: 'ElementResolver'
-        :param stats: Stats object for stats collection.
-        :type stats: 'Stats'
         """
         self._element_resolver = element_resolver
-        self._stats = stats
 
-    def resolve(self, str_data, binding_data_list):
+    def resolve(self, str_data, scope):
         """
         Resolve a string by parameter expansions.
         :param str_data: String to be resolved.
         :type str_data: 'str'
-        :param binding_data_list: Binding data list
-        :type binding_data_list: 'list'
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
         :return: JSON values
         """
-        str_len = len(str_data)
+        return self.render(str_data, StringResolver.tokenize(str_data),
+                           scope)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def tokenize(str_data):
+        """
+        Split a string into tokens in a single pass. A token is a literal
+        segment, None for a parameter start marker "${" or the index after
+        the closing "}" of a parameter reference. Nested references produce
+        nested markers. Escaped characters are kept in literal segments.
+        :param str_data: String to be tokenized.
+        :type str_data: 'str'
+        :return: Tokens.
+        :rtype: 'tuple'
+        """
+        tokens = list()
+        depth = 0
+        literal_start = 0
+        for m in _MARKER_PATTERN.finditer(str_data):
+            marker = m.group()
+            if marker == StringResolver.PARAM_START:
+                depth += 1
+            elif marker == '}' and depth:
+                depth -= 1
+            else:
+                # escaped character or "}" outside of a reference
+                continue
+            if literal_start < m.start():
+                tokens.append(str_data[literal_start:m.start()])
+            tokens.append(None if marker == StringResolver.PARAM_START
+                          else m.end())
+            literal_start = m.end()
+        if literal_start < len(str_data):
+            tokens.append(str_data[literal_start:])
+        return tuple(tokens)
+
+    def render(self, str_data, tokens, scope, texts=None):
+        """
+        Resolve a tokenized string. Each parameter reference is expanded
+        once and the result is joined at the end. If the value of a
+        reference replaces the whole string, the value is returned as is.
+        If unescaped tokens are given, the result is unescaped. Unescaped
+        literal segments and expanded values are joined for the result while
+        parameter names are still built from the escaped segments. If a
+        segment can not be unescaped separately, the joined string is
+        unescaped instead.
+        :param str_data: String the tokens are created from.
+        :type str_data: 'str'
+        :param tokens: Tokens returned by `tokenize`.
+        :type tokens: 'tuple'
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        :param texts: Tokens with literal segments unescaped or None.
+        :type texts: 'tuple'
+        :return: JSON values
+        """
+        out = list()
+        # unescaped segments outside of parameter references
+        text = list()
+        joinable = True
         stack = list()
-        i = 0
+        last = len(tokens) - 1
+        for index, token in enumerate(tokens):
+            if token is None:
+                stack.append(len(out))
+                out.append(StringResolver.PARAM_START)
+            elif type(token) is int:
+                param_start = stack.pop()
+                param_name = ''.join(out[param_start + 1:])
+                del out[param_start:]
+                value = self._resolve_param(param_name, scope)
+                if index == last and not any(out):
+                    # if the value replaces the whole string,
+                    # return the value
+                    return self._resolve_value(
+                        param_name, value, scope, texts is not None)
+                value_str = self._resolve_value(param_name, value, scope)
+                if type(value_str) is not str:
+                    value_str = json_to_str(value_str)
+                next_char = str_data[token:token + 1]
+                if not StringResolver._is_inert(
+                        value_str, bool(stack), next_char):
+                    # the value changes how the rest of the string is
+                    # parsed. Reprocess the string from the value.
+                    positions = list()
+                    str_prefix_len = 0
+                    for out_index, segment in enumerate(out):
+                        if stack and out_index in stack:
+                            positions.append(str_prefix_len)
+                        str_prefix_len += len(segment)
+                    resolved_str = self._rescan(
+                        ''.join(out) + value_str + str_data[token:],
+                        str_prefix_len, positions, scope)
+                    if texts is not None:
+                        return unescape_json(resolved_str)
+                    return resolved_str
+                out.append(value_str)
+                if texts is not None and not stack and joinable:
+                    segment = unescape_segment(value_str)
+                    joinable = segment is not None
+                    text.append(segment)
+            else:
+                out.append(token)
+                if texts is not None and not stack and joinable:
+                    segment = texts[index]
+                    joinable = segment is not None
+                    text.append(segment)
+        if stack:
+            raise TemplateEngineException(
+                'Mis-formed parameterized string "{}".'.format(''.join(out)))
+        if texts is not None:
+            if joinable:
+                return ''.join(text)
+            return unescape_string(''.join(out))
+        return ''.join(out)
+
+    def expand(self, str_data, tokens, scope):
+        """
+        Expand the parameter references of a tokenized string without
+        nested references as `render` does but return the resolved values
+        instead of the joined string. The string must not be a single
+        parameter reference.
+        :param str_data: String the tokens are created from.
+        :type str_data: 'str'
+        :param tokens: Tokens returned by `tokenize`.
+        :type tokens: 'tuple'
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        :return: A tuple of (resolved values, None) or, if a value changes
+                 how the rest of the string is parsed, (None, resolved
+                 string).
+        :rtype: 'tuple'
+        """
+        values = list()
+        out = list()
+        param_name = None
+        for token in tokens:
+            if token is None:
+                param_name = ''
+            elif type(token) is int:
+                value = self._resolve_value(
+                    param_name, self._resolve_param(param_name, scope),
+                    scope)
+                value_str = json_to_str(value)
+                if not StringResolver._is_inert(
+                        value_str, False, str_data[token:token + 1]):
+                    str_prefix = ''.join(out)
+                    return None, self._rescan(
+                        str_prefix + value_str + str_data[token:],
+                        len(str_prefix), list(), scope)
+                values.append(value)
+                out.append(value_str)
+                param_name = None
+            elif param_name is not None:
+                param_name = token
+            else:
+                out.append(token)
+        return values, None
+
+    @staticmethod
+    def _is_scalar(value):
+        """
+        Check whether a value resolves to itself.
+        :param value: Parameter value.
+        :type value: JSON data type
+        :return: True if the value is a number, a boolean, null or a string
+                 without parameter references.
+        :rtype: 'bool'
+        """
+        value_type = type(value)
+        if value_type is str:
+            return StringResolver.PARAM_START not in value
+        return value is None or value_type is int or value_type is float \
+            or value_type is bool
+
+    @staticmethod
+    def _is_inert(value_str, nested, next_char):
+        """
+        Check whether an expanded value is parsed as plain text when it is
+        placed back into the string. A value is not inert if it contains
+        a parameter reference, closes an enclosing reference or escapes the
+        character after it.
+        :param value_str: Expanded value.
+        :type value_str: 'str'
+        :param nested: True if the value is inside a parameter reference.
+        :type nested: 'bool'
+        :param next_char: The character after the value.
+        :type next_char: 'str'
+        :return: True if the value is inert.
+        :rtype: 'bool'
+        """
+        if not _SPECIAL_CHAR_PATTERN.search(value_str):
+            return True
+        escaped_end = 0
+        for m in _MARKER_PATTERN.finditer(value_str):
+            marker = m.group()
+            if marker == StringResolver.PARAM_START:
+                return False
+            elif marker == '}':
+                if nested:
+                    return False
+            elif len(marker) == 1:
+                # a trailing escape character escapes next_char
+                return False
+            else:
+                escaped_end = m.end()
+        return not (next_char == '{' and value_str.endswith('$') and
+                    escaped_end != len(value_str))
+
+    def _rescan(self, str_data, i, stack, scope):
+        """
+        Resolve a string by scanning it character by character from index
+        i. After each expansion the string is rebuilt and scanned again from
+        the start of the expanded value.
+        :param str_data: String to be resolved.
+        :type str_data: 'str'
+        :param i: Index to start scanning.
+        :type i: 'int'
+        :param stack: Start indices of open parameter references before i.
+        :type stack: 'list'
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        :return: JSON values
+        """
+        str_len = len(str_data)
         while i < str_len:
             c = str_data[i]
             if c == '\\':
@@ -56,7 +288,7 @@ class StringResolver(object):
                     param_start = stack.pop()
                     param_name = str_data[param_start+2:i-1]
                     # resolve the param.
-                    value = self._resolve_param(param_name, binding_data_list)
+                    value = self._resolve_param(param_name, scope)
                     # update string.
                     sub_str_before_param = str_data[:param_start]
                     sub_str_after_param = str_data[i:] \
@@ -65,8 +297,8 @@ class StringResolver(object):
                         # if the value is only part of the original
                         # string, treat it as a string and reprocess
                         new_str = sub_str_before_param + \
-                                  str(self._element_resolver.resolve(
-                                      value, binding_data_list)) + \
+                                  json_to_str(self._resolve_value(
+                                      param_name, value, scope)) + \
                                   sub_str_after_param
                         str_data = new_str
                         str_len = len(str_data)
@@ -74,8 +306,8 @@ class StringResolver(object):
                     else:
                         # if the value replaces the whole string,
                         # return the value
-                        return self._element_resolver.resolve(
-                            value, binding_data_list)
+                        return self._resolve_value(
+                            param_name, value, scope)
             else:
                 i += 1
         if stack:
@@ -83,113 +315,92 @@ class StringResolver(object):
                 'Mis-formed parameterized string "{}".'.format(str_data))
         return str_data
 
-    def _resolve_param(self, param_name, binding_data_list):
+    def _resolve_param(self, param_name, scope):
         """
-        Resove a parameter by returning its value found in binding_data_list.
+        Resove a parameter by returning its value found in the scope.
         :param param_name: Parameter name.
         :type param_name: 'str'
-        :param binding_data_list: Binding data list.
-        :type binding_data_list: 'list'
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
         :return: JSON value
         :rtype: JSON object
         """
-        separator_indices = \
-            StringResolver._collect_separator_indices(param_name)
-        for binding_data in binding_data_list:
-            try:
-                value = StringResolver._find_param(
-                    param_name, separator_indices, binding_data)
-                self._stats.update_stats(param_name)
-                return value
-            except InvalidReferenceException:
-                pass
-        raise UnresolvableParameterException(
-            'Unable to resolve parameter "{}".'.format(param_name))
-
-    @staticmethod
-    def _find_param(param_name, separator_indices, binding_data):
-        """
-        Find the parameter value in this bindign_data. The result could be
-        None which is a valid JSON value null. The parameter is matched
-        as a whole string. If the whole string does not match any, the prefix
-        of the first dot is used to sub parameter map and the rest of the
-        string is matched against the sub parameter map. This process is
-        repeated until a value is found. For example, parameter "x.y.z" is
-        matched against the binding_data. If the binding contains "x.y.z",
-        its value is returned. Else, "x" is used to match a sub parameter map
-        in the binding data. If a sub parameter map is found, "y.z" is used to
-        match a parameter in the sub parameter map. This process is repeated.
-        :param param_name: Param name string.
-        :type param_name: 'str'
-        :param separator_indices: A list of parameter separator indices.
-        :type separator_indices: 'list'
-        :param binding_data: Parameter value map.
-        :type binding_data: 'dict'
-        :return: JSON value
-        """
-        count = len(separator_indices) + 1
-        token_start = 0
-        next_data = binding_data
-        for i in range(count):
-            if next_data is None or not isinstance(next_data, dict):
-                raise InvalidReferenceException("invalid scope")
-            key = param_name[token_start:]
-            try:
-                return StringResolver._match_key(key, next_data)
-            except InvalidReferenceException:
-                pass
-            if i < len(separator_indices):
-                token = param_name[token_start:separator_indices[i]]
-                next_data = StringResolver._match_key(token, next_data)
-                token_start = separator_indices[i] + 1
-        raise InvalidReferenceException("mismatch binding data")
+        reference = ParamReference.parse(param_name)
+        value = scope.find(reference)
+        if value is ParamReference.NOT_FOUND:
+            raise UnresolvableParameterException(
+                'Unable to resolve parameter "{}".'.format(param_name))
+        if scope.cache.recording:
+            scope.cache.record(reference)
+        context = scope.context
+        context.stats.update_stats(param_name)
+        if context.budget is not None:
+            context.budget.expand()
+        return value
 
-    @staticmethod
-    def _match_key(key, data):
-        """
-        Find the key in params. If found, returns value.
-        :param key: Key to be matched.
-        :type key: 'str'
-        :param data: Binding data map to be searched.
-        :type data: 'dict'
-        :return: JSON value
-        """
-        m = re.search("([a-zA-Z0-9]+)\[([0-9]+)\]", key)
-        if m:
-            key = m.group(1)
-            index = int(m.group(2))
-            if index < 0:
-                raise TemplateEngineException(
-                    "Parameter index is negative: %s".format(key))
-            if key in data:
-                value = data[key]
-                if isinstance(value, list) and index < len(value):
-                    return value[index]
-            raise InvalidReferenceException("mismatch binding data")
-
-        if key in data:
-            return data[key]
-        raise InvalidReferenceException("mismatch binding data")
-
-    @staticmethod
-    def _collect_separator_indices(param_name):
+    def _resolve_value(self, param_name, value, scope, unescape=False):
         """
-        Locate all parameter name separators (dots).
+        Resolve the value of a parameter. While a value which may contain
+        parameter references is resolved, the parameter is kept on the
+        reference chain of the render context so that a value referencing
+        itself is reported instead of being expanded without end. The
+        resolved value is cached in the scope and reused by later
+        references as long as the parameters it depends on are not changed
+        by for-each frames. Parameter expansions made for a cached value
+        are counted again when it is reused.
         :param param_name: Parameter name.
         :type param_name: 'str'
-        :return: A list of parameter separator indices.
-        :rtype: 'list'
+        :param value: Parameter value.
+        :type value: JSON data type
+        :param scope: Scope used to expand parameters.
+        :type scope: 'ScopeChain'
+        :param unescape: Resolve the value for output if true.
+        :type unescape: 'bool'
+        :return: JSON value
+        :rtype: JSON object
         """
-        indices = list()
-        str_len = len(param_name)
-        i = 0
-        while i < str_len:
-            c = param_name[i]
-            if c == '\\':
-                i += 2
-            elif c == '.':
-                indices.append(i)
-                i += 1
+        if StringResolver._is_scalar(value):
+            if unescape:
+                return self._element_resolver.emit(value, scope)
+            return value
+        context = scope.context
+        cache = scope.cache
+        cached = cache.get(param_name, unescape, value)
+        if cached is not None:
+            resolved_value, expansions = cached
+            context.stats.update_cache_stats(True)
+            context.stats.merge(expansions)
+            if context.budget is not None and expansions:
+                context.budget.expand(sum(expansions.values()))
+            if isinstance(resolved_value, (dict, list)):
+                return copy_json(resolved_value)
+            return resolved_value
+        context.stats.update_cache_stats(False)
+        references = context.references
+        # the same parameter found with the same frames has the same value
+        reference = (param_name, scope.get_depth())
+        if reference in references:
+            chain = [name for name, _ in
+                     references[references.index(reference):]]
+            chain.append(param_name)
+            raise CyclicReferenceException(
+                'Cyclic parameter reference {}.'.format(' -> '.join(
+                    StringResolver.PARAM_START + name + '}'
+                    for name in chain)), chain)
+        if context.budget is not None:
+            context.budget.check_depth(
+                len(references) + scope.get_depth() + 1)
+        references.append(reference)
+        cache.start()
+        try:
+            if unescape:
+                resolved_value = self._element_resolver.emit(value, scope)
             else:
-                i += 1
-        return indices
+                resolved_value = self._element_resolver.resolve(value, scope)
+        except Exception:
+            cache.finish()
+            raise
+        finally:
+            references.pop()
+        cache.finish(param_name, unescape, value, resolved_value)
+        return resolved_value
@@ -1,7 +1,7 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
-from .exception import TemplateEngineException
+from .compiled_template import TagNode
 from .tags.tag_map import get_tag_map
 
 
@@ -14,15 +14,20 @@ class TagResolver(object):
     # Any character from ":" to the end of the tag name string is ignored.
     LABEL_SEPARATOR = ":"
 
-    def __init__(self, element_resolver, template_loader):
+    def __init__(self, element_resolver, template_loader,
+                 parallel_executor=None):
         """
         Construct a TagResolver.
         :param element_resolver: ElementResolver for resolving an element
                                  by a tag.
         :param template_loader: TemplateLoader for loading template by a tag.
+        :param parallel_executor: ParallelExecutor for resolving loops in
+                                  parallel. None if loops are resolved
+                                  serially.
         """
         self._element_resolver = element_resolver
         self._template_loader = template_loader
+        self._parallel_executor = parallel_executor
         self._tag_map = get_tag_map(self)
 
     @staticmethod
@@ -43,28 +48,58 @@ class TagResolver(object):
                isinstance(tag_data[0], str) and len(tag_data[0]) > 1 and \
                tag_data[0][0] == TagResolver.TAG_MARKER
 
-    def resolve(self, tag_data, binding_data_list):
+    def resolve(self, tag_data, scope):
         """
         Process a JSON element as a tag.
         :param tag_data: Template tag to be processed.
         :type tag_data: JSON element
-        :param binding_data_list: binding data list to be used
-                                  during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: Processed tag.
         :rtype: JSON object
         """
+        return self.compile(tag_data).resolve(scope)
+
+    def compile(self, tag_data):
+        """
+        Compile a JSON element as a tag. The tag name is looked up once and
+        the tag tokens are prepared by the tag for repeated processing.
+        :param tag_data: Template tag to be compiled.
+        :type tag_data: JSON element
+        :return: Tag node.
+        :rtype: 'TagNode'
+        """
         tag_name = tag_data[0][1:]
         # When a tag name is used in a dictionary as a key,
         # an arbitrary label is allowed to be appended to the tag name
         # in the format of ":label" to make the key unique.
-        tag_name = tag_name.partition(TagResolver.LABEL_SEPARATOR)[0]
-        if tag_name in self._tag_map:
-            tag = self._tag_map[tag_name]
-            tag_tokens = tag_data[1:]
-            return tag.process(tag_tokens, binding_data_list)
-        else:
-            raise TemplateEngineException("Unknown tag \"{}\".".format(tag_name))
+        tag_name, separator, label = tag_name.partition(
+            TagResolver.LABEL_SEPARATOR)
+        tag = self._tag_map.get(tag_name)
+        if tag is None:
+            # Unknown tags are reported when the tag is resolved.
+            return TagNode(tag_data, tag_name, None, None)
+        return TagNode(tag_data, tag_name, tag,
+                       tag.compile(tag_data[1:], label if separator else None))
+
+    def get_tag(self, tag_name):
+        """
+        Return a tag by name. The tag is imported and constructed when it is
+        first looked up.
+        :param tag_name: Tag name.
+        :type tag_name: 'str'
+        :return: Tag or None if the tag is unknown.
+        :rtype: 'TagBase'
+        """
+        return self._tag_map.get(tag_name)
+
+    def get_tag_map(self):
+        """
+        Return the tags looked up so far by name.
+        :return: A map of tag names to tags.
+        :rtype: 'TagMap'
+        """
+        return self._tag_map
 
     def get_element_resolver(self):
         """
@@ -81,3 +116,12 @@ class TagResolver(object):
         :rtype: TemplateLoader
         """
         return self._template_loader
+
+    def get_parallel_executor(self):
+        """
+        Return the parallel executor. Used by tags to resolve loops in
+        parallel.
+        :return: Parallel executor or None.
+        :rtype: ParallelExecutor
+        """
+        return self._parallel_executor
@@ -1,11 +1,11 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
-from .tag_base import TagBase
+from .tag_base import CompiledTokensMixin, TagBase
 from ..exception import TemplateEngineException
 
 
-class AtTag(TagBase):
+class AtTag(CompiledTokensMixin, TagBase):
     """
     Return a value at an index or name depending the object.
     """
@@ -21,13 +21,13 @@ class AtTag(TagBase):
         self._element_resolver = tag_resolver.get_element_resolver()
         self._template_loader = tag_resolver.get_template_loader()
 
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
@@ -38,9 +38,9 @@ class AtTag(TagBase):
         data = tag_tokens[0]
         key = tag_tokens[1]
         resolved_data = self._element_resolver.resolve(
-            data, binding_data_list)
+            data, scope)
         resolved_key = self._element_resolver.resolve(
-            key, binding_data_list)
+            key, scope)
         if isinstance(resolved_data, list):
             return resolved_data[int(resolved_key)]
         elif isinstance(resolved_data, dict):
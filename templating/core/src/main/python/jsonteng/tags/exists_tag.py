@@ -2,10 +2,10 @@
 # SPDX-License-Indentifier: Apache-2.0
 
 from ..exception import UnresolvableParameterException
-from .tag_base import TagBase
+from .tag_base import CompiledTokensMixin, TagBase
 
 
-class ExistsTag(TagBase):
+class ExistsTag(CompiledTokensMixin, TagBase):
     """
     Check if a parameter is set.
     """
@@ -21,13 +21,13 @@ class ExistsTag(TagBase):
         self._element_resolver = tag_resolver.get_element_resolver()
         self._template_loader = tag_resolver.get_template_loader()
 
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
@@ -37,7 +37,7 @@ class ExistsTag(TagBase):
                 format(ExistsTag.name, tag_tokens))
         data = tag_tokens[0]
         try:
-            self._element_resolver.resolve(data, binding_data_list)
+            self._element_resolver.resolve(data, scope)
         except UnresolvableParameterException:
             return "False"
         return "True"
@@ -1,10 +1,24 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
+from ..compiled_template import LiteralNode
 from ..exception import TemplateEngineException
+from ..instrument import Instrument
+from ..util import unknown_data_type_error
 from .tag_base import TagBase
 
 
+class _LoopTokens(list):
+    """
+    Compiled tag arguments of a for-each tag together with the tag label and
+    the preloaded loop templates.
+    """
+    def __init__(self, tokens, label):
+        super().__init__(tokens)
+        self.label = label
+        self.compiled_templates = dict()
+
+
 class ForEachTag(TagBase):
     """
     Apply a list of binding data to a template repeatedly and return the
@@ -22,16 +36,89 @@ class ForEachTag(TagBase):
         self._element_resolver = tag_resolver.get_element_resolver()
         self._template_loader = tag_resolver.get_template_loader()
 
-    def process(self, tag_tokens, binding_data_list):
+    def compile(self, tag_tokens, label=None):
+        """
+        Compile tag arguments.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param label: Tag label. None if the tag name has no label.
+        :type label: 'str'
+        :return: Compiled tag arguments.
+        :rtype: 'list'
+        """
+        compiled_tokens = self.compile_tokens(tag_tokens[:2])
+        compiled_tokens.extend(self._element_resolver.compile_condition(token)
+                               for token in tag_tokens[2:])
+        return _LoopTokens(compiled_tokens, label)
+
+    def get_references(self, tag_tokens):
+        """
+        Return the loop template if it is given literally or None.
+        :param tag_tokens: Tag arguments returned by `compile`.
+        :type tag_tokens: 'list'
+        :return: JSON resources.
+        :rtype: 'list'
+        """
+        if len(tag_tokens) < 2:
+            return []
+        template = tag_tokens[1]
+        if isinstance(template, LiteralNode) and \
+                isinstance(template.element, str):
+            return [template.element]
+        return [None]
+
+    def preload(self, tag_tokens, compiled_templates):
+        """
+        Keep the compiled loop template so that it is not loaded when the
+        tag is processed.
+        :param tag_tokens: Tag arguments returned by `compile`.
+        :type tag_tokens: 'list'
+        :param compiled_templates: A map of JSON resources to compiled
+                                   templates.
+        :type compiled_templates: 'dict'
+        """
+        if isinstance(tag_tokens, _LoopTokens):
+            tag_tokens.compiled_templates.update(compiled_templates)
+
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
+        return list(self.iterate(tag_tokens, scope))
+
+    def emit(self, tag_tokens, scope):
+        """
+        Process this tag for output. Templates are resolved for output
+        directly.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
+        :return: Unescaped JSON object
+        :rtype: JSON object
+        """
+        return list(self.iterate(tag_tokens, scope, True))
+
+    def iterate(self, tag_tokens, scope, unescape=False):
+        """
+        Process this tag and generate the resolved templates one by one.
+        The generator must be exhausted or closed so that the loop template
+        is unloaded.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
+        :param unescape: Resolve templates for output if true.
+        :type unescape: 'bool'
+        :return: Generator of resolved templates.
+        :rtype: 'generator'
+        """
         if len(tag_tokens) < 2 or len(tag_tokens) > 3:
             raise Exception(
                 "Tag \"{}\" requires 2 or 3 parameters."
@@ -40,29 +127,116 @@ class ForEachTag(TagBase):
         data_list = tag_tokens[0]
         try:
             template = self._element_resolver.resolve(
-                tag_tokens[1], binding_data_list)
+                tag_tokens[1], scope)
         except TemplateEngineException:
             # If encounter exception, treat the token as the template.
             # The resolve may need a loop dependent binding data.
-            template = tag_tokens[1]
-        template_json = self._template_loader.load(template)
-        resolved_data_list = self._element_resolver.resolve(
-            data_list, binding_data_list)
-        resolved_json = list()
-        for index, data in enumerate(resolved_data_list):
-            binding_data_list.insert(0, data)
-            binding_data_list.insert(0, {"_index_": index})
-            if len(tag_tokens) == 3:
-                condition_expr = self._element_resolver.resolve(
-                    tag_tokens[2], binding_data_list)
-                if not self.safe_eval(condition_expr):
-                    binding_data_list.pop(0)
-                    binding_data_list.pop(0)
-                    continue
-            resolved_template = self._element_resolver.resolve(
-                template_json, binding_data_list)
-            resolved_json.append(resolved_template)
-            binding_data_list.pop(0)
-            binding_data_list.pop(0)
-        self._template_loader.unload(template)
-        return resolved_json
+            template = tag_tokens[1].element
+        compiled_template = getattr(
+            tag_tokens, 'compiled_templates', {}).get(template) \
+            if isinstance(template, str) else None
+        if compiled_template is not None:
+            self._template_loader.enter(template, compiled_template.location)
+            template_node = compiled_template.root
+            template_json = template_node.element
+        else:
+            template_json = self._load_template(template, scope)
+            template_node = None
+        instrument = scope.context.instrument
+        if instrument is not None:
+            instrument.enter(Instrument.TEMPLATE, template)
+        try:
+            resolved_data_list = self._element_resolver.resolve(
+                data_list, scope)
+            condition = tag_tokens[2] if len(tag_tokens) == 3 else None
+            parallel_executor = self._tag_resolver.get_parallel_executor()
+            if parallel_executor is not None and parallel_executor.accepts(
+                    getattr(tag_tokens, 'label', None),
+                    len(resolved_data_list)):
+                yield from parallel_executor.resolve_items(
+                    template_json,
+                    condition.element if condition is not None else None,
+                    scope, resolved_data_list, self._template_loader,
+                    unescape)
+            else:
+                if template_node is None:
+                    template_node = self._element_resolver.compile(
+                        template_json)
+                yield from ForEachTag.iterate_items(
+                    template_node, condition, scope, resolved_data_list,
+                    unescape=unescape, template=template)
+        finally:
+            if instrument is not None:
+                instrument.exit(Instrument.TEMPLATE, template)
+            self._template_loader.unload(template)
+
+    def _load_template(self, template, scope):
+        """
+        Load a loop template.
+        :param template: Loop template resource.
+        :type template: 'str'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
+        :return: Loaded template.
+        :rtype: JSON object
+        """
+        instrument = scope.context.instrument
+        if instrument is None:
+            return self._template_loader.load(template)
+        instrument.enter(Instrument.LOAD, template)
+        try:
+            return self._template_loader.load(template)
+        finally:
+            instrument.exit(Instrument.LOAD, template)
+
+    @staticmethod
+    def iterate_items(template_node, condition_node, scope, data_list,
+                      start_index=0, unescape=False, template=None):
+        """
+        Resolve a loop template for each item of a data list and generate
+        the resolved templates one by one.
+        :param template_node: Compiled loop template.
+        :type template_node: 'TemplateNode'
+        :param condition_node: Compiled filter condition or None.
+        :type condition_node: 'ConditionNode'
+        :param scope: Scope of the loop.
+        :type scope: 'ScopeChain'
+        :param data_list: Loop data list.
+        :type data_list: 'list'
+        :param start_index: Loop index of the first item.
+        :type start_index: 'int'
+        :param unescape: Resolve templates for output if true.
+        :type unescape: 'bool'
+        :param template: Loop template resource reported to the instrument
+                         of the render context.
+        :type template: 'str'
+        :return: Generator of resolved templates.
+        :rtype: 'generator'
+        """
+        instrument = scope.context.instrument
+        budget = scope.context.budget
+        # One loop frame is pushed for the loop and updated per iteration.
+        scope.push(None)
+        try:
+            for index, data in enumerate(data_list, start_index):
+                scope.set_frame(data, index)
+                if budget is not None:
+                    budget.add_nodes(1)
+                if instrument is not None:
+                    instrument.enter(Instrument.ITERATION, template)
+                try:
+                    if condition_node is not None and \
+                            not condition_node.evaluate(scope):
+                        continue
+                    if unescape:
+                        resolved_item = template_node.emit(scope)
+                        if resolved_item is TagBase.TAG_NONE:
+                            raise unknown_data_type_error(resolved_item)
+                    else:
+                        resolved_item = template_node.resolve(scope)
+                finally:
+                    if instrument is not None:
+                        instrument.exit(Instrument.ITERATION, template)
+                yield resolved_item
+        finally:
+            scope.pop()
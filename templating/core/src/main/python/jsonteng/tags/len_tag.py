@@ -1,10 +1,10 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
-from .tag_base import TagBase
+from .tag_base import CompiledTokensMixin, TagBase
 
 
-class LenTag(TagBase):
+class LenTag(CompiledTokensMixin, TagBase):
     """
     Return the length of an object. The value depends on the object type.
     """
@@ -20,13 +20,13 @@ class LenTag(TagBase):
         self._element_resolver = tag_resolver.get_element_resolver()
         self._template_loader = tag_resolver.get_template_loader()
 
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
@@ -35,7 +35,7 @@ class LenTag(TagBase):
                 "Tag \"{}\" requires 1 parameter. Parameters given {}".
                 format(LenTag.name, tag_tokens))
         data = tag_tokens[0]
-        resolved_data = self._element_resolver.resolve(data, binding_data_list)
+        resolved_data = self._element_resolver.resolve(data, scope)
         if resolved_data is not None:
             return len(resolved_data)
         else:
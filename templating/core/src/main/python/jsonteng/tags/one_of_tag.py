@@ -23,36 +23,86 @@ class OneOfTag(TagBase):
         super().__init__(tag_resolver)
         self._element_resolver = tag_resolver.get_element_resolver()
 
-    def process(self, tag_tokens, binding_data_list):
+    def compile(self, tag_tokens, label=None):
+        """
+        Compile tag arguments. A condition/value pair is compiled into a
+        tuple of a condition node and a value node. Other arguments are
+        compiled into single nodes and validated when the tag is processed.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param label: Tag label. None if the tag name has no label.
+        :type label: 'str'
+        :return: Compiled tag arguments.
+        :rtype: 'list'
+        """
+        compiled_tokens = list()
+        for item in tag_tokens:
+            if isinstance(item, list) and len(item) == 2:
+                compiled_tokens.append(
+                    (self._element_resolver.compile_condition(item[0]),
+                     self._element_resolver.compile(item[1])))
+            else:
+                compiled_tokens.append(self._element_resolver.compile(item))
+        return compiled_tokens
+
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
+        value = self._select(tag_tokens, scope)
+        if value is TagBase.TAG_NONE:
+            return value
+        return value.resolve(scope)
+
+    def emit(self, tag_tokens, scope):
+        """
+        Process this tag for output. Only the selected value is resolved
+        for output.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
+        :return: Unescaped JSON object or TAG_NONE.
+        :rtype: JSON object
+        """
+        value = self._select(tag_tokens, scope)
+        if value is TagBase.TAG_NONE:
+            return value
+        return value.emit(scope)
+
+    def _select(self, tag_tokens, scope):
+        """
+        Select the value of the first true condition.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
+        :return: Value node or TAG_NONE.
+        :rtype: 'TemplateNode'
+        """
         token_count = len(tag_tokens)
         if token_count < 1:
             raise TemplateEngineException(
                 "Tag \"{}\" requires at least 1 parameter."
                 " Parameters given {}".format(OneOfTag.name, tag_tokens))
         for index, item in enumerate(tag_tokens):
-            if isinstance(item, list) and len(item) == 2:
-                condition = item[0]
-                value = item[1]
-                condition_expr = self._element_resolver.resolve(
-                    condition, binding_data_list)
-                if self.safe_eval(condition_expr):
-                    return self._element_resolver.resolve(
-                        value, binding_data_list)
+            if isinstance(item, tuple):
+                condition, value = item
+                if condition.evaluate(scope):
+                    return value
             else:
-                if index == (token_count - 1) and not isinstance(item, list):
-                    return self._element_resolver.resolve(
-                        tag_tokens[-1], binding_data_list)
+                if index == (token_count - 1) and \
+                        not isinstance(item.element, list):
+                    return item
                 else:
                     raise TemplateEngineException(
                         "Tag \"{}\" contains an invalid parameter."
-                        " {}.".format(OneOfTag.name, json.dumps(item, separators=(',', ':'))))
+                        " {}.".format(OneOfTag.name, json.dumps(
+                            item.element, separators=(',', ':'))))
         return TagBase.TAG_NONE
@@ -4,6 +4,7 @@
 import abc
 
 from ..exception import TemplateEngineException
+from ..util import unescape_json
 
 
 class TagBase(object):
@@ -20,23 +21,97 @@ class TagBase(object):
         """
         self._tag_resolver = tag_resolver
 
+    def compile(self, tag_tokens, label=None):
+        """
+        Prepare tag arguments once so that the tag can be processed
+        repeatedly. The returned value is passed to `process` as tag tokens.
+        By default the arguments are returned unchanged and resolved on every
+        `process` call. Tags may return template nodes compiled by the element
+        resolver instead.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param label: Tag label. None if the tag name has no label.
+        :type label: 'str'
+        :return: Tag tokens to be passed to `process`.
+        :rtype: 'list'
+        """
+        return tag_tokens
+
+    def compile_tokens(self, tag_tokens):
+        """
+        Compile each tag argument into a template node. Used by tags whose
+        arguments are resolved as templates.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :return: Template nodes.
+        :rtype: 'list'
+        """
+        element_resolver = self._tag_resolver.get_element_resolver()
+        return [element_resolver.compile(token) for token in tag_tokens]
+
+    def get_references(self, tag_tokens):
+        """
+        Return JSON resources, such as templates, loaded by this tag which
+        are known before the tag is processed. They may be loaded ahead of
+        time. A resource which is only known when the tag is processed is
+        returned as None. By default no resources are returned.
+        :param tag_tokens: Tag arguments returned by `compile`.
+        :type tag_tokens: 'list'
+        :return: JSON resources.
+        :rtype: 'list'
+        """
+        return []
+
+    def preload(self, tag_tokens, compiled_templates):
+        """
+        Attach templates compiled ahead of time to the tag arguments. The
+        templates are those returned by `get_references`. By default they
+        are ignored.
+        :param tag_tokens: Tag arguments returned by `compile`.
+        :type tag_tokens: 'list'
+        :param compiled_templates: A map of JSON resources to compiled
+                                   templates.
+        :type compiled_templates: 'dict'
+        """
+        pass
+
     @abc.abstractmethod
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process a tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
         raise NotImplementedError
 
+    def emit(self, tag_tokens, scope):
+        """
+        Process a tag for output. Escape characters are removed from the
+        result. By default the result of `process` is unescaped. Tags
+        producing large results may resolve their tokens for output
+        directly instead.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
+        :return: Unescaped JSON object or TAG_NONE.
+        :rtype: JSON object
+        """
+        result = self.process(tag_tokens, scope)
+        if result is TagBase.TAG_NONE:
+            return result
+        return unescape_json(result)
+
     @staticmethod
     def safe_eval(expr):
         """
-        A safe eval that is limited to simple expressions.
+        A safe eval that is limited to simple expressions. Kept for tags
+        evaluating their own expressions. Conditions of built-in tags are
+        evaluated by `ConditionExpression` which does not use eval.
         :param expr: A Python boolean expression
         :type expr: 'str'
         :return: result of expression evaluation
@@ -47,3 +122,20 @@ class TagBase(object):
             raise TemplateEngineException(
                 "Expression {} is not a boolean type".format(expr))
         return result
+
+
+class CompiledTokensMixin(object):
+    """
+    Mixin of tags which compile all their arguments into template nodes.
+    """
+    def compile(self, tag_tokens, label=None):
+        """
+        Compile each tag argument into a template node.
+        :param tag_tokens: Tag arguments.
+        :type tag_tokens: 'list'
+        :param label: Tag label. None if the tag name has no label.
+        :type label: 'str'
+        :return: Template nodes.
+        :rtype: 'list'
+        """
+        return self.compile_tokens(tag_tokens)
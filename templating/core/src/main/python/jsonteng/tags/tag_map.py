@@ -1,29 +1,71 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
-from collections import OrderedDict
-
-from .at_tag import AtTag
-from .for_each_tag import ForEachTag
-from .exists_tag import ExistsTag
-from .len_tag import LenTag
-from .one_of_tag import OneOfTag
-from .to_bool_tag import ToBoolTag
-from .to_float_tag import ToFloatTag
-from .to_int_tag import ToIntTag
-from .to_null_tag import ToNullTag
+import threading
+from importlib import import_module
 
+from ..exception import TemplateEngineException
+
+# Entry point group of tag classes contributed by installed distributions.
+ENTRY_POINT_GROUP = "jsonteng.tags"
+
+# Tag classes or their import paths by tag name. A tag module is imported
+# when the tag is first looked up.
 _tag_class_map = {
-    AtTag.name: AtTag,
-    ExistsTag.name: ExistsTag,
-    ForEachTag.name: ForEachTag,
-    LenTag.name: LenTag,
-    OneOfTag.name: OneOfTag,
-    ToIntTag.name: ToIntTag,
-    ToFloatTag.name: ToFloatTag,
-    ToBoolTag.name: ToBoolTag,
-    ToNullTag.name: ToNullTag
+    "at": __package__ + ".at_tag.AtTag",
+    "exists": __package__ + ".exists_tag.ExistsTag",
+    "for-each": __package__ + ".for_each_tag.ForEachTag",
+    "len": __package__ + ".len_tag.LenTag",
+    "one-of": __package__ + ".one_of_tag.OneOfTag",
+    "to-int": __package__ + ".to_int_tag.ToIntTag",
+    "to-float": __package__ + ".to_float_tag.ToFloatTag",
+    "to-bool": __package__ + ".to_bool_tag.ToBoolTag",
+    "to-null": __package__ + ".to_null_tag.ToNullTag"
 }
+# Imported tag classes by import path.
+_imported_tag_classes = dict()
+_entry_points_lock = threading.Lock()
+_entry_points_loaded = False
+
+
+class TagMap(object):
+    """
+    Tags of a tag resolver by name. A tag is constructed when it is first
+    looked up so that only the tags used by templates are imported.
+    """
+    def __init__(self, tag_resolver):
+        """
+        Construct a tag map.
+        :param tag_resolver: Tag resolved used by tags.
+        :type tag_resolver: 'TagResolver'
+        """
+        self._tag_resolver = tag_resolver
+        self._tags = dict()
+
+    def get(self, tag_name):
+        """
+        Get a tag.
+        :param tag_name: Tag name.
+        :type tag_name: 'str'
+        :return: Tag or None if the tag is unknown.
+        :rtype: 'TagBase'
+        """
+        tag = self._tags.get(tag_name)
+        if tag is None:
+            tag_class = get_tag_class(tag_name)
+            if tag_class is None:
+                return None
+            tag = self._tags.setdefault(tag_name,
+                                        tag_class(self._tag_resolver))
+        return tag
+
+    def items(self):
+        """
+        Get the tags constructed so far.
+        :return: A list of tuples of tag name and tag.
+        :rtype: 'list'
+        """
+        return list(self._tags.items())
 
 
 def get_tag_map(tag_resolver):
@@ -32,12 +74,9 @@ def get_tag_map(tag_resolver):
     :param tag_resolver: Tag resolved used by tags.
     :type tag_resolver: 'TagResolver'
     :return: A map of tags.
-    :rtype: 'dict'
+    :rtype: 'TagMap'
     """
-    tag_map = OrderedDict()
-    for tag_name, tag in _tag_class_map.items():
-        tag_map[tag_name] = tag(tag_resolver)
-    return tag_map
+    return TagMap(tag_resolver)
 
 
 def add_tag(tag_name, tag):
@@ -45,17 +84,118 @@ def add_tag(tag_name, tag):
     Add a tag to the tag collection.
     :param tag_name: Tag name.
     :type tag_name: 'str'
-    :param tag: Tag class.
+    :param tag: Tag class or its import path such as "package.module.Class"
+                or "package.module:Class". The module is imported when the
+                tag is first looked up.
     :type tag: 'TagBase'
     :return:
     """
     _tag_class_map[tag_name] = tag
 
 
+def remove_tag(tag_name):
+    """
+    Remove a tag from the tag collection. Tags constructed by tag maps
+    before it is removed are kept by them.
+    :param tag_name: Tag name.
+    :type tag_name: 'str'
+    """
+    tag = _tag_class_map.pop(tag_name, None)
+    if isinstance(tag, str):
+        _imported_tag_classes.pop(tag, None)
+
+
+def get_tag_class(tag_name):
+    """
+    Get a tag class. Its module is imported if it is not imported yet. Tags
+    contributed by installed distributions are discovered when an unknown
+    tag is looked up.
+    :param tag_name: Tag name.
+    :type tag_name: 'str'
+    :return: Tag class or None if the tag is unknown.
+    :rtype: 'type'
+    """
+    tag = _tag_class_map.get(tag_name)
+    if tag is None and _load_entry_points():
+        tag = _tag_class_map.get(tag_name)
+    if not isinstance(tag, str):
+        return tag
+    tag_class = _imported_tag_classes.get(tag)
+    if tag_class is None:
+        tag_class = _imported_tag_classes[tag] = _import_tag_class(tag)
+    return tag_class
+
+
 def get_tag_names():
     """
     Get all tag names.
     :return: Tag names.
     :rtype: 'list'
     """
+    _load_entry_points()
     return _tag_class_map.keys()
+
+
+def get_tag_classes():
+    """
+    Get all tag classes without importing them.
+    :return: A map of tag names to tag classes or their import paths.
+    :rtype: 'dict'
+    """
+    return dict(_tag_class_map)
+
+
+def _import_tag_class(path):
+    """
+    Import a tag class.
+    :param path: Import path such as "package.module.Class" or
+                 "package.module:Class".
+    :type path: 'str'
+    :return: Tag class.
+    :rtype: 'type'
+    """
+    if ':' in path:
+        module_path, _, class_name = path.partition(':')
+    else:
+        module_path, _, class_name = path.rpartition('.')
+    try:
+        tag_class = import_module(module_path)
+        for name in class_name.split('.'):
+            tag_class = getattr(tag_class, name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise TemplateEngineException(
+            "Failed to import tag {}: {}".format(path, e))
+    return tag_class
+
+
+def _load_entry_points():
+    """
+    Add the tags registered by installed distributions in the entry point
+    group `ENTRY_POINT_GROUP` once. Tags added by name are not replaced.
+    :return: True if tags are added.
+    :rtype: 'bool'
+    """
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return False
+    with _entry_points_lock:
+        if _entry_points_loaded:
+            return False
+        # importlib.metadata takes longer to import than the engine.
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:
+            entry_points = None
+        added = False
+        if entry_points is not None:
+            found = entry_points()
+            if hasattr(found, "select"):
+                found = found.select(group=ENTRY_POINT_GROUP)
+            else:
+                found = found.get(ENTRY_POINT_GROUP, ())
+            for entry_point in found:
+                if entry_point.name not in _tag_class_map:
+                    _tag_class_map[entry_point.name] = entry_point.value
+                    added = True
+        _entry_points_loaded = True
+        return added
@@ -1,11 +1,11 @@
 # Copyright 2022 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
-from .tag_base import TagBase
+from .tag_base import CompiledTokensMixin, TagBase
 from ..exception import TemplateEngineException
 
 
-class ToNullTag(TagBase):
+class ToNullTag(CompiledTokensMixin, TagBase):
     """
     Return a null converted from a string.
     """
@@ -21,13 +21,13 @@ class ToNullTag(TagBase):
         self._element_resolver = tag_resolver.get_element_resolver()
         self._template_loader = tag_resolver.get_template_loader()
 
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
@@ -36,7 +36,7 @@ class ToNullTag(TagBase):
                 "Tag \"{}\" requires 1 parameter. Parameters given {}".
                 format(ToNullTag.name, tag_tokens))
         data = tag_tokens[0]
-        resolved_data = self._element_resolver.resolve(data, binding_data_list)
+        resolved_data = self._element_resolver.resolve(data, scope)
         if type(resolved_data) is str:
             if resolved_data.lower() == "null":
                 return None
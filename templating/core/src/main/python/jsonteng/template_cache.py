@@ -0,0 +1,265 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from .compiled_template import TagNode
+
+# Version of the entry format. Entries of other versions are rebuilt.
+_FORMAT_VERSION = 2
+
+
+class TemplateCache(object):
+    """
+    A persistent cache of compiled templates in a directory. Each entry
+    holds the compiled root node of a template file together with the
+    parsed template, so a template found in the cache is neither parsed nor
+    compiled. An entry is valid while the template file keeps its
+    modification time and size and the engine keeps its modules, compile
+    options and the classes of the tags used by the template. Stale and
+    corrupted entries are ignored and replaced. Entries are written
+    atomically and can be shared by processes. They are unpickled, so the
+    directory must be writable only by trusted users.
+    """
+    def __init__(self, cache_dir):
+        """
+        Construct a cache. The directory is created when the first entry is
+        written.
+        :param cache_dir: Directory of the cache entries.
+        :type cache_dir: 'str'
+        """
+        self._cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, location, validator, element_resolver):
+        """
+        Return a cached compiled template if it is still valid.
+        :param location: Location of the template file.
+        :type location: 'str'
+        :param validator: Current validator of the template file.
+        :type validator: 'tuple'
+        :param element_resolver: Element resolver the nodes are bound to.
+        :type element_resolver: 'ElementResolver'
+        :return: Root node or None if the template is not cached.
+        :rtype: 'TemplateNode'
+        """
+        header = TemplateCache._get_header(
+            location, validator, element_resolver)
+        root = None
+        # noinspection PyBroadException
+        try:
+            with open(self._get_path(header), 'rb') as fp:
+                unpickler = _NodeUnpickler(fp, element_resolver)
+                if unpickler.load() == header:
+                    root = unpickler.load()
+                    tag_signature = unpickler.load()
+                    if tag_signature != TemplateCache._get_tag_signature(
+                            [tag_name for tag_name, *_ in tag_signature],
+                            element_resolver):
+                        root = None
+        except Exception:
+            # missing, stale or corrupted entries are rebuilt
+            root = None
+        with self._lock:
+            if root is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return root
+
+    def put(self, location, validator, root, element_resolver):
+        """
+        Cache a compiled template. Templates whose nodes can not be pickled,
+        such as those using tags that keep unpicklable tokens, are not
+        cached.
+        :param location: Location of the template file.
+        :type location: 'str'
+        :param validator: Validator of the template file taken before the
+                          template was loaded so that a template changed
+                          while loading is compiled again.
+        :type validator: 'tuple'
+        :param root: Root node.
+        :type root: 'TemplateNode'
+        :param element_resolver: Element resolver the nodes are bound to.
+        :type element_resolver: 'ElementResolver'
+        """
+        header = TemplateCache._get_header(
+            location, validator, element_resolver)
+        temp_path = None
+        # noinspection PyBroadException
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                    dir=self._cache_dir, suffix=".tmp",
+                    delete=False) as fp:
+                temp_path = fp.name
+                pickler = _NodePickler(fp, element_resolver)
+                pickler.dump(header)
+                pickler.dump(root)
+                pickler.dump(TemplateCache._get_tag_signature(
+                    pickler.get_tag_names(), element_resolver))
+            os.replace(temp_path, self._get_path(header))
+        except Exception:
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        """
+        Get cache stats.
+        :return: A dictionary of the number of hits and misses.
+        :rtype: 'dict'
+        """
+        with self._lock:
+            return OrderedDict([("hits", self._hits),
+                                ("misses", self._misses)])
+
+    def _get_path(self, header):
+        """
+        Return the path of the entry of a template. Templates compiled with
+        different options have different entries.
+        :param header: Entry header.
+        :type header: 'tuple'
+        :return: File path.
+        :rtype: 'str'
+        """
+        _, _, location, _, signature = header
+        key = "{}\n{}".format(location, signature)
+        return os.path.join(self._cache_dir, hashlib.sha1(
+            key.encode("utf-8", "surrogatepass")).hexdigest() + ".pickle")
+
+    @staticmethod
+    def _get_header(location, validator, element_resolver):
+        """
+        Return the header identifying a valid entry.
+        :return: A tuple of (format version, engine version, location,
+                 validator, compile signature).
+        :rtype: 'tuple'
+        """
+        signature = repr(element_resolver.get_compile_options())
+        return (_FORMAT_VERSION, _get_module_version(__package__),
+                location, validator, signature)
+
+    @staticmethod
+    def _get_tag_signature(tag_names, element_resolver):
+        """
+        Return the signature of the tags used by a template. Only these tags
+        are imported to validate an entry.
+        :param tag_names: Names of the tags used by the template.
+        :type tag_names: 'list'
+        :param element_resolver: Element resolver the nodes are bound to.
+        :type element_resolver: 'ElementResolver'
+        :return: A sorted list of tuples of tag name, module, class name and
+                 module version. The tuple of an unknown tag has only the
+                 tag name.
+        :rtype: 'list'
+        """
+        return sorted(
+            (tag_name, tag_class.__module__, tag_class.__qualname__,
+             _get_module_version(tag_class.__module__))
+            if tag_class is not None else (tag_name,)
+            for tag_name, tag_class
+            in element_resolver.get_tag_classes(tag_names).items())
+
+
+class _NodePickler(pickle.Pickler):
+    """
+    Pickler of template nodes. Objects shared with the element resolver,
+    such as tags and resolvers, are written as references by shared ID. The
+    names of the tags used by the nodes are collected.
+    """
+    def __init__(self, fp, element_resolver):
+        super().__init__(fp, pickle.HIGHEST_PROTOCOL)
+        self._shared_ids = {
+            id(obj): shared_id for shared_id, obj
+            in element_resolver.get_shared_objects().items()}
+        self._tag_names = set()
+
+    def reducer_override(self, obj):
+        # Unlike persistent_id, this is not called for JSON values.
+        shared_id = self._shared_ids.get(id(obj))
+        if shared_id is None:
+            if type(obj) is TagNode:
+                self._tag_names.add(obj.tag_name)
+            return NotImplemented
+        return _get_shared_object, (shared_id,)
+
+    def get_tag_names(self):
+        """
+        Return the names of the tags used by the pickled nodes including
+        unknown tags.
+        :return: Tag names.
+        :rtype: 'set'
+        """
+        return self._tag_names
+
+
+class _NodeUnpickler(pickle.Unpickler):
+    """
+    Unpickler of template nodes binding them to the shared objects of an
+    element resolver. Tags are constructed as they are found.
+    """
+    def __init__(self, fp, element_resolver):
+        super().__init__(fp)
+        self._element_resolver = element_resolver
+
+    def find_class(self, module, name):
+        if module == __name__ and name == _get_shared_object.__name__:
+            return self._element_resolver.get_shared_object
+        return super().find_class(module, name)
+
+
+def _get_shared_object(shared_id):
+    """
+    Stand-in for the lookup of a shared object by `_NodeUnpickler`.
+    """
+    raise pickle.UnpicklingError(
+        "Shared object {} is not bound to an element resolver.".format(
+            shared_id))
+
+
+@lru_cache(maxsize=None)
+def _get_module_version(module_name):
+    """
+    Return a version of a module or package made of the modification times
+    and sizes of its source files and the Python implementation.
+    :param module_name: Module name.
+    :type module_name: 'str'
+    :return: Version string.
+    :rtype: 'str'
+    """
+    module = sys.modules.get(module_name)
+    module_file = getattr(module, '__file__', None)
+    paths = list()
+    if module_file is not None:
+        if os.path.basename(module_file).startswith("__init__."):
+            for dir_path, dir_names, file_names in os.walk(
+                    os.path.dirname(module_file)):
+                dir_names.sort()
+                paths.extend(os.path.join(dir_path, file_name)
+                             for file_name in sorted(file_names)
+                             if file_name.endswith(".py"))
+        else:
+            paths.append(module_file)
+    digest = hashlib.sha1(
+        (sys.implementation.cache_tag or "").encode("utf-8"))
+    for path in paths:
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update("{}:{}:{}\n".format(
+            path, file_stat.st_mtime_ns, file_stat.st_size).encode(
+            "utf-8", "surrogatepass"))
+    return digest.hexdigest()
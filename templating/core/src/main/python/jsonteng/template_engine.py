@@ -1,26 +1,43 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
-import argparse
-import datetime
 import os
+import sys
 import json
+import threading
 from collections import OrderedDict
 from importlib import import_module
 
+from jsonteng.codec import get_codec, get_codec_names
+from jsonteng.compiled_template import CompiledTemplate, TagNode, walk
 from jsonteng.element_resolver import ElementResolver
 from jsonteng.exception import TemplateEngineException
+from jsonteng.instrument import Instrument
+from jsonteng.render_context import RenderContext
+from jsonteng.render_limits import RenderLimits
 from jsonteng.tags.tag_map import add_tag, get_tag_names
+from jsonteng.scope import BindingIndex, ScopeChain
 from jsonteng.stats import Stats
+from jsonteng.template_graph import TemplateAnalyzer
 from jsonteng.json_loader import DefaultJsonLoader
-from jsonteng.util import (unescape_json, check_duplicated_binding_data)
+from jsonteng.json_stream_writer import JsonStreamWriter
+from jsonteng.parallel import ParallelExecutor
+from jsonteng.profiler import Profiler
+from jsonteng.tags.tag_base import TagBase
+from jsonteng.util import unknown_data_type_error
 
 
 class JsonTemplateEngine(object):
     """
     `JsonTemplateEngine` class resolves templates by parameter expansions.
+    The state of a resolution is kept in a `RenderContext` created for the
+    resolution, so one engine can be shared by threads resolving templates
+    concurrently.
     """
-    def __init__(self, env=None, template_loader=None, verbose=False):
+    def __init__(self, env=None, template_loader=None, verbose=False,
+                 parallel=False, max_workers=None, parallel_threshold=1000,
+                 copy_constants=False, prefetch=False, limits=None,
+                 codec=None, compact=False, cache_dir=None):
         """
         Construct a new `JsonTemplateEngine`.
         :param env: A JSON object in the string format providing binding data.
@@ -32,67 +49,345 @@ class JsonTemplateEngine(object):
         :type template_loader: 'str'
         :param verbose: Print more info if true.
         :type verbose: 'bool'
+        :param parallel: Resolve for-each loops in a process pool if true.
+                         A for-each tag labeled "parallel" or "serial", such
+                         as "#for-each:parallel", overrides this option.
+        :type parallel: 'bool'
+        :param max_workers: Number of worker processes. The number of CPUs is
+                            used if None.
+        :type max_workers: 'int'
+        :param parallel_threshold: Loops over fewer items are resolved
+                                   serially.
+        :type parallel_threshold: 'int'
+        :param copy_constants: Parts of the template without parameters,
+                               tags and escape characters are resolved once
+                               and shared by all results. Copy them for each
+                               result if true.
+        :type copy_constants: 'bool'
+        :param prefetch: Load templates referenced literally by tags of the
+                         main template, such as for-each templates,
+                         concurrently before the main template is resolved
+                         if true.
+        :type prefetch: 'bool'
+        :param limits: Limits of each resolution whose render context is
+                       created by the engine. A value referencing itself is
+                       reported by `CyclicReferenceException` with or
+                       without limits.
+        :type limits: 'RenderLimits'
+        :param codec: JSON codec parsing templates loaded by the default
+                      template loader and writing streamed results. The
+                      preferred codec installed is used if None.
+        :type codec: 'JsonCodec'
+        :param compact: Build resolved JSON objects as plain dicts instead of
+                        OrderedDicts if true. Objects resolved from the same
+                        template object share its keys. They use less memory
+                        and are serialized the same way.
+        :type compact: 'bool'
+        :param cache_dir: Directory of the persistent cache of compiled
+                          template files shared by engines and processes.
+                          Templates found in it are neither parsed nor
+                          compiled again. JSONTENG_CACHE_DIR is used if
+                          None. Templates are not cached on disk if neither
+                          is set.
+        :type cache_dir: 'str'
         """
-        self._env = env
+        self._prefetch = prefetch
+        self._limits = limits
+        self._codec = codec if codec is not None else get_codec()
         if template_loader is not None:
             self._template_loader = template_loader
         else:
             self._template_loader = DefaultJsonLoader(
-                os.environ.get("TEMPLATE_HOME"), verbose=verbose)
-        self._dup_params = OrderedDict()
-        self._stats = Stats()
+                os.environ.get("TEMPLATE_HOME"), verbose=verbose,
+                codec=self._codec)
+        # The env binding data is indexed once and shared by all resolutions.
+        self._env_index = BindingIndex(env) if env else None
+        self._preloaded = dict()
+        # Render context of the most recent resolution of each thread.
+        self._local = threading.local()
+        if cache_dir is None:
+            cache_dir = os.environ.get("JSONTENG_CACHE_DIR")
+        template_cache = None
+        if cache_dir:
+            # pickle and tempfile are imported only if templates are cached
+            from jsonteng.template_cache import TemplateCache
+            template_cache = TemplateCache(cache_dir)
+        self._parallel_executor = ParallelExecutor(
+            parallel, max_workers, parallel_threshold, compact)
         self._element_resolver = ElementResolver(
-            self._template_loader, self._stats)
+            self._template_loader, Stats(), self._parallel_executor,
+            copy_constants, compact, template_cache)
 
-    def resolve(self, main_template, binding_data_list):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
         """
-        Resolve a template.
-        :param main_template: The main template to be resolved.
+        Stop the worker processes of parallel for-each loops. The engine
+        can still be used and starts them again when a loop is resolved in
+        parallel.
+        """
+        self._parallel_executor.shutdown()
+
+    def compile(self, template):
+        """
+        Load and compile a template. The compiled template can be passed to
+        `resolve` repeatedly without loading and interpreting the template
+        again. It can only be resolved by this engine.
+        :param template: The template to be compiled.
+        :type template: 'str'
+        :return: Compiled template.
+        :rtype: 'CompiledTemplate'
+        """
+        root = self._element_resolver.load_template(template)
+        try:
+            location = self._template_loader.get_location()
+        finally:
+            self._template_loader.unload(template)
+        return CompiledTemplate(root, template, location,
+                                self._element_resolver)
+
+    def analyze(self, main_template):
+        """
+        Build the include graph of a template without resolving it.
+        Templates referenced literally, such as for-each templates, are
+        loaded and compiled recursively. Dynamic references are marked as
+        `TemplateGraph.UNKNOWN`.
+        :param main_template: The main template.
         :type main_template: 'str'
-        :param binding_data_list: Binding data list
+        :return: Include graph.
+        :rtype: 'TemplateGraph'
+        """
+        return TemplateAnalyzer(
+            self._template_loader, self._element_resolver).analyze(
+            main_template)
+
+    def preload(self, main_template):
+        """
+        Load and compile a template and all templates it references
+        literally. Later resolutions of the template by this engine do not
+        load them again. Dependency cycles and missing templates are
+        reported by TemplateEngineException.
+        :param main_template: The main template.
+        :type main_template: 'str'
+        :return: Include graph.
+        :rtype: 'TemplateGraph'
+        """
+        graph = self.analyze(main_template)
+        self._preloaded[main_template] = graph.get_main_template()
+        return graph
+
+    def resolve(self, main_template, binding_data_list, context=None):
+        """
+        Resolve a template. The binding data list is not modified.
+        :param main_template: The main template to be resolved. It is either
+                              a template resource or a template compiled by
+                              `compile`.
+        :type main_template: Union['str', 'CompiledTemplate']
+        :param binding_data_list: Binding data list. A `BindingIndex` in the
+                                  list is used as is so that its lookups and
+                                  flattened names are shared by resolutions
+                                  against the same binding data.
         :type binding_data_list: 'list'
+        :param context: Render context receiving the stats and the
+                        duplicated parameters of the resolution. A new
+                        context is created if None.
+        :type context: 'RenderContext'
         :return: resolved JSON object
         :rtype: JSON object
         """
-        self._stats.clear()
-        main_template_json = self._template_loader.load(main_template)
-        effective_binding_data_list = binding_data_list
-        if self._env:
-            effective_binding_data_list.append(self._env)
-        self._dup_params = check_duplicated_binding_data(
-            effective_binding_data_list)
+        resolved_json = self._process(
+            main_template, binding_data_list,
+            lambda node, scope: node.emit(scope), context)
+        if resolved_json is TagBase.TAG_NONE:
+            raise unknown_data_type_error(resolved_json)
+        return resolved_json
 
-        resolved_json = self._element_resolver.resolve(
-            main_template_json, effective_binding_data_list)
-        self._template_loader.unload(main_template)
-        return unescape_json(resolved_json)
+    def resolve_many(self, main_template, binding_data_lists,
+                     instrument=None):
+        """
+        Resolve a template for each binding data list. The template is
+        loaded and compiled once and the env binding data is indexed once
+        for all binding data lists. Binding data lists are not modified.
+        :param main_template: The main template to be resolved. It is either
+                              a template resource or a template compiled by
+                              `compile`.
+        :type main_template: Union['str', 'CompiledTemplate']
+        :param binding_data_lists: Iterable of binding data lists.
+        :type binding_data_lists: 'iterable'
+        :param instrument: Instrument observing all resolutions or None.
+        :type instrument: 'Instrument'
+        :return: Generator of resolved JSON objects.
+        :rtype: 'generator'
+        """
+        if not isinstance(main_template, CompiledTemplate):
+            main_template = self.compile(main_template)
+        for binding_data_list in binding_data_lists:
+            resolved_json = self._process(
+                main_template, binding_data_list,
+                lambda node, scope: node.emit(scope),
+                RenderContext(instrument=instrument, limits=self._limits))
+            if resolved_json is TagBase.TAG_NONE:
+                raise unknown_data_type_error(resolved_json)
+            yield resolved_json
+
+    def resolve_to_stream(self, main_template, binding_data_list, fp,
+                          indent=None, separators=None, context=None):
+        """
+        Resolve a template and write the resolved JSON text to a file object
+        while the template is resolved. Items of for-each tags are written
+        as soon as they are resolved, so the memory used is bounded by the
+        template rather than by the output. The text is the same as
+        `json.dump` of the result of `resolve`. If the resolution fails, a
+        part of the text may have been written.
+        :param main_template: The main template to be resolved. It is either
+                              a template resource or a template compiled by
+                              `compile`.
+        :type main_template: Union['str', 'CompiledTemplate']
+        :param binding_data_list: Binding data list
+        :type binding_data_list: 'list'
+        :param fp: File object the JSON text is written to.
+        :type fp: 'file'
+        :param indent: Indent level as in `json.dump`.
+        :type indent: 'int'
+        :param separators: Item and key separators as in `json.dump`.
+        :type separators: 'tuple'
+        :param context: Render context receiving the stats and the
+                        duplicated parameters of the resolution. A new
+                        context is created if None.
+        :type context: 'RenderContext'
+        """
+        writer = JsonStreamWriter(fp, indent, separators, self._codec)
+        self._process(main_template, binding_data_list, writer.write,
+                      context)
+
+    def _process(self, main_template, binding_data_list, processor,
+                 context=None):
+        """
+        Prepare the main template and the scope and process the template.
+        :param main_template: The main template to be resolved.
+        :type main_template: Union['str', 'CompiledTemplate']
+        :param binding_data_list: Binding data list
+        :type binding_data_list: 'list'
+        :param processor: A function of the compiled main template and the
+                          scope.
+        :type processor: 'function'
+        :param context: Render context of the resolution or None.
+        :type context: 'RenderContext'
+        :return: Return value of the processor.
+        """
+        if context is None:
+            context = RenderContext(limits=self._limits)
+        self._local.context = context
+        if isinstance(main_template, str):
+            main_template = self._preloaded.get(main_template, main_template)
+        if isinstance(main_template, CompiledTemplate):
+            if main_template.owner is not self._element_resolver:
+                raise TemplateEngineException(
+                    "Template {} is compiled by another engine.".format(
+                        main_template.source))
+            self._template_loader.enter(
+                main_template.source, main_template.location)
+            main_template_node = main_template.root
+            main_template = main_template.source
+        else:
+            main_template_node = self._load(main_template, context)
+        instrument = context.instrument
+        if instrument is not None:
+            instrument.enter(Instrument.TEMPLATE, main_template)
+        try:
+            if self._prefetch:
+                self._template_loader.prefetch(
+                    [reference for node in walk(main_template_node)
+                     if isinstance(node, TagNode)
+                     for reference in node.get_references()])
+            scope_layers = list(binding_data_list)
+            if self._env_index is not None:
+                scope_layers.append(self._env_index)
+            context.scope = ScopeChain(scope_layers, context)
+            return processor(main_template_node, context.scope)
+        finally:
+            if instrument is not None:
+                instrument.exit(Instrument.TEMPLATE, main_template)
+            self._template_loader.unload(main_template)
+
+    def _load(self, template, context):
+        """
+        Load and compile a template and report it to the instrument of a
+        render context.
+        :param template: Template resource.
+        :type template: 'str'
+        :param context: Render context.
+        :type context: 'RenderContext'
+        :return: Root node of the template.
+        :rtype: 'TemplateNode'
+        """
+        instrument = context.instrument
+        if instrument is None:
+            return self._element_resolver.load_template(template)
+        instrument.enter(Instrument.LOAD, template)
+        try:
+            return self._element_resolver.load_template(template)
+        finally:
+            instrument.exit(Instrument.LOAD, template)
 
     def get_duplicated_parameters(self):
         """
-        Get duplicated parameters in the binding data list.
+        Get duplicated parameters in the binding data list of the most
+        recent resolution of the calling thread. They are found when this
+        method is called.
         :return: Duplicated parameters with the key to be the parameter name
                  and value to be a list of parameter values.
         :rtype: 'dict'
         """
-        return self._dup_params
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            return OrderedDict()
+        return context.get_duplicated_parameters()
+
+    def get_cache_stats(self):
+        """
+        Get the numbers of resolved parameter values reused and resolved
+        by the most recent resolution of the calling thread.
+        :return: Numbers of hits and misses.
+        :rtype: 'dict'
+        """
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            return OrderedDict([("hits", 0), ("misses", 0)])
+        return context.stats.get_cache_stats()
 
     def get_stats(self):
         """
-        Get stats for parameter expansions.
+        Get stats for parameter expansions of the most recent resolution of
+        the calling thread.
         :return: a dictionary with key to be parameter name and value to be
                  number of times the parameter is expanded.
         :rtype: 'dict'
         """
-        return self._stats.get_stats()
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            return OrderedDict()
+        return context.stats.get_stats()
 
     @staticmethod
     def add_tags(tags):
         """
         Add a list of tags to supplement built-in tags.
-        :param tags: A list of tags.
+        :param tags: A list of tag class paths such as
+                     "package.module.Class". A tag given as
+                     "name=package.module.Class" is imported when it is
+                     first used.
         :type tags: 'list'
         """
         for tag_class in tags:
+            tag_name, separator, tag_path = tag_class.partition('=')
+            if separator:
+                add_tag(tag_name, tag_path)
+                continue
             module_path, class_name = tag_class.rsplit('.', 1)
             module = import_module(module_path)
             class_object = getattr(module, class_name)
@@ -108,12 +403,27 @@ class JsonTemplateEngine(object):
         return get_tag_names()
 
 
-def main(args=None):
+def main(args=None, engine_pool=None):
     """
     CLI version of the template engine.
+    :param args: Command line arguments. sys.argv is used if None.
+    :type args: 'list'
+    :param engine_pool: Pool keeping loaders and engines warm across calls,
+                        such as the pool of a render server worker. New
+                        ones are created if None.
+    :type engine_pool: 'EnginePool'
     """
+    def _get(key, factory):
+        if engine_pool is None:
+            return factory()
+        return engine_pool.get(key, factory)
+
+    # Imported here since the library does not use them.
+    import argparse
+    import datetime
+
     parser = argparse.ArgumentParser(description='JSON template engine.')
-    parser.add_argument('-b', '--binding-data-resources', required=True,
+    parser.add_argument('-b', '--binding-data-resources', required=False,
                         help="a comma separated list of binding data"
                              " resource locators")
     parser.add_argument('-e', '--env', required=False,
@@ -131,18 +441,74 @@ def main(args=None):
                         help="unformatted output",
                         action="store_true")
     parser.add_argument('-t', '--tags', required=False,
-                        help="comma separated tag list")
+                        help="comma separated list of tag class paths."
+                             " A tag given as name=path is imported when"
+                             " it is used")
+    parser.add_argument('--stream', required=False,
+                        help="write the output while the template is"
+                             " resolved",
+                        action="store_true")
+    parser.add_argument('-c', '--concurrent-loading', required=False,
+                        help="load binding data resources and templates"
+                             " concurrently",
+                        action="store_true")
+    parser.add_argument('-p', '--parallel', required=False,
+                        help="resolve for-each loops in parallel",
+                        action="store_true")
+    parser.add_argument('-l', '--json-lines', required=False,
+                        help="read a binding data list from each line of"
+                             " stdin and write each resolved JSON in a line."
+                             " Binding data resources are appended to each"
+                             " binding data list",
+                        action="store_true")
+    parser.add_argument('--profile', required=False,
+                        help="print the time spent per template, tag and"
+                             " string to stderr",
+                        action="store_true")
+    parser.add_argument('--profile-folded', required=False,
+                        metavar="FILE",
+                        help="profile and write folded stacks for flame"
+                             " graphs to a file")
+    parser.add_argument('--max-expansions', required=False, type=int,
+                        help="fail if more parameters are expanded")
+    parser.add_argument('--max-depth', required=False, type=int,
+                        help="fail if parameter values and for-each loops"
+                             " are nested deeper")
+    parser.add_argument('--max-nodes', required=False, type=int,
+                        help="fail if more JSON values are built")
+    parser.add_argument('--timeout', required=False, type=float,
+                        help="fail if a resolution takes more seconds")
+    parser.add_argument('--compact', required=False,
+                        help="build resolved JSON objects as plain dicts"
+                             " sharing keys to use less memory",
+                        action="store_true")
+    parser.add_argument('--json-codec', required=False,
+                        choices=get_codec_names(),
+                        help="JSON parser and serializer. The first one"
+                             " installed is used by default")
+    parser.add_argument('--cache-dir', required=False,
+                        help="directory caching compiled templates across"
+                             " runs. JSONTENG_CACHE_DIR is used by default")
     parser.add_argument('main_template')
     params = parser.parse_args(args=args)
-    binding_file_list = params.binding_data_resources.split(';')
-    binding_data_list = list()
-    loader = DefaultJsonLoader(verbose=params.verbose)
-    for binding_file in binding_file_list:
-        binding_data = loader.load(binding_file)
-        binding_data_list.append(binding_data)
-        loader.unload(binding_file)
-    env_binding = json.loads(
-        params.env, object_pairs_hook=OrderedDict) if params.env else None
+    if not params.binding_data_resources and not params.json_lines:
+        parser.error("the following arguments are required:"
+                     " -b/--binding-data-resources")
+    binding_file_list = params.binding_data_resources.split(';') \
+        if params.binding_data_resources else list()
+    codec = get_codec(params.json_codec)
+    loader = _get(("loader", params.verbose, codec.name),
+                  lambda: DefaultJsonLoader(verbose=params.verbose,
+                                            codec=codec))
+    if params.concurrent_loading:
+        binding_data_list = loader.load_all(binding_file_list)
+    else:
+        binding_data_list = list()
+        for binding_file in binding_file_list:
+            binding_data = loader.load(binding_file)
+            binding_data_list.append(binding_data)
+            loader.unload(binding_file)
+    env_binding = codec.loads(params.env) if params.env else None
     main_template = params.main_template
 
     if params.debug:
@@ -154,29 +520,118 @@ def main(args=None):
         tags = params.tags.split(',')
         JsonTemplateEngine.add_tags(tags)
 
-    template_engine = JsonTemplateEngine(env_binding, verbose=params.verbose)
-    start_time = datetime.datetime.now()
+    limit_values = (params.max_expansions, params.max_depth,
+                    params.max_nodes, params.timeout)
+    limits = RenderLimits(*limit_values) \
+        if any(value is not None for value in limit_values) else None
+    template_engine = _get(
+        ("engine", params.env, params.verbose, params.parallel,
+         params.concurrent_loading, limit_values, codec.name, params.compact,
+         params.cache_dir, params.tags),
+        lambda: JsonTemplateEngine(env_binding, verbose=params.verbose,
+                                   parallel=params.parallel,
+                                   prefetch=params.concurrent_loading,
+                                   limits=limits, codec=codec,
+                                   compact=params.compact,
+                                   cache_dir=params.cache_dir))
     try:
-        resolved_json = template_engine.resolve(
-            main_template, binding_data_list)
-    except TemplateEngineException as e:
-        print(e)
-        exit(1)
-    end_time = datetime.datetime.now()
-    if params.verbose:
-        for dup_param in template_engine.get_duplicated_parameters():
-            print("Warning: Parameter {} has duplicated values".
-                  format(dup_param))
-        delta = end_time - start_time
-        print("Resolved JSON in {}".format(delta))
-    if params.raw:
-        print(json.dumps(resolved_json, separators=(',', ':')))
-    else:
-        print(json.dumps(resolved_json, indent=2))
-    if params.stats:
-        print("Parameter usage")
-        param_map = template_engine.get_stats()
-        print(json.dumps(param_map, indent=2, sort_keys=True))
+        profiler = Profiler() \
+            if params.profile or params.profile_folded else None
+        if params.json_lines:
+            try:
+                for resolved_json in template_engine.resolve_many(
+                        main_template,
+                        _read_binding_data_lists(
+                            sys.stdin, [BindingIndex(binding_data)
+                                        for binding_data in binding_data_list],
+                            codec),
+                        profiler):
+                    print(codec.dumps(resolved_json, separators=(',', ':')))
+            except TemplateEngineException as e:
+                print(e)
+                exit(1)
+            _write_profile(profiler, params.profile_folded)
+            return
+        if params.raw:
+            indent, separators = None, (',', ':')
+        else:
+            indent, separators = 2, None
+        context = RenderContext(instrument=profiler, limits=limits)
+        start_time = datetime.datetime.now()
+        try:
+            if params.stream:
+                template_engine.resolve_to_stream(
+                    main_template, binding_data_list, sys.stdout,
+                    indent, separators, context)
+                print()
+            else:
+                resolved_json = template_engine.resolve(
+                    main_template, binding_data_list, context)
+        except TemplateEngineException as e:
+            print(e)
+            exit(1)
+        end_time = datetime.datetime.now()
+        if params.verbose:
+            for dup_param in template_engine.get_duplicated_parameters():
+                print("Warning: Parameter {} has duplicated values".
+                      format(dup_param))
+            delta = end_time - start_time
+            print("Resolved JSON in {}".format(delta))
+        if not params.stream:
+            print(codec.dumps(resolved_json, indent=indent,
+                              separators=separators))
+        if params.stats:
+            print("Parameter usage")
+            param_map = template_engine.get_stats()
+            print(codec.dumps(param_map, indent=2, sort_keys=True))
+            print("Parameter value cache")
+            print(codec.dumps(template_engine.get_cache_stats(), indent=2))
+        _write_profile(profiler, params.profile_folded)
+    finally:
+        if engine_pool is None:
+            template_engine.close()
+
+
+def _write_profile(profiler, folded_file):
+    """
+    Write the profile of the CLI resolutions.
+    :param profiler: Profiler or None if profiling is disabled.
+    :type profiler: 'Profiler'
+    :param folded_file: File the folded stacks are written to or None.
+    :type folded_file: 'str'
+    """
+    if profiler is None:
+        return
+    profiler.write_report(sys.stderr)
+    if folded_file:
+        with open(folded_file, 'w') as fp:
+            profiler.write_folded(fp)
+
+
+def _read_binding_data_lists(fp, common_binding_data_list, codec):
+    """
+    Read binding data lists in the JSON Lines format. Each line is a JSON
+    array of binding data or a JSON object of binding data.
+    :param fp: File object to read from.
+    :type fp: 'file'
+    :param common_binding_data_list: Binding data appended to each list.
+    :type common_binding_data_list: 'list'
+    :param codec: JSON codec parsing the lines.
+    :type codec: 'JsonCodec'
+    :return: Generator of binding data lists.
+    :rtype: 'generator'
+    """
+    for line in fp:
+        if not line.strip():
+            continue
+        try:
+            binding_data = codec.loads(line)
+        except json.JSONDecodeError as e:
+            raise TemplateEngineException(
+                "Invalid binding data {}: {}".format(line.strip(), e))
+        binding_data_list = binding_data \
+            if isinstance(binding_data, list) else [binding_data]
+        yield binding_data_list + common_binding_data_list
 
 
 # JsonTemplateEngine is primarily used as an embedded library. It can also be
@@ -0,0 +1,129 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+from collections import OrderedDict
+
+from .compiled_template import CompiledTemplate, TagNode, walk
+from .exception import TemplateEngineException
+
+
+class TemplateGraph(object):
+    """
+    Include graph of a main template. Templates are identified by their
+    locations. A template given as a JSON value is identified by the value.
+    """
+    # A reference which is only known when the template is resolved.
+    UNKNOWN = None
+
+    def __init__(self):
+        self.root = None
+        # Template IDs referenced by each template, including UNKNOWN, in
+        # the order of appearance.
+        self.dependencies = OrderedDict()
+        # Compiled template of each template.
+        self.templates = OrderedDict()
+
+    def get_main_template(self):
+        """
+        Return the compiled main template.
+        :return: Compiled main template.
+        :rtype: 'CompiledTemplate'
+        """
+        return self.templates[self.root]
+
+    def has_unknown_references(self):
+        """
+        Check whether any template references a template dynamically.
+        :return: True if a dynamic reference is found.
+        :rtype: 'bool'
+        """
+        return any(TemplateGraph.UNKNOWN in references
+                   for references in self.dependencies.values())
+
+
+class TemplateAnalyzer(object):
+    """
+    `TemplateAnalyzer` builds the include graph of a template without
+    resolving it. Templates referenced literally by tags are loaded and
+    compiled recursively. The compiled templates are attached to the
+    referencing tags so that they are not loaded when the main template is
+    resolved.
+    """
+    def __init__(self, template_loader, element_resolver):
+        """
+        Construct an analyzer.
+        :param template_loader: Template loader.
+        :type template_loader: 'JsonLoader'
+        :param element_resolver: Element resolver compiling the templates.
+        :type element_resolver: 'ElementResolver'
+        """
+        self._template_loader = template_loader
+        self._element_resolver = element_resolver
+
+    def analyze(self, main_template):
+        """
+        Build the include graph of a template.
+        :param main_template: Main template.
+        :type main_template: 'str'
+        :return: Include graph.
+        :rtype: 'TemplateGraph'
+        """
+        graph = TemplateGraph()
+        graph.root = self._visit(main_template, None, graph, list())
+        return graph
+
+    def _visit(self, template, referrer, graph, path):
+        """
+        Load and compile a template and visit its references.
+        :param template: Template resource.
+        :type template: 'str'
+        :param referrer: ID of the referencing template or None.
+        :type referrer: 'str'
+        :param graph: Include graph being built.
+        :type graph: 'TemplateGraph'
+        :param path: IDs of the templates being visited.
+        :type path: 'list'
+        :return: ID of the template.
+        :rtype: 'str'
+        """
+        root = self._element_resolver.load_template(template)
+        try:
+            template_json = root.element
+            location = self._template_loader.get_location()
+            template_id = location if location is not None else template
+            if template_id in path:
+                raise TemplateEngineException(
+                    "Template dependency cycle {}.".format(" -> ".join(
+                        path[path.index(template_id):] + [template_id])))
+            if location is None and template_json == template:
+                if referrer is None:
+                    raise TemplateEngineException(
+                        "Template {} is not found.".format(template))
+                raise TemplateEngineException(
+                    "Template {} referenced by {} is not found.".format(
+                        template, referrer))
+            if template_id in graph.templates:
+                return template_id
+            graph.templates[template_id] = CompiledTemplate(
+                root, template, location, self._element_resolver)
+            dependencies = graph.dependencies[template_id] = list()
+            path.append(template_id)
+            for node in walk(root):
+                if not isinstance(node, TagNode):
+                    continue
+                compiled_templates = OrderedDict()
+                for reference in node.get_references():
+                    if reference is None:
+                        dependencies.append(TemplateGraph.UNKNOWN)
+                        continue
+                    reference_id = self._visit(
+                        reference, template_id, graph, path)
+                    dependencies.append(reference_id)
+                    compiled_templates[reference] = \
+                        graph.templates[reference_id]
+                if compiled_templates:
+                    node.tag.preload(node.tag_tokens, compiled_templates)
+            path.pop()
+            return template_id
+        finally:
+            self._template_loader.unload(template)
@@ -1,10 +1,16 @@
 # Copyright 2019 VMware, Inc.
 # SPDX-License-Indentifier: Apache-2.0
 
+import re
 from collections import OrderedDict
 from numbers import Number
 
 from .exception import TemplateEngineException
+from .scope import BindingIndex
+
+# An escape character, the character it escapes and the character after it
+# which is kept as is.
+_ESCAPE_PATTERN = re.compile(r'\\([\s\S]?)([\s\S]?)')
 
 
 def unescape_json(element):
@@ -24,7 +30,8 @@ def unescape_json(element):
     elif element is None:
         return element
     elif isinstance(element, dict):
-        new_element = OrderedDict()
+        # compact results are plain dicts
+        new_element = dict() if type(element) is dict else OrderedDict()
         for key, value in element.items():
             new_key = unescape_json(key)
             new_value = unescape_json(value)
@@ -36,62 +43,115 @@ def unescape_json(element):
             new_item = unescape_json(item)
             new_element.append(new_item)
         return new_element
-    raise TemplateEngineException(
+    raise unknown_data_type_error(element)
+
+
+def copy_json(element):
+    """
+    Copy a JSON object. Objects and arrays are copied recursively. Plain
+    dicts are copied as plain dicts and other objects as OrderedDicts.
+    :param element: JSON object
+    :type element: JSON object
+    :return: Copied JSON object
+    :rtype: JSON object
+    """
+    if isinstance(element, dict):
+        if type(element) is dict:
+            return {key: copy_json(value) for key, value in element.items()}
+        return OrderedDict((key, copy_json(value))
+                           for key, value in element.items())
+    elif isinstance(element, list):
+        return [copy_json(item) for item in element]
+    return element
+
+
+def json_to_str(element):
+    """
+    Convert a resolved JSON value to the text it is expanded to within a
+    string. JSON objects are formatted as OrderedDicts whether or not they
+    are resolved as plain dicts.
+    :param element: JSON object
+    :type element: JSON object
+    :return: Text of the value.
+    :rtype: 'str'
+    """
+    if isinstance(element, (dict, list)):
+        return str(_order_json(element))
+    return str(element)
+
+
+def _order_json(element):
+    """
+    Copy a JSON object with objects converted to OrderedDicts.
+    """
+    if isinstance(element, dict):
+        return OrderedDict((key, _order_json(value))
+                           for key, value in element.items())
+    elif isinstance(element, list):
+        return [_order_json(item) for item in element]
+    return element
+
+
+def unknown_data_type_error(element):
+    """
+    Create the exception for an element which is not a JSON value.
+    :param element: Element of an unknown data type.
+    :type element: 'object'
+    :return: Exception to be raised.
+    :rtype: 'TemplateEngineException'
+    """
+    return TemplateEngineException(
         "Unknown data type {} of {}.".format(type(element), element))
 
 
 def unescape_string(escaped_string):
     """
-    Remove escape character in a string.
+    Remove escape character in a string. The character following an
+    escaped character is not checked for an escape character.
     :param escaped_string: String to be unescaped.
     :type escaped_string: 'str'
     :return: Unescaped string.
     :rtype: 'str'
     """
-    modified_string = escaped_string
-    str_len = len(modified_string)
-    i = 0
-    while i < str_len:
-        c = modified_string[i]
-        if c == '\\':
-            # skip escaped char
-            new_str = modified_string[:i]
-            i += 1
-            if i < str_len:
-                new_str += modified_string[i:]
-            modified_string = new_str
-            str_len = len(modified_string)
-        i += 1
-    return modified_string
+    if '\\' not in escaped_string:
+        return escaped_string
+    return _ESCAPE_PATTERN.sub(r'\1\2', escaped_string)
+
+
+def unescape_segment(escaped_segment):
+    """
+    Remove escape character in a segment of a string. Unescaped segments
+    can be joined into the unescaped string unless the last escape sequence
+    of a segment extends into the next segment.
+    :param escaped_segment: Segment to be unescaped.
+    :type escaped_segment: 'str'
+    :return: Unescaped segment or None if the last escape sequence extends
+             past the end of the segment.
+    :rtype: 'str'
+    """
+    if '\\' not in escaped_segment:
+        return escaped_segment
+    last_match = None
+    for last_match in _ESCAPE_PATTERN.finditer(escaped_segment):
+        pass
+    if last_match.end() == len(escaped_segment) and \
+            last_match.end() - last_match.start() < 3:
+        return None
+    return _ESCAPE_PATTERN.sub(r'\1\2', escaped_segment)
 
 
 def check_duplicated_binding_data(binding_data_list):
     """
     Check duplicated parameters in binding data list.
-    :param binding_data_list: Binding data list to be checked.
+    :param binding_data_list: Binding data list to be checked. A binding
+                              index in the list is used as is so that its
+                              flattened names are reused.
     :type binding_data_list: 'list'
     :return: A dictionary with key of duplicated parameters and value of
              duplicated assignments.
     :rtype: 'dict'
     """
-    def _find_param_terminal(super_name, sub_binding_data, data_map):
-        for item in sub_binding_data.items():
-            name = item[0]
-            if super_name:
-                name = super_name + '.' + name
-            if isinstance(item[1], dict):
-                _find_param_terminal(name, item[1], data_map)
-            else:
-                if name not in data_map:
-                    data_map[name] = list()
-                param_values = data_map[name]
-                param_values.append(item[1])
-
-    binding_data_map = OrderedDict()
-    for binding_data in binding_data_list:
-        _find_param_terminal(None, binding_data, binding_data_map)
-    dup_map = OrderedDict()
-    for param, values in binding_data_map.items():
-        if len(values) > 1:
-            dup_map[param] = values
-    return dup_map
+    return BindingIndex.find_duplicates(
+        [binding_data if isinstance(binding_data, BindingIndex)
+         else BindingIndex(binding_data)
+         for binding_data in binding_data_list])
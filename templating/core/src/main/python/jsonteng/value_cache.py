@@ -0,0 +1,158 @@
+# Copyright 2019 VMware, Inc.
+# SPDX-License-Indentifier: Apache-2.0
+
+# Returned by `get` when no valid entry is cached.
+_MISS = type('Miss', (), {})()
+
+
+class ValueCache(object):
+    """
+    Resolved values of parameters within one scope. A value which needs to
+    be resolved, such as a string with parameter references, is resolved
+    once and reused by later references to the same parameter. While a
+    value is resolved, the keys of the parameters looked up for it are
+    recorded. An entry depends on the frames of the scope containing any of
+    these keys. It is removed when one of these frames is replaced or
+    removed, and it is not used under a newer frame containing any of these
+    keys, such as a for-each item shadowing a parameter.
+    """
+    def __init__(self, frames, loop_index_name):
+        """
+        Construct a cache.
+        :param frames: Frames of the scope. The list is shared with the
+                       scope.
+        :type frames: 'list'
+        :param loop_index_name: Parameter name of the loop index of a loop
+                                frame.
+        :type loop_index_name: 'str'
+        """
+        self._frames = frames
+        self._loop_index_name = loop_index_name
+        # Each entry is a tuple of (parameter value, resolved value, depth,
+        # keys, expansions). Frames below the depth may contain the keys.
+        self._entries = dict()
+        # Entry keys by depth.
+        self._levels = [list()]
+        # Each recorder is a tuple of (keys, expansions) of the values being
+        # resolved.
+        self._recorders = list()
+        # True while a value is resolved.
+        self.recording = False
+
+    def get(self, name, unescape, value):
+        """
+        Get the resolved value of a parameter. The value is shared with
+        the cache.
+        :param name: Parameter name.
+        :type name: 'str'
+        :param unescape: True if the value is resolved for output.
+        :type unescape: 'bool'
+        :param value: Parameter value found in the scope.
+        :type value: JSON data type
+        :return: A tuple of the resolved value and the parameter expansions
+                 made to resolve it, or None if it is not cached. The
+                 expansions map parameter names to counts.
+        :rtype: 'tuple'
+        """
+        entry = self._entries.get((name, unescape))
+        if entry is None or entry[0] is not value:
+            return None
+        _, resolved_value, depth, keys, expansions = entry
+        frames = self._frames
+        for frame_index in range(depth, len(frames)):
+            if self._contains(frames[frame_index], keys):
+                return None
+        if self._recorders:
+            recorded_keys, recorded_expansions = self._recorders[-1]
+            recorded_keys.update(keys)
+            ValueCache._add_expansions(recorded_expansions, expansions)
+        return resolved_value, expansions
+
+    def start(self):
+        """
+        Start recording the parameters looked up to resolve a value.
+        """
+        self._recorders.append((set(), dict()))
+        self.recording = True
+
+    def record(self, reference):
+        """
+        Record a parameter looked up while a value is resolved. It must be
+        called only while `recording` is true.
+        :param reference: Parameter reference.
+        :type reference: 'ParamReference'
+        """
+        keys, expansions = self._recorders[-1]
+        keys.update(reference.keys)
+        expansions[reference.name] = expansions.get(reference.name, 0) + 1
+
+    def finish(self, name=None, unescape=False, value=None,
+               resolved_value=_MISS):
+        """
+        Stop recording and cache the resolved value if it is given. The
+        recorded parameters are also recorded for the enclosing value.
+        :param name: Parameter name.
+        :type name: 'str'
+        :param unescape: True if the value is resolved for output.
+        :type unescape: 'bool'
+        :param value: Parameter value found in the scope.
+        :type value: JSON data type
+        :param resolved_value: Resolved value. Nothing is cached if it is
+                               not given.
+        :type resolved_value: JSON data type
+        """
+        keys, expansions = self._recorders.pop()
+        self.recording = bool(self._recorders)
+        if self._recorders:
+            recorded_keys, recorded_expansions = self._recorders[-1]
+            recorded_keys.update(keys)
+            ValueCache._add_expansions(recorded_expansions, expansions)
+        if resolved_value is _MISS:
+            return
+        frames = self._frames
+        depth = len(frames)
+        while depth and not self._contains(frames[depth - 1], keys):
+            depth -= 1
+        entry_key = (name, unescape)
+        self._entries[entry_key] = (value, resolved_value, depth,
+                                    frozenset(keys), expansions)
+        levels = self._levels
+        while len(levels) <= depth:
+            levels.append(list())
+        levels[depth].append(entry_key)
+
+    def invalidate(self, frame_index):
+        """
+        Remove entries depending on a frame which is replaced or removed.
+        :param frame_index: Index of the frame.
+        :type frame_index: 'int'
+        """
+        levels = self._levels
+        if len(levels) <= frame_index + 1:
+            return
+        entries = self._entries
+        for level in levels[frame_index + 1:]:
+            for entry_key in level:
+                entries.pop(entry_key, None)
+        del levels[frame_index + 1:]
+
+    def _contains(self, frame, keys):
+        """
+        Check whether a frame contains any of the keys.
+        :param frame: Frame of the scope.
+        :type frame: 'list'
+        :param keys: Keys of binding data.
+        :type keys: 'set'
+        :return: True if the frame may change the lookup of the keys.
+        :rtype: 'bool'
+        """
+        binding_data, index = frame
+        if index is not None and self._loop_index_name in keys:
+            return True
+        return isinstance(binding_data, dict) and \
+            not keys.isdisjoint(binding_data)
+
+    @staticmethod
+    def _add_expansions(expansions, other_expansions):
+        for name, count in other_expansions.items():
+            expansions[name] = expansions.get(name, 0) + count
@@ -15,6 +15,11 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="",
     packages=setuptools.find_packages(),
+    python_requires=">=3.9",
+    extras_require={
+        # Faster JSON codec used when installed.
+        "orjson": ["orjson"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",
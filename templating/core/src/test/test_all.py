@@ -277,3 +277,472 @@ class TestJsonteng(unittest.TestCase):
             output = _run_test(lang, ["-r", "-b", '{"z":"xyz"}', template])
             self.assertEqual('Tag "to-null" invalid string "xyz"\n',
                              output, f'test_tonull_invalid_str - {lang}')
+
+
+class TestJsontengLibrary(unittest.TestCase):
+    """
+    Unit tests for the Python template engine used as a library.
+    """
+    def test_compile(self):
+        """
+        Test resolving a compiled template repeatedly.
+        """
+        from jsonteng.template_engine import JsonTemplateEngine
+        template = '{"x":["#for-each","${list}","{\\"y\\":\\"${z}\\"}"],"n":"${n}"}'
+        engine = JsonTemplateEngine()
+        compiled_template = engine.compile(template)
+        for n in range(2):
+            resolved_json = engine.resolve(
+                compiled_template, [{"list": [{"z": "100"}, {"z": "200"}], "n": n}])
+            self.assertEqual({"x": [{"y": "100"}, {"y": "200"}], "n": n}, resolved_json)
+
+    def test_nested_param(self):
+        """
+        Test resolving strings with nested and escaped parameter references.
+        """
+        from jsonteng.template_engine import JsonTemplateEngine
+        template = '{"x": "${a.${k}}", "y": "pre-${a.${k}}-\\\\${k}-${k}"}'
+        resolved_json = JsonTemplateEngine().resolve(
+            template, [{"a": {"p": [1]}, "k": "p"}])
+        self.assertEqual({"x": [1], "y": "pre-[1]-${k}-p"}, resolved_json)
+
+    def test_foreach_scope(self):
+        """
+        Test loop frames are removed when a for-each loop fails.
+        """
+        from jsonteng.template_engine import JsonTemplateEngine
+        template = '{"x":["#exists",["#for-each",[{"a":1}],"{\\"v\\":\\"${b}\\"}"]],"y":"${a}-${_index_}"}'
+        resolved_json = JsonTemplateEngine().resolve(template, [{"a": 2, "_index_": "i"}])
+        self.assertEqual({"x": "False", "y": "2-i"}, resolved_json)
+
+    def test_parallel_foreach(self):
+        """
+        Test parallel for-each loops preserve order, filters and loop indices.
+        """
+        from jsonteng.template_engine import JsonTemplateEngine
+        template = '{"x":["#for-each:parallel","${list}","{\\"i\\":\\"${_index_}\\",\\"v\\":[\\"#one-of\\",[\\"${v} > 3\\",\\"${v}\\"]]}","${v} != 5"],' \
+                   '"y":["#for-each:serial","${list}","[\\"${v}\\",\\"${_index_}\\"]"]}'
+        binding_data_list = [{"list": [{"v": v} for v in range(8)]}]
+        serial_engine = JsonTemplateEngine()
+        expected_json = serial_engine.resolve(template, binding_data_list)
+        with JsonTemplateEngine(max_workers=2,
+                                parallel_threshold=2) as engine:
+            self.assertEqual(expected_json,
+                             engine.resolve(template, binding_data_list))
+            self.assertEqual(serial_engine.get_stats(), engine.get_stats())
+            # the worker processes serve the following loops with their
+            # own data
+            binding_data_list = [{"list": [{"v": v}
+                                           for v in range(4, 12)]}]
+            self.assertEqual(
+                serial_engine.resolve(template, binding_data_list),
+                engine.resolve(template, binding_data_list))
+            # a closed engine starts its worker processes again
+            engine.close()
+            self.assertEqual(expected_json, engine.resolve(
+                template, [{"list": [{"v": v} for v in range(8)]}]))
+
+    def test_resolve_to_stream(self):
+        """
+        Test streamed output is the same as the serialized resolved template.
+        """
+        import io
+        import json
+        from jsonteng.template_engine import JsonTemplateEngine
+        template = '{"x":["#for-each","${list}","{\\"y\\":\\"${z}\\"}"],"e":[],"n":["#one-of",["${n} > 0","${n}"]]}'
+        binding_data_list = [{"list": [{"z": "100"}, {"z": "\\\\$200"}], "n": 1}]
+        engine = JsonTemplateEngine()
+        expected_text = json.dumps(engine.resolve(template, binding_data_list), indent=2)
+        fp = io.StringIO()
+        engine.resolve_to_stream(template, binding_data_list, fp, indent=2)
+        self.assertEqual(expected_text, fp.getvalue())
+
+    def test_loader_cache(self):
+        """
+        Test loaded templates are cached and reloaded when the file changes.
+        """
+        import tempfile
+        from jsonteng.json_cache import JsonCache
+        from jsonteng.json_loader import DefaultJsonLoader
+        cache = JsonCache()
+        loaders = [DefaultJsonLoader(cache=cache), DefaultJsonLoader(cache=cache)]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            template = os.path.join(temp_dir, 'template.json')
+            with open(template, 'w') as fp:
+                fp.write('{"a": 1}')
+            for loader in loaders:
+                self.assertEqual({"a": 1}, loader.load(template))
+                loader.unload(template)
+            self.assertEqual(1, cache.get_stats()["hits"])
+            with open(template, 'w') as fp:
+                fp.write('{"a": 22}')
+            self.assertEqual({"a": 22}, loaders[0].load(template))
+            loaders[0].unload(template)
+            self.assertEqual(2, cache.get_stats()["misses"])
+
+    def test_constant_subtree(self):
+        """
+        Test constant parts of a template are shared unless copying is requested.
+        """
+        from jsonteng.template_engine import JsonTemplateEngine
+        template = '{"c":{"a":[1,{"b":null}]},"v":"${v}","e":{"k":"\\\\${v}"}}'
+        for copy_constants in (False, True):
+            engine = JsonTemplateEngine(copy_constants=copy_constants)
+            compiled_template = engine.compile(template)
+            first_json = engine.resolve(compiled_template, [{"v": 1}])
+            second_json = engine.resolve(compiled_template, [{"v": 2}])
+            self.assertEqual({"c": {"a": [1, {"b": None}]}, "v": 2, "e": {"k": "${v}"}}, second_json)
+            self.assertEqual(not copy_constants, first_json["c"] is second_json["c"])
+
+    def test_resolve_many(self):
+        """
+        Test resolving a template for multiple binding data lists.
+        """
+        from jsonteng.template_engine import JsonTemplateEngine
+        engine = JsonTemplateEngine(env={"y": "env"})
+        binding_data_lists = [[{"x": 1}], [{"x": 2, "y": 3}]]
+        resolved_jsons = list(engine.resolve_many('{"x":"${x}","y":"${y}"}', binding_data_lists))
+        self.assertEqual([{"x": 1, "y": "env"}, {"x": 2, "y": 3}], resolved_jsons)
+        self.assertEqual([[{"x": 1}], [{"x": 2, "y": 3}]], binding_data_lists)
+
+    def test_concurrent_loading(self):
+        """
+        Test loading binding data concurrently and prefetching loop templates.
+        """
+        import tempfile
+        from jsonteng.json_loader import DefaultJsonLoader
+        from jsonteng.template_engine import JsonTemplateEngine
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, content in (('b1.json', '{"l": [{"v": 1}, {"v": 2}]}'), ('b2.json', '{"l": []}'),
+                                  ('item.json', '{"v": "${v}"}'),
+                                  ('main.json', '{"x": ["#for-each", "${l}", "item.json"]}')):
+                with open(os.path.join(temp_dir, name), 'w') as fp:
+                    fp.write(content)
+            loader = DefaultJsonLoader(temp_dir + '/')
+            binding_data_list = loader.load_all(['b1.json', 'b2.json'])
+            self.assertEqual([{"l": [{"v": 1}, {"v": 2}]}, {"l": []}], binding_data_list)
+            engine = JsonTemplateEngine(template_loader=loader, prefetch=True)
+            resolved_json = engine.resolve('main.json', binding_data_list)
+            self.assertEqual({"x": [{"v": 1}, {"v": 2}]}, resolved_json)
+            self.assertEqual(1, loader.get_cache().get_stats()["hits"])
+
+    def test_preload(self):
+        """
+        Test building the include graph and preloading templates.
+        """
+        import tempfile
+        from jsonteng.exception import TemplateEngineException
+        from jsonteng.json_loader import DefaultJsonLoader
+        from jsonteng.template_engine import JsonTemplateEngine
+        from jsonteng.template_graph import TemplateGraph
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, content in (('item.json', '{"v": "${v}"}'),
+                                  ('main.json', '{"x": ["#for-each", "${l}", "item.json"], "y": ["#for-each", "${l}", "${t}"]}'),
+                                  ('cycle.json', '{"x": ["#for-each", "${l}", "cycle.json"]}')):
+                with open(os.path.join(temp_dir, name), 'w') as fp:
+                    fp.write(content)
+            loader = DefaultJsonLoader(temp_dir + '/')
+            engine = JsonTemplateEngine(template_loader=loader)
+            graph = engine.preload('main.json')
+            self.assertEqual([graph.root, f'file://{temp_dir}/item.json'], list(graph.dependencies))
+            self.assertEqual([f'file://{temp_dir}/item.json', TemplateGraph.UNKNOWN], graph.dependencies[graph.root])
+            misses = loader.get_cache().get_stats()["misses"]
+            resolved_json = engine.resolve('main.json', [{"l": [{"v": 1}], "t": "item.json"}])
+            self.assertEqual({"x": [{"v": 1}], "y": [{"v": 1}]}, resolved_json)
+            self.assertEqual(misses, loader.get_cache().get_stats()["misses"])
+            self.assertRaises(TemplateEngineException, engine.preload, 'cycle.json')
+
+    def test_condition_expression(self):
+        """
+        Test conditions evaluated by the compiled expression evaluator.
+        """
+        from jsonteng.element_resolver import ElementResolver
+        from jsonteng.exception import TemplateEngineException
+        from jsonteng.scope import ScopeChain
+        from jsonteng.stats import Stats
+        from jsonteng.tags.tag_base import TagBase
+        element_resolver = ElementResolver(None, Stats())
+        binding_data = {"n": 5, "b": None, "s": "abc", "t": "'abc'",
+                        "l": "[1, 2]", "e": "False or 1",
+                        "c": "${n} == 5"}
+        # one condition per supported operator
+        for condition in ("${n} == 5", "${n} != 5", "${n} < 5",
+                          "${n} <= 5", "${n} > 3", "${n} >= 6",
+                          "2 in ${l}", "2 not in ${l}", "${b} is None",
+                          "${b} is not None", "not ${n} == 5",
+                          "-${n} == -5", "+${n} == 5", "~${n} == -6",
+                          "${n} + 1 == 6", "${n} - 1 == 4",
+                          "${n} * 2 == 10", "${n} / 2 == 2.5",
+                          "${n} // 2 == 2", "${n} % 2 == 1",
+                          "${n} ** 2 == 25", "${n} > 3 and ${n} < 4",
+                          "${n} > 3 or ${n} < 4",
+                          "('${s}' if ${n} > 3 else 'x') == 'abc'",
+                          "(${n} > 3) == True", "(1, 2) == (1, 2)",
+                          "{1, 2} == {2, 1}", "'${s}' == 'abc'",
+                          "${t} == 'abc'", "3 < ${n} <= 5",
+                          "${e} == 1", "${c}"):
+            condition_node = element_resolver.compile_condition(condition)
+            # the result of the restricted eval the evaluator replaces
+            expected = TagBase.safe_eval(
+                element_resolver.resolve(condition, [binding_data]))
+            self.assertEqual(expected, condition_node.evaluate(
+                ScopeChain([binding_data])), condition)
+        self.assertIsNotNone(
+            element_resolver.compile_condition("${n} > 3").expression)
+        self.assertTrue(element_resolver.compile_condition(True).evaluate(
+            ScopeChain([binding_data])))
+        for condition in ("${n} or 1", "len('${s}') == 3",
+                          "${n}.real == 5", "'${s}'.startswith('a')", 1):
+            self.assertRaises(
+                TemplateEngineException,
+                element_resolver.compile_condition(condition).evaluate,
+                ScopeChain([binding_data]))
+        # attribute access is left to the restricted eval of safe_eval
+        self.assertTrue(TagBase.safe_eval("'abc'.startswith('a')"))
+
+    def test_concurrent_resolve(self):
+        """
+        Test one engine resolving templates in multiple threads.
+        """
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        from jsonteng.json_loader import DefaultJsonLoader
+        from jsonteng.render_context import RenderContext
+        from jsonteng.template_engine import JsonTemplateEngine
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.mkdir(os.path.join(temp_dir, 'sub'))
+            for name, content in (('sub/item.json', '{"v": "${v}", "e": "${e}"}'),
+                                  ('main.json', '{"x": ["#for-each", "${l}", "sub/item.json"]}')):
+                with open(os.path.join(temp_dir, name), 'w') as fp:
+                    fp.write(content)
+            engine = JsonTemplateEngine(env={"e": 0}, template_loader=DefaultJsonLoader(temp_dir + '/'))
+
+            def resolve(count):
+                binding_data_list = [{"l": [{"v": index} for index in range(count)]}]
+                context = RenderContext()
+                resolved_json = engine.resolve('main.json', binding_data_list, context)
+                self.assertEqual(1, len(binding_data_list))
+                self.assertEqual(context.stats.get_stats(), engine.get_stats())
+                return resolved_json, context.stats.get_stats()["v"]
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(resolve, range(1, 41)))
+            for count, (resolved_json, expansions) in enumerate(results, 1):
+                self.assertEqual([{"v": index, "e": 0} for index in range(count)], resolved_json["x"])
+                self.assertEqual(count, expansions)
+
+    def test_duplicated_parameters(self):
+        """
+        Test finding duplicated parameters on demand.
+        """
+        from jsonteng.scope import BindingIndex
+        from jsonteng.template_engine import JsonTemplateEngine
+        engine = JsonTemplateEngine(env={"a": {"b": 3}})
+        binding_index = BindingIndex({"a.b": 2, "c": 1})
+        self.assertEqual({"x": 1}, engine.resolve('{"x": "${a.b}"}', [{"a": {"b": 1}}, binding_index]))
+        self.assertEqual({"a.b": [1, 2, 3]}, engine.get_duplicated_parameters())
+        self.assertIs(binding_index.flatten(), binding_index.flatten())
+        self.assertEqual({"x": 1}, engine.resolve('{"x": "${c}"}', [binding_index]))
+        self.assertEqual({"a.b": [2, 3]}, engine.get_duplicated_parameters())
+
+    def test_profiler(self):
+        """
+        Test profiling a resolution.
+        """
+        import io
+        from jsonteng.json_loader import DefaultJsonLoader
+        from jsonteng.profiler import Profiler
+        from jsonteng.render_context import RenderContext
+        from jsonteng.template_engine import JsonTemplateEngine
+        engine = JsonTemplateEngine(template_loader=DefaultJsonLoader())
+        profiler = Profiler()
+        context = RenderContext(instrument=profiler)
+        template = '{"x": ["#for-each", "${l}", "{\\"v\\": \\"${v}\\"}"]}'
+        resolved_json = engine.resolve(template, [{"l": [{"v": 1}, {"v": 2}]}], context)
+        self.assertEqual({"x": [{"v": 1}, {"v": 2}]}, resolved_json)
+        counts = {(entry["kind"], entry["name"]): entry["count"] for entry in profiler.get_stats()}
+        self.assertEqual(1, counts[("tag", "for-each")])
+        self.assertEqual(2, counts[("iteration", '{"v": "${v}"}')])
+        self.assertEqual(2, counts[("string", "${v}")])
+        folded = io.StringIO()
+        profiler.write_folded(folded)
+        self.assertIn(';tag:for-each;template:{"v": "${v}"};iteration:', folded.getvalue())
+        self.assertEqual({"x": [{"v": 1}]}, engine.resolve(template, [{"l": [{"v": 1}]}]))
+
+    def test_render_limits(self):
+        """
+        Test render limits and cyclic parameter references.
+        """
+        from jsonteng.exception import (CyclicReferenceException, ExpansionLimitException,
+                                        DepthLimitException, OutputLimitException)
+        from jsonteng.render_limits import RenderLimits
+        from jsonteng.template_engine import JsonTemplateEngine
+        engine = JsonTemplateEngine()
+        with self.assertRaises(CyclicReferenceException) as cm:
+            engine.resolve('{"x": "${a}"}', [{"a": "${b}", "b": "x-${a}"}])
+        self.assertEqual(["a", "b", "a"], cm.exception.chain)
+        binding_data = {"a0": 1}
+        for index in range(1, 8):
+            binding_data[f"a{index}"] = f"${{a{index - 1}}}${{a{index - 1}}}"
+        with self.assertRaises(ExpansionLimitException):
+            JsonTemplateEngine(limits=RenderLimits(max_expansions=100)).resolve('{"x": "${a7}"}', [binding_data])
+        with self.assertRaises(DepthLimitException):
+            JsonTemplateEngine(limits=RenderLimits(max_depth=3)).resolve('{"x": "${a7}"}', [binding_data])
+        template = '{"x": ["#for-each", "${l}", "[\\"${v}\\"]"]}'
+        engine = JsonTemplateEngine(limits=RenderLimits(max_nodes=10))
+        self.assertEqual({"x": [[0], [1]]}, engine.resolve(template, [{"l": [{"v": 0}, {"v": 1}]}]))
+        with self.assertRaises(OutputLimitException):
+            engine.resolve(template, [{"l": [{"v": index} for index in range(10)]}])
+
+    def test_value_cache(self):
+        """
+        Test reusing resolved parameter values.
+        """
+        import tempfile
+        from jsonteng.json_loader import DefaultJsonLoader
+        from jsonteng.template_engine import JsonTemplateEngine
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, content in (('item.json', '["${dns}", "${name}"]'),
+                                  ('main.json', '{"d": "${dns}", "e": "${dns}", "l": ["#for-each", "${l}", "item.json"]}')):
+                with open(os.path.join(temp_dir, name), 'w') as fp:
+                    fp.write(content)
+            engine = JsonTemplateEngine(template_loader=DefaultJsonLoader(temp_dir + '/'))
+            binding_data = {"site": "s1", "dns": ["${site}.a", "${site}.b"], "name": "${site}-${x}", "x": 0,
+                            "l": [{"x": 1}, {"x": 2}, {"y": 3}]}
+            dns = ["s1.a", "s1.b"]
+            self.assertEqual({"d": dns, "e": dns, "l": [[dns, "s1-1"], [dns, "s1-2"], [dns, "s1-0"]]},
+                             engine.resolve('main.json', [binding_data]))
+            self.assertEqual({"hits": 4, "misses": 5}, engine.get_cache_stats())
+            self.assertEqual({"dns": 5, "site": 13, "l": 1, "name": 3, "x": 3}, engine.get_stats())
+
+    def test_json_codec(self):
+        """
+        Test that JSON codecs parse and write the same as the json module.
+        """
+        import json
+        from collections import OrderedDict
+        from jsonteng.codec import get_codec, get_codec_names
+        moved = OrderedDict([("a", 1), ("b", [])])
+        moved.move_to_end("a")
+        value = {"s": "é\x7f\U0001f600\n\"", "f": [0.5, 1e16, 1e-05, float("nan"), -0.0], "i": [2 ** 64, -1],
+                 "o": moved, "e": [{}, [], None, True]}
+        text = json.dumps(value)
+        for name in get_codec_names():
+            codec = get_codec(name)
+            self.assertEqual(text, json.dumps(codec.loads(text)))
+            self.assertEqual(text, json.dumps(codec.loads(text.encode())))
+            for indent, separators, sort_keys in ((None, None, False), (None, (',', ':'), False),
+                                                  (2, None, False), (2, None, True)):
+                self.assertEqual(json.dumps(value, indent=indent, separators=separators, sort_keys=sort_keys),
+                                 codec.dumps(value, indent=indent, separators=separators, sort_keys=sort_keys))
+            with self.assertRaises(json.JSONDecodeError):
+                codec.loads('[1]x')
+
+    def test_compact_results(self):
+        """
+        Test resolving JSON objects as plain dicts sharing keys.
+        """
+        import json
+        from jsonteng.template_engine import JsonTemplateEngine
+        template = '{"x": ["#for-each", "${l}", "{\\"k\\": \\"${v}\\", \\"${v}\\": 1, \\"n\\": [\\"#one-of\\", [\\"False\\", 1]]}"],' \
+                   ' "s": "s-${o}"}'
+        binding_data_list = [{"l": [{"v": "a"}, {"v": "b"}], "o": {"p": 1}}]
+        expected = JsonTemplateEngine().resolve(template, binding_data_list)
+        resolved = JsonTemplateEngine(compact=True).resolve(template, binding_data_list)
+        self.assertEqual(json.dumps(expected), json.dumps(resolved))
+        self.assertEqual("s-OrderedDict([('p', 1)])", resolved["s"])
+        self.assertIs(dict, type(resolved["x"][0]))
+        self.assertIs(next(iter(resolved["x"][0])), next(iter(resolved["x"][1])))
+
+    def test_template_cache(self):
+        """
+        Test compiled templates are reused across engines until the file changes.
+        """
+        import tempfile
+        from jsonteng.json_loader import DefaultJsonLoader
+        from jsonteng.template_engine import JsonTemplateEngine
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_dir = os.path.join(temp_dir, 'cache')
+            template = os.path.join(temp_dir, 'main.json')
+            with open(template, 'w') as fp:
+                fp.write('{"x": ["#for-each", "${l}", "{\\"v\\": \\"${v}\\"}", "${v} > 1"], "y": ["#one-of", ["${n} == 1", 1], 2]}')
+            binding_data_list = [{"l": [{"v": 1}, {"v": 2}], "n": 1}]
+            expected = JsonTemplateEngine().resolve(template, binding_data_list)
+            for content in (None, '{"x": "${n}"}', b'corrupted'):
+                if isinstance(content, str):
+                    with open(template, 'w') as fp:
+                        fp.write(content)
+                    expected = {"x": 1}
+                elif content is not None:
+                    for name in os.listdir(cache_dir):
+                        with open(os.path.join(cache_dir, name), 'wb') as fp:
+                            fp.write(content)
+                loaders = [DefaultJsonLoader(), DefaultJsonLoader()]
+                for loader in loaders:
+                    engine = JsonTemplateEngine(template_loader=loader, cache_dir=cache_dir)
+                    self.assertEqual(expected, engine.resolve(template, binding_data_list))
+                # only the first engine loads the main template
+                self.assertEqual(loaders[1].get_cache().get_stats()["misses"] + 1,
+                                 loaders[0].get_cache().get_stats()["misses"])
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+
+    def test_render_server(self):
+        """
+        Test serving CLI renders with warm engines over stdio.
+        """
+        import io
+        import json
+        import tempfile
+        from jsonteng.server import RenderServer
+        with tempfile.TemporaryDirectory() as temp_dir:
+            template = os.path.join(temp_dir, 'main.json')
+            with open(template, 'w') as fp:
+                fp.write('{"x": "${x}"}')
+            requests = [{"args": ["-r", "-l", template], "input": '{"x": 1}\n{"x": 2}\n'},
+                        {"args": ["-r", "-b", '{"x": 3}', template]},
+                        {"args": ["--max-nodes", "0", "-b", '{"x": 3}', template]}]
+            in_fp = io.BytesIO(''.join(json.dumps(request) + '\n' for request in requests).encode() + b'x\n')
+            fp = io.BytesIO()
+            RenderServer().serve_stdio(in_fp, fp)
+            frames = [json.loads(line) for line in fp.getvalue().splitlines()]
+            self.assertEqual([["out", '{"x":1}\n{"x":2}\n'], ["exit", 0],
+                              ["out", '{"x":3}\n'], ["exit", 0]], frames[:4])
+            self.assertEqual(["exit", 1], frames[5])
+            self.assertEqual(["exit", 2], frames[-1])
+            # a file which is not a socket is not replaced
+            with self.assertRaises(FileExistsError):
+                RenderServer().serve_socket(template)
+            self.assertTrue(os.path.isfile(template))
+
+    def test_lazy_tags(self):
+        """
+        Test tags given by name are imported when a template first uses them.
+        """
+        import sys
+        import tempfile
+        from jsonteng.exception import TemplateEngineException
+        from jsonteng.tags.tag_map import remove_tag
+        from jsonteng.template_engine import JsonTemplateEngine
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, 'lazy_size_tag.py'), 'w') as fp:
+                fp.write('from jsonteng.tags.len_tag import LenTag'
+                         ' as SizeTag\n')
+            sys.path.insert(0, temp_dir)
+            try:
+                JsonTemplateEngine.add_tags(['size=lazy_size_tag.SizeTag',
+                                             'broken=no_such_module.Tag'])
+                self.assertIn('size', JsonTemplateEngine.list_tag_names())
+                engine = JsonTemplateEngine()
+                self.assertEqual({"x": 1}, engine.resolve(
+                    '{"x": "${x}"}', [{"x": 1}]))
+                self.assertNotIn('lazy_size_tag', sys.modules)
+                self.assertEqual({"x": 2}, engine.resolve(
+                    '{"x": ["#size", [1, 2]]}', [{}]))
+                self.assertIn('lazy_size_tag', sys.modules)
+                with self.assertRaises(TemplateEngineException):
+                    engine.resolve('{"x": ["#broken"]}', [{}])
+            finally:
+                remove_tag('size')
+                remove_tag('broken')
+                sys.path.remove(temp_dir)
+                sys.modules.pop('lazy_size_tag', None)
+            self.assertNotIn('size', JsonTemplateEngine.list_tag_names())
@@ -23,11 +23,11 @@ class Ipv4HostIpTag(TagBase):
         super().__init__(tag_resolver)
         self._element_resolver = tag_resolver.get_element_resolver()
 
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
         :return: JSON object
@@ -39,8 +39,8 @@ class Ipv4HostIpTag(TagBase):
                 "Tag \"{}\" requires 2 parameters."
                 " Parameters given {}".format(Ipv4HostIpTag.name, tag_tokens))
         network = ipaddress.ip_network(self._element_resolver.resolve(
-            tag_tokens[0], binding_data_list))
+            tag_tokens[0], scope))
         index = int(self._element_resolver.resolve(
-            tag_tokens[1], binding_data_list))
+            tag_tokens[1], scope))
         return str(ipaddress.ip_address(
             int(ipaddress.ip_address(network.network_address)) + index))
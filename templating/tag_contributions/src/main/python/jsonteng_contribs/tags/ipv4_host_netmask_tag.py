@@ -23,13 +23,13 @@ class Ipv4HostNetmaskTag(TagBase):
         super().__init__(tag_resolver)
         self._element_resolver = tag_resolver.get_element_resolver()
 
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
@@ -39,5 +39,5 @@ class Ipv4HostNetmaskTag(TagBase):
                 "Tag \"{}\" requires 1 parameter."
                 " Parameters given {}".format(Ipv4HostNetmaskTag.name, tag_tokens))
         network = ipaddress.ip_network(self._element_resolver.resolve(
-            tag_tokens[0], binding_data_list))
+            tag_tokens[0], scope))
         return str(network.netmask)
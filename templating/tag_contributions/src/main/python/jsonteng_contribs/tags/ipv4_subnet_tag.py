@@ -22,13 +22,13 @@ class Ipv4SubnetTag(TagBase):
         super().__init__(tag_resolver)
         self._element_resolver = tag_resolver.get_element_resolver()
 
-    def process(self, tag_tokens, binding_data_list):
+    def process(self, tag_tokens, scope):
         """
         Process this tag.
         :param tag_tokens: Tag arguments.
         :type tag_tokens: 'list'
-        :param binding_data_list: Binding data used during the processing.
-        :type binding_data_list: 'list'
+        :param scope: Scope used during the processing.
+        :type scope: 'ScopeChain'
         :return: JSON object
         :rtype: JSON object
         """
@@ -38,11 +38,11 @@ class Ipv4SubnetTag(TagBase):
                 "Tag \"{}\" requires 3 parameters."
                 " Parameters given {}".format(Ipv4SubnetTag.name, tag_tokens))
         network = ipaddress.ip_network(self._element_resolver.resolve(
-            tag_tokens[0], binding_data_list))
+            tag_tokens[0], scope))
         subnet_count = int(self._element_resolver.resolve(
-            tag_tokens[1], binding_data_list))
+            tag_tokens[1], scope))
         subnet_index = int(self._element_resolver.resolve(
-            tag_tokens[2], binding_data_list))
+            tag_tokens[2], scope))
         base2_exp = 0
         count = int(subnet_count) - 1
         while count & 1:
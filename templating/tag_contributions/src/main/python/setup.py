@@ -14,6 +14,18 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="",
     packages=setuptools.find_packages(),
+    entry_points={
+        "jsonteng.tags": [
+            "ipv4-host-gateway = jsonteng_contribs.tags."
+            "ipv4_host_gateway_tag:Ipv4HostGatewayTag",
+            "ipv4-host-ip = jsonteng_contribs.tags."
+            "ipv4_host_ip_tag:Ipv4HostIpTag",
+            "ipv4-host-netmask = jsonteng_contribs.tags."
+            "ipv4_host_netmask_tag:Ipv4HostNetmaskTag",
+            "ipv4-subnet = jsonteng_contribs.tags."
+            "ipv4_subnet_tag:Ipv4SubnetTag",
+        ],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",